@@ -1,30 +1,48 @@
-import logging
-import paho.mqtt.client as mqtt
-import ssl
+import time
+
+# Início da execução do script: a primeira do processo mede a partida a frio (importações incluídas)
+inicio_execucao = time.perf_counter()
+
+import atexit
+import io
+import os
 import streamlit as st
 from dotenv import load_dotenv
-import requests
-import matplotlib.pyplot as plt
-from datetime import datetime
-from scripts.connect_db import conectar_banco, fechar_conexao
-from scripts.setup_db import setup_banco_dados
-from scripts.consulta_banco import carregar_dados_umidade
-from PIL import Image, ImageDraw
+from datetime import datetime, timedelta
+from scripts.connect_db import conectar_banco, fechar_conexao, obter_pool, fechar_pool
+from scripts.consulta_banco import (
+    carregar_dados_umidade, consultar_pagina_umidade, consultar_ultima_umidade, listar_sensores_umidade,
+    consultar_serie_umidade, acompanhar_umidade
+)
+from scripts.resumos import escolher_granularidade, consultar_resumo, periodo_total, RESUMOS
+from scripts.reducao_series import reduzir_serie, PONTOS_MAXIMOS_PADRAO
+from scripts.tabela_umidade import preparar_tabela_umidade, STATUS_FORA
 from typing import Tuple
-import numpy as np
 import pandas as pd
-import plotly.express as px
 
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
-from sklearn.metrics import mean_absolute_error, mean_squared_error
+from scripts.metricas import iniciar_servidor_metricas, observar_execucao_dashboard
+from scripts.perfil_execucao import PerfilExecucao
+from log.logger_config import configurar_logging
+
+# Dependências pesadas usadas só por algumas páginas (sklearn, joblib, matplotlib, plotly,
+# PIL, requests, paho, pyarrow.dataset) são importadas dentro das funções que as usam.
 
 
 # Configuração de layout da página
 st.set_page_config(page_title="🚜 FarmTech - Sistema Inteligente de Gestão Agrícola", layout="wide")
 
+# Perfil da reexecução: opt-in com DASHBOARD_PERFIL=1 ou ?perfil=1 na URL; liga pelo menu lateral
+PERFIL_DISPONIVEL = os.getenv('DASHBOARD_PERFIL') == '1' or st.query_params.get('perfil') == '1'
+perfil = PerfilExecucao(
+    ativo=PERFIL_DISPONIVEL and st.session_state.get('perfil_ativo', False),
+    cprofile=st.session_state.get('perfil_cprofile', False)
+)
+
+# Funções de Preparação de Imagem
 def make_rounded_image(image, radius=50):
+    """Cria imagem com bordas arredondadas"""
+    from PIL import Image, ImageDraw
+
     # Garantir que a imagem seja quadrada (ou ajustar automaticamente)
     size = image.size
     mask = Image.new("L", size, 0)  # Criar máscara de luminosidade (L)
@@ -39,12 +57,18 @@ def make_rounded_image(image, radius=50):
     
     return rounded_image
 
-# Carregar a imagem e aplicar bordas arredondadas
-logo = Image.open('assets/farm-tech-logo.png').convert("RGBA")
-logo_rounded = make_rounded_image(logo, radius=50)
+@st.cache_resource
+def carregar_logo(caminho='assets/farm-tech-logo.png', radius=50):
+    """Carrega o logo, aplica as bordas arredondadas e codifica em PNG uma única vez por processo"""
+    from PIL import Image
+
+    logo = make_rounded_image(Image.open(caminho).convert("RGBA"), radius=radius)
+    buffer = io.BytesIO()
+    logo.save(buffer, format='PNG')
+    return buffer.getvalue()
 
 # Exibir a imagem com bordas arredondadas no menu lateral
-st.sidebar.image(logo_rounded, caption="FarmTech Solutions", width=286)
+st.sidebar.image(carregar_logo(), caption="FarmTech Solutions", width=286)
 
 # CSS customizado para os botões
 st.markdown("""
@@ -83,26 +107,55 @@ API_KEY = 'c60a4792ccbe5983e113c048825b78fb'
 CITY = 'Juiz de Fora'
 PREDICT_DAYS = 7
 
-# Logging
-logging.basicConfig(
-    filename='app.log', level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-
-# MQTT Client
-client = mqtt.Client()
-client.username_pw_set(mqtt_user, mqtt_password)
-client.tls_set(cert_reqs=ssl.CERT_NONE)
-client.connect(mqtt_server, mqtt_port, 60)
-client.loop_start()
+# Logging (fila em memória; a escrita em arquivo fica numa thread do processo)
+logger = configurar_logging('app')
+
+# Recursos compartilhados por todas as sessões e reexecuções do servidor Streamlit
+@st.cache_resource
+def obter_cliente_mqtt():
+    """Cria o cliente MQTT uma única vez por processo, com a thread de rede em segundo plano"""
+    import ssl
+    import paho.mqtt.client as mqtt
+
+    client = mqtt.Client()
+    client.username_pw_set(mqtt_user, mqtt_password)
+    client.tls_set(cert_reqs=ssl.CERT_NONE)
+    client.connect(mqtt_server, mqtt_port, 60)
+    client.loop_start()
+
+    def encerrar():
+        client.loop_stop()
+        client.disconnect()
+
+    atexit.register(encerrar)
+    logger.info("Cliente MQTT do dashboard conectado.")
+    return client
+
+@st.cache_resource
+def estado_processo():
+    """Estado compartilhado pelas execuções do processo (marca a primeira, de partida a frio)"""
+    return {'primeira_execucao': True}
+
+@st.cache_resource
+def iniciar_metricas():
+    """Inicia o endpoint de métricas do dashboard uma única vez por processo"""
+    return iniciar_servidor_metricas()
+
+@st.cache_resource
+def obter_pool_banco():
+    """Cria o pool de sessões do banco uma única vez por processo"""
+    pool = obter_pool()
+    if pool is not None:
+        atexit.register(fechar_pool)
+    return pool
 
 # Funções
 def ligar_bomba_agua():
-    client.publish(pump_topic, "ON")
+    obter_cliente_mqtt().publish(pump_topic, "ON")
     st.success("Comando enviado para ligar a bomba de água.")
 
 def desligar_bomba_agua():
-    client.publish(pump_topic, "OFF")
+    obter_cliente_mqtt().publish(pump_topic, "OFF")
     st.success("Comando enviado para desligar a bomba de água.")
 
 # Configurações de API
@@ -110,19 +163,6 @@ API_KEY = 'c60a4792ccbe5983e113c048825b78fb'
 CITY = 'Juiz de Fora'
 PREDICT_DAYS = 7
 
-# Funções de Preparação de Imagem
-def make_rounded_image(image, radius=50):
-    """Cria imagem com bordas arredondadas"""
-    size = image.size
-    mask = Image.new("L", size, 0)
-    draw = ImageDraw.Draw(mask)
-    draw.rounded_rectangle((0, 0, size[0], size[1]), radius=radius, fill=255)
-    
-    rounded_image = Image.new("RGBA", size)
-    rounded_image.paste(image, (0, 0), mask=mask)
-    
-    return rounded_image
-
 # Funções de Previsão de Precipitação
 def preparar_dados_precipitacao(dados_climatologicos):
     """Prepara dados climatológicos para treinamento do modelo"""
@@ -145,46 +185,15 @@ def preparar_dados_precipitacao(dados_climatologicos):
     
     return df
 
-def treinar_modelo_precipitacao(df):
-    """Treina modelo de precipitação"""
-    features = ['temp_max', 'temp_min', 'mes', 'dia_ano']
-    X = df[features]
-    y = df['precipitacao_proxdia']
-    
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42
-    )
-    
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
-    
-    modelo = RandomForestRegressor(
-        n_estimators=200, 
-        random_state=42, 
-        min_samples_split=5
-    )
-    modelo.fit(X_train_scaled, y_train)
-    
-    y_pred = modelo.predict(X_test_scaled)
-    
-    mae = mean_absolute_error(y_test, y_pred)
-    mse = mean_squared_error(y_test, y_pred)
-    rmse = np.sqrt(mse)
-    
-    return modelo, scaler, {
-        'MAE': mae, 
-        'MSE': mse, 
-        'RMSE': rmse
-    }
-
 def visualizar_predicoes(df, modelo, scaler):
     """Cria visualizações das predições de precipitação"""
-    features = ['temp_max', 'temp_min', 'mes', 'dia_ano']
-    X = df[features].iloc[-7:]
-    X_scaled = scaler.transform(X)
-    
-    predicoes = modelo.predict(X_scaled)
+    import matplotlib.pyplot as plt
+    from scripts.modelos import FEATURES_PRECIPITACAO
+
+    X = df[FEATURES_PRECIPITACAO].iloc[-7:]
+    with perfil.etapa('treino'):
+        X_scaled = scaler.transform(X)
+        predicoes = modelo.predict(X_scaled)
     
     plt.figure(figsize=(12, 6))
     plt.plot(df['data'].iloc[-7:], predicoes, marker='o', label='Precipitação Predita')
@@ -200,9 +209,20 @@ def visualizar_predicoes(df, modelo, scaler):
 
 def main_predicao_chuva(dados_climatologicos):
     """Função principal para predição de precipitação"""
+    from scripts.modelos import treinar_modelo_precipitacao, HIPERPARAMETROS_PRECIPITACAO
+    from scripts.registro_modelos import registro_modelos
+
     try:
-        df = preparar_dados_precipitacao(dados_climatologicos)
-        modelo, scaler, metricas = treinar_modelo_precipitacao(df)
+        with perfil.etapa('dataframe'):
+            df = preparar_dados_precipitacao(dados_climatologicos)
+        with perfil.etapa('treino'):
+            artefato = registro_modelos.obter(
+                'precipitacao', treinar_modelo_precipitacao, df, HIPERPARAMETROS_PRECIPITACAO
+            )
+        if artefato is None:
+            st.info("Modelo de precipitação sendo treinado em segundo plano. Atualize a página em instantes.")
+            return None
+        modelo, scaler, metricas = artefato['modelo'], artefato['scaler'], artefato['metricas']
         
         st.subheader("🌧️ Modelo de Predição de Precipitação")
         st.write("Métricas de Performance:")
@@ -210,8 +230,10 @@ def main_predicao_chuva(dados_climatologicos):
         st.write(f"- Erro Quadrático Médio (MSE): {metricas['MSE']:.2f} mm²")
         st.write(f"- Raiz do Erro Quadrático Médio (RMSE): {metricas['RMSE']:.2f} mm")
         
-        fig, predicoes = visualizar_predicoes(df, modelo, scaler)
-        st.pyplot(fig)
+        with perfil.etapa('figura'):
+            fig, predicoes = visualizar_predicoes(df, modelo, scaler)
+        with perfil.etapa('emissao'):
+            st.pyplot(fig)
         
         st.subheader("Previsão de Precipitação para Próximos Dias")
         for i, pred in enumerate(predicoes, 1):
@@ -224,112 +246,28 @@ def main_predicao_chuva(dados_climatologicos):
         return None
 
 # Funções de API e Consultas
-def get_city_coordinates(city: str, api_key: str) -> Tuple[float, float]:
-    """Obtém coordenadas geográficas da cidade"""
-    url = "http://api.openweathermap.org/data/2.5/weather"
-    params = {
-        "q": city,
-        "appid": api_key
-    }
-    
-    try:
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
-        lat = data['coord']['lat']
-        lon = data['coord']['lon']
-        
-        return lat, lon
-        
-    except requests.exceptions.RequestException as e:
-        st.error(f"Erro na requisição: {str(e)}")
-        return None, None
-
-def consultar_climatologia(city: str):
-    """Consulta dados climatológicos pela API da NASA"""
-    try:
-        # Obter coordenadas da cidade
-        lat, lon = get_city_coordinates(city, API_KEY)
-        
-        if lat is None or lon is None:
-            st.error("Não foi possível obter coordenadas.")
-            return None
-        
-        # URL da API NASA POWER
-        url = "https://power.larc.nasa.gov/api/temporal/daily/point"
-        
-        # Parâmetros da requisição
-        params = {
-            "start": "2020",
-            "end": "2023",
-            "latitude": lat,
-            "longitude": lon,
-            "community": "RE",
-            "parameters": "PRECTOTCORR,T2M_MAX,T2M_MIN",
-            "format": "JSON"
-        }
-        
-        response = requests.get(url, params=params, timeout=30)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        # Extrair dados
-        precipitacao = data['properties']['parameter']['PRECTOTCORR']
-        temp_max = data['properties']['parameter']['T2M_MAX']
-        temp_min = data['properties']['parameter']['T2M_MIN']
-        
-        # Calcular estatísticas
-        total_precip = sum(precipitacao.values())
-        media_precip = total_precip / len(precipitacao)
-        
-        # Criar visualizações
-        datas = [datetime.strptime(d, '%Y%m%d') for d in precipitacao.keys()]
-        
-        # Figura com 2 subplots
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8))
-        
-        # Gráfico de precipitação
-        ax1.plot(datas, list(precipitacao.values()), 'b-', linewidth=1)
-        ax1.fill_between(datas, list(precipitacao.values()), alpha=0.3)
-        ax1.set_title('Precipitação Diária')
-        ax1.set_ylabel('Precipitação (mm)')
-        ax1.grid(True)
-        
-        # Gráfico de temperaturas
-        ax2.plot(datas, list(temp_max.values()), 'r-', label='Máxima')
-        ax2.plot(datas, list(temp_min.values()), 'b-', label='Mínima')
-        ax2.fill_between(datas, list(temp_min.values()), list(temp_max.values()), alpha=0.2)
-        ax2.set_title('Temperaturas Máxima e Mínima')
-        ax2.set_ylabel('Temperatura (°C)')
-        ax2.legend()
-        ax2.grid(True)
-        
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        
-        # Exibir gráficos no Streamlit
-        st.subheader("Análise Climatológica")
-        st.write(f"Total de precipitação: {total_precip:.2f} mm")
-        st.write(f"Média diária de precipitação: {media_precip:.2f} mm/dia")
-        st.pyplot(fig)
-        
-        return data
-        
-    except Exception as e:
-        st.error(f"Erro na consulta climatológica: {e}")
-        return None
-
 def consultar_previsao_tempo():
     """Consulta previsão do tempo pela OpenWeatherMap"""
-    link_rain = f"https://api.openweathermap.org/data/2.5/forecast?q={CITY}&appid={API_KEY}&units=metric"
+    import matplotlib.pyplot as plt
+    import requests
+    from scripts.cache_http import cache_http
+
+    url = "https://api.openweathermap.org/data/2.5/forecast"
+    params = {
+        "q": CITY,
+        "appid": API_KEY,
+        "units": "metric"
+    }
     
     try:
-        response = requests.get(link_rain)
-        
-        if response.status_code == 200:
-            data = response.json()
+        try:
+            with perfil.etapa('api_externa'):
+                data = cache_http.obter_json('openweather_previsao', url, params, timeout=10)
+        except requests.exceptions.RequestException as e:
+            data = None
+            status = e.response.status_code if e.response is not None else e
+        
+        if data is not None:
             previsao = data['list']
             
             # Criar DataFrame para melhor visualização
@@ -362,7 +300,7 @@ def consultar_previsao_tempo():
             
             return data
         else:
-            st.error(f"Erro na consulta. Status: {response.status_code}")
+            st.error(f"Erro na consulta. Status: {status}")
             return None
     
     except Exception as e:
@@ -371,8 +309,10 @@ def consultar_previsao_tempo():
 
 
 def get_city_coordinates(city: str, api_key: str) -> Tuple[float, float]:
+    import requests
+    from scripts.cache_http import cache_http
 
-    logging.info(f"Buscando coordenadas para cidade: {city}")
+    logger.info(f"Buscando coordenadas para cidade: {city}")
     
     url = "http://api.openweathermap.org/data/2.5/weather"
     params = {
@@ -381,11 +321,9 @@ def get_city_coordinates(city: str, api_key: str) -> Tuple[float, float]:
     }
     
     try:
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
-        logging.info(f"Dados recebidos para {city}: {data}")
+        with perfil.etapa('api_externa'):
+            data = cache_http.obter_json('openweather_coordenadas', url, params, timeout=10)
+        logger.info(f"Dados recebidos para {city}: {data}")
         
         if 'coord' not in data:
             raise KeyError(f"Coordenadas não encontradas para {city}")
@@ -393,19 +331,22 @@ def get_city_coordinates(city: str, api_key: str) -> Tuple[float, float]:
         lat = data['coord']['lat']
         lon = data['coord']['lon']
         
-        logging.info(f"Coordenadas obtidas: lat={lat}, lon={lon}")
+        logger.info(f"Coordenadas obtidas: lat={lat}, lon={lon}")
         return lat, lon
         
     except requests.exceptions.RequestException as e:
-        logging.error(f"Erro na requisição: {str(e)}")
+        logger.error(f"Erro na requisição: {str(e)}")
         raise Exception(f"Erro ao obter coordenadas: {str(e)}")
     
     except KeyError as e:
-        logging.error(f"Erro ao processar dados: {str(e)}")
+        logger.error(f"Erro ao processar dados: {str(e)}")
         raise Exception(f"Dados inválidos na resposta: {str(e)}")
 
 
 def consultar_climatologia(city: str):
+    import matplotlib.pyplot as plt
+    from scripts.cache_http import cache_http
+
     try:
         # Obter coordenadas da cidade
         lat, lon = get_city_coordinates(city, API_KEY)
@@ -424,10 +365,9 @@ def consultar_climatologia(city: str):
             "format": "JSON"
         }
         
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
+        # Resposta em cache; atualizada em segundo plano quando o TTL vence
+        with perfil.etapa('api_externa'):
+            data = cache_http.obter_json('nasa_power', url, params, timeout=30)
         
         # Extrair dados
         precipitacao = data['properties']['parameter']['PRECTOTCORR']
@@ -444,33 +384,45 @@ def consultar_climatologia(city: str):
         st.write(f"Média diária de precipitação: {media_precip:.2f} mm/dia")
         
         # Criar gráficos
-        datas = [datetime.strptime(d, '%Y%m%d') for d in precipitacao.keys()]
-        
-        # Figura com 2 subplots
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8))
-        
-        # Gráfico de precipitação
-        ax1.plot(datas, list(precipitacao.values()), 'b-', linewidth=1)
-        ax1.fill_between(datas, list(precipitacao.values()), alpha=0.3)
-        ax1.set_title('Precipitação Diária')
-        ax1.set_ylabel('Precipitação (mm)')
-        ax1.grid(True)
-        
-        # Gráfico de temperaturas
-        ax2.plot(datas, list(temp_max.values()), 'r-', label='Máxima')
-        ax2.plot(datas, list(temp_min.values()), 'b-', label='Mínima')
-        ax2.fill_between(datas, list(temp_min.values()), list(temp_max.values()), alpha=0.2)
-        ax2.set_title('Temperaturas Máxima e Mínima')
-        ax2.set_ylabel('Temperatura (°C)')
-        ax2.legend()
-        ax2.grid(True)
+        with perfil.etapa('dataframe'):
+            df_clima = pd.DataFrame({
+                'data': pd.to_datetime(list(precipitacao.keys()), format='%Y%m%d'),
+                'precipitacao': list(precipitacao.values()),
+                'temp_max': list(temp_max.values()),
+                'temp_min': list(temp_min.values())
+            })
+            
+            # Séries reduzidas ao orçamento de pontos do gráfico
+            df_precip = reduzir_serie(df_clima, 'data', 'precipitacao', PONTOS_MAXIMOS_PADRAO)
+            df_temp = reduzir_serie(df_clima, 'data', ['temp_max', 'temp_min'], PONTOS_MAXIMOS_PADRAO)
         
-        # Ajustes finais
-        plt.xticks(rotation=45)
-        plt.tight_layout()
+        with perfil.etapa('figura'):
+            # Figura com 2 subplots
+            fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8))
+            
+            # Gráfico de precipitação
+            ax1.plot(df_precip['data'], df_precip['precipitacao'], 'b-', linewidth=1)
+            ax1.fill_between(df_precip['data'], df_precip['precipitacao'], alpha=0.3)
+            ax1.set_title('Precipitação Diária')
+            ax1.set_ylabel('Precipitação (mm)')
+            ax1.grid(True)
+            
+            # Gráfico de temperaturas
+            ax2.plot(df_temp['data'], df_temp['temp_max'], 'r-', label='Máxima')
+            ax2.plot(df_temp['data'], df_temp['temp_min'], 'b-', label='Mínima')
+            ax2.fill_between(df_temp['data'], df_temp['temp_min'], df_temp['temp_max'], alpha=0.2)
+            ax2.set_title('Temperaturas Máxima e Mínima')
+            ax2.set_ylabel('Temperatura (°C)')
+            ax2.legend()
+            ax2.grid(True)
+            
+            # Ajustes finais
+            plt.xticks(rotation=45)
+            plt.tight_layout()
         
         # Exibir no Streamlit
-        st.pyplot(fig)
+        with perfil.etapa('emissao'):
+            st.pyplot(fig)
         
         return data
         
@@ -479,6 +431,8 @@ def consultar_climatologia(city: str):
         return None
 
 def plotar_grafico_previsao(previsao):
+    import matplotlib.pyplot as plt
+
     datas = [datetime.strptime(item['dt_txt'], '%Y-%m-%d %H:%M:%S') for item in previsao]
     temperaturas = [item['main']['temp'] for item in previsao]
     chuva = [item.get('pop', 0) * 100 for item in previsao]
@@ -495,6 +449,9 @@ def plotar_grafico_previsao(previsao):
     st.pyplot(plt)
 
 def predizer_necessidade_irrigacao(dados_clima):
+    from scripts.modelos import treinar_modelo_irrigacao, HIPERPARAMETROS_IRRIGACAO, FEATURES_IRRIGACAO
+    from scripts.registro_modelos import registro_modelos
+
     try:
         # Extrair dados
         precipitacao = dados_clima['properties']['parameter']['PRECTOTCORR']
@@ -502,42 +459,40 @@ def predizer_necessidade_irrigacao(dados_clima):
         temp_min = dados_clima['properties']['parameter']['T2M_MIN']
         
         # Criar DataFrame
-        df = pd.DataFrame({
-            'data': precipitacao.keys(),
-            'precipitacao': precipitacao.values(),
-            'temp_max': temp_max.values(),
-            'temp_min': temp_min.values()
-        })
-        
-        # Target
-        df['necessita_irrigacao'] = ((df['precipitacao'] < 5) & (df['temp_max'] > 28)).astype(int)
-        
-        # Features
-        X = df[['precipitacao', 'temp_max', 'temp_min']]
-        y = df['necessita_irrigacao']
-        
-        # Split e treino
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        
-        scaler = StandardScaler()
-        X_train_scaled = scaler.fit_transform(X_train)
-        X_test_scaled = scaler.transform(X_test)
-        
-        modelo = RandomForestClassifier(n_estimators=100, random_state=42)
-        modelo.fit(X_train_scaled, y_train)
+        with perfil.etapa('dataframe'):
+            df = pd.DataFrame({
+                'data': precipitacao.keys(),
+                'precipitacao': precipitacao.values(),
+                'temp_max': temp_max.values(),
+                'temp_min': temp_min.values()
+            })
+            
+            # Target
+            df['necessita_irrigacao'] = ((df['precipitacao'] < 5) & (df['temp_max'] > 28)).astype(int)
+        
+        # Modelo treinado em segundo plano e persistido no registro de modelos
+        with perfil.etapa('treino'):
+            artefato = registro_modelos.obter(
+                'irrigacao', treinar_modelo_irrigacao, df[FEATURES_IRRIGACAO + ['necessita_irrigacao']],
+                HIPERPARAMETROS_IRRIGACAO
+            )
+        if artefato is None:
+            st.info("Modelo de irrigação sendo treinado em segundo plano. Atualize a página em instantes.")
+            return
+        modelo, scaler = artefato['modelo'], artefato['scaler']
         
         # Últimos dados para predição
         ultima_precipitacao = list(precipitacao.values())[-1]
         ultima_temp_max = list(temp_max.values())[-1]
         ultima_temp_min = list(temp_min.values())[-1]
         
-        X_pred = np.array([[ultima_precipitacao, ultima_temp_max, ultima_temp_min]])
-        X_pred_scaled = scaler.transform(X_pred)
-        
-        necessita_irrigacao = modelo.predict(X_pred_scaled)[0]
-        probabilidade = modelo.predict_proba(X_pred_scaled)[0][1]
+        X_pred = pd.DataFrame([[ultima_precipitacao, ultima_temp_max, ultima_temp_min]], columns=FEATURES_IRRIGACAO)
+        with perfil.etapa('treino'):
+            X_pred_scaled = scaler.transform(X_pred)
+            necessita_irrigacao = modelo.predict(X_pred_scaled)[0]
+            probabilidade = modelo.predict_proba(X_pred_scaled)[0][1]
         
-        score = modelo.score(X_test_scaled, y_test)
+        score = artefato['metricas']['Acurácia']
         
         # Exibir resultados
         st.subheader("Modelo de Previsão de Irrigação")
@@ -555,83 +510,366 @@ def predizer_necessidade_irrigacao(dados_clima):
     except Exception as e:
         st.error(f"Erro ao criar modelo: {str(e)}")
 
+# Períodos disponíveis no histórico de umidade (None = todo o período)
+PERIODOS_HISTORICO = {
+    "Última hora": timedelta(hours=1),
+    "Últimas 24 horas": timedelta(days=1),
+    "Últimos 7 dias": timedelta(days=7),
+    "Últimos 30 dias": timedelta(days=30),
+    "Último ano": timedelta(days=365),
+    "Todo o período": None,
+}
+
+# Linhas por página no histórico de umidade
+TAMANHO_PAGINA_UMIDADE = 100
+
+# Formatação das colunas do histórico de umidade (feita no navegador)
+CONFIGURACAO_TABELA_UMIDADE = {
+    'Data': st.column_config.DateColumn('Data', format='DD/MM/YYYY'),
+    'Hora': st.column_config.DatetimeColumn('Hora', format='HH:mm:ss'),
+    'Umidade (%)': st.column_config.NumberColumn('Umidade (%)', format='%.2f'),
+    'Status': st.column_config.TextColumn('Status'),
+}
+
+def carregar_resumo_umidade(conn, inicio, fim, id_sensor=None):
+    """
+    Carrega o resumo de umidade na granularidade mais grossa adequada ao período.
+
+    Janelas menores que PERIODOS_MINIMOS minutos (48) não têm granularidade de
+    resumo (escolher_granularidade retorna None): o retorno é (None, None) e o
+    chamador deve consultar as leituras brutas.
+
+    O resumo é contínuo a partir do seu primeiro período; o trecho da janela
+    antes dele e antes do corte do arquivo frio (leituras arquivadas antes de o
+    resumo existir) é agregado a partir do arquivo.
+    """
+    from scripts.arquivo_frio import inicio_dados_quentes, resumir_arquivo
+
+    granularidade = escolher_granularidade(inicio, fim)
+    if granularidade is None:
+        return None, None
+
+    with perfil.etapa('consulta'):
+        resumo = consultar_resumo(conn, 'LEITURA_SENSOR_UMIDADE', granularidade, inicio, fim, id_sensor)
+    corte = inicio_dados_quentes('LEITURA_SENSOR_UMIDADE')
+    if corte is not None:
+        limite = min(fim, corte, resumo[0][0]) if resumo else min(fim, corte)
+        if inicio < limite:
+            _, limite_minimo, limite_maximo = RESUMOS['LEITURA_SENSOR_UMIDADE']
+            with perfil.etapa('consulta'):
+                resumo = resumir_arquivo(
+                    'LEITURA_SENSOR_UMIDADE', granularidade, inicio, limite,
+                    limite_minimo, limite_maximo, id_sensor
+                ) + list(resumo)
+    df_resumo = pd.DataFrame(resumo, columns=[
+        'Período', 'Mínima', 'Máxima', 'Média', 'Leituras', 'Fora do Limite'
+    ])
+    return granularidade, df_resumo
+
+def carregar_serie_umidade(conn, inicio, fim, id_sensor=None, resumo=None):
+    """
+    Carrega a série do gráfico de umidade para a janela, reduzida ao orçamento de pontos.
+
+    Usa o resumo quando há granularidade para a janela; abaixo de 48 minutos
+    (granularidade None) lê as leituras brutas, do banco e do arquivo frio.
+    """
+    from scripts.arquivo_frio import ler_arquivo, inicio_dados_quentes
+
+    granularidade, df_resumo = resumo or carregar_resumo_umidade(conn, inicio, fim, id_sensor)
+    if granularidade is not None:
+        # Mínima/máxima por balde preservam os picos fora do limite
+        return granularidade, reduzir_serie(
+            df_resumo, 'Período', ['Média', 'Mínima', 'Máxima'], PONTOS_MAXIMOS_PADRAO, metodo='minmax'
+        )
+
+    # Janela curta: leituras brutas, reduzidas por sensor
+    with perfil.etapa('consulta'):
+        df_serie = consultar_serie_umidade(conn, inicio, fim, id_sensor)
+    df_serie.columns = ['ID Sensor', 'Período', 'Umidade (%)']
+    corte = inicio_dados_quentes('LEITURA_SENSOR_UMIDADE')
+    if corte is not None and inicio < corte:
+        # Parte da janela foi arquivada: as leituras anteriores ao corte podem estar no Parquet
+        with perfil.etapa('consulta'):
+            df_arquivo = ler_arquivo(
+                'LEITURA_SENSOR_UMIDADE', inicio, min(fim, corte), id_sensor,
+                colunas=['id_sensor', 'hora_leitura', 'valor']
+            ).to_pandas()
+        df_arquivo.columns = df_serie.columns
+        df_serie = pd.concat([df_arquivo, df_serie], ignore_index=True).sort_values('Período')
+    if df_serie.empty:
+        return None, df_serie
+    pontos_sensor = max(PONTOS_MAXIMOS_PADRAO // df_serie['ID Sensor'].nunique(), 3)
+    df_serie = pd.concat([
+        reduzir_serie(grupo, 'Período', 'Umidade (%)', pontos_sensor, metodo='minmax')
+        for _, grupo in df_serie.groupby('ID Sensor')
+    ])
+    return None, df_serie
+
+# Modo ao vivo: intervalo de atualização (s) e quantidade de leituras mantidas em memória
+INTERVALO_AO_VIVO = float(os.getenv('UMIDADE_INTERVALO_AO_VIVO', '5'))
+LINHAS_AO_VIVO = int(os.getenv('UMIDADE_LINHAS_AO_VIVO', '2000'))
+# Janela (s), antes da leitura mais recente, reverificada a cada atualização por leituras confirmadas fora de ordem
+MARGEM_AO_VIVO = timedelta(seconds=float(os.getenv('UMIDADE_MARGEM_AO_VIVO', '60')))
+
+@st.fragment(run_every=INTERVALO_AO_VIVO)
+def exibir_umidade_ao_vivo(id_sensor=None):
+    """
+    Atualiza só este trecho da página, buscando as leituras acima da marca d'água
+    e as que confirmaram fora de ordem na janela recente (`acompanhar_umidade`).
+
+    As reexecuções do fragmento não passam pelo restante do script, e a conexão
+    da execução completa já foi devolvida ao pool: cada atualização empresta a sua.
+    """
+    import plotly.express as px
+
+    estado = st.session_state.get("ao_vivo_umidade")
+    if estado is None or estado['id_sensor'] != id_sensor:
+        estado = {
+            'id_sensor': id_sensor,
+            'marca': None,
+            'vistos': {},
+            'df': pd.DataFrame(columns=['ID Leitura', 'ID Sensor', 'Hora', 'Umidade (%)'])
+        }
+        st.session_state.ao_vivo_umidade = estado
+
+    with perfil.etapa('conexao'):
+        conn = conectar_banco()
+    if not conn:
+        st.error("Erro ao conectar ao banco de dados.")
+        return
+    try:
+        with perfil.etapa('consulta'):
+            novas = acompanhar_umidade(conn, estado, id_sensor, LINHAS_AO_VIVO, MARGEM_AO_VIVO)
+    finally:
+        fechar_conexao(conn)
+    if novas:
+        df_novas = pd.DataFrame(novas, columns=['ID Leitura', 'ID Sensor', 'Hora', 'Umidade (%)'])
+        df = df_novas if estado['df'].empty else pd.concat([estado['df'], df_novas], ignore_index=True)
+        # Leituras atrasadas entram na posição da sua hora
+        df = df.sort_values(['Hora', 'ID Leitura'], kind='stable')
+        estado['df'] = df.tail(LINHAS_AO_VIVO).reset_index(drop=True)
+
+    df = estado['df']
+    if df.empty:
+        st.info("Aguardando leituras do sensor de umidade.")
+        return
+
+    fora = (df['Umidade (%)'] < 45) | (df['Umidade (%)'] > 55)
+    ultimo_valor = df['Umidade (%)'].iloc[-1]
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Média de Umidade", f"{df['Umidade (%)'].mean():.2f}%")
+    with col2:
+        status = "🔴" if fora.iloc[-1] else "🟢"
+        st.metric("Última Leitura", f"{ultimo_valor:.2f}% {status}", delta=f"+{len(novas)} novas" if novas else None)
+    with col3:
+        st.metric("Leituras Fora do Limite", int(fora.sum()))
+
+    with perfil.etapa('dataframe'):
+        df_grafico = pd.concat([
+            reduzir_serie(grupo, 'Hora', 'Umidade (%)', PONTOS_MAXIMOS_PADRAO, metodo='minmax')
+            for _, grupo in df.groupby('ID Sensor')
+        ])
+    with perfil.etapa('figura'):
+        fig = px.line(
+            df_grafico, x='Hora', y='Umidade (%)', color='ID Sensor',
+            title=f'Umidade ao vivo (últimas {len(df)} leituras)'
+        )
+        fig.add_hline(y=55, line_dash="dash", line_color="red")
+        fig.add_hline(y=45, line_dash="dash", line_color="red")
+    with perfil.etapa('emissao'):
+        st.plotly_chart(fig)
+    st.caption(f"Atualizado às {datetime.now():%H:%M:%S}, a cada {INTERVALO_AO_VIVO:g} s.")
+
 def exibir_dados_sensor_umidade(conn):
-    cursor = conn.cursor()
-    cursor.execute("SELECT id_leitura_umidade, id_sensor_umidade, data_leitura, hora_leitura, valor_umidade_leitura FROM LEITURA_SENSOR_UMIDADE ORDER BY hora_leitura DESC")
-    resultados = cursor.fetchall()
+    import plotly.express as px
+    from scripts.arquivo_frio import inicio_arquivo, inicio_dados_quentes
+
+    # Filtros de período e sensor
+    col_periodo, col_sensor = st.columns(2)
+    with col_periodo:
+        periodo = st.selectbox("Período", list(PERIODOS_HISTORICO), index=1)
+    with col_sensor:
+        with perfil.etapa('consulta'):
+            sensores = listar_sensores_umidade(conn)
+        sensor = st.selectbox("Sensor", ["Todos"] + sensores)
+    id_sensor = None if sensor == "Todos" else sensor
+
+    if st.toggle("Modo ao vivo"):
+        exibir_umidade_ao_vivo(id_sensor)
+        return
+    # Fora do modo ao vivo, o próximo acesso recomeça pelas leituras mais recentes
+    st.session_state.ao_vivo_umidade = None
+
+    fim = datetime.now()
+    if PERIODOS_HISTORICO[periodo] is None:
+        with perfil.etapa('consulta'):
+            total = periodo_total(conn, 'LEITURA_SENSOR_UMIDADE')
+        inicio = total[0] if total else fim - timedelta(days=1)
+        # O arquivo frio pode ter dias anteriores ao primeiro período do resumo
+        primeiro_arquivado = inicio_arquivo('LEITURA_SENSOR_UMIDADE')
+        if primeiro_arquivado is not None:
+            inicio = min(inicio, primeiro_arquivado)
+    else:
+        inicio = fim - PERIODOS_HISTORICO[periodo]
+
+    # Paginação por chave: pilha com a chave inicial de cada página visitada
+    filtros = (periodo, sensor)
+    if st.session_state.get("filtros_umidade") != filtros:
+        st.session_state.filtros_umidade = filtros
+        st.session_state.paginas_umidade = [None]
+        st.session_state.janela_umidade = None
+    paginas = st.session_state.paginas_umidade
+
+    with perfil.etapa('consulta'):
+        resultados, proxima = consultar_pagina_umidade(
+            conn, inicio, fim, id_sensor, apos=paginas[-1], tamanho=TAMANHO_PAGINA_UMIDADE,
+            corte=inicio_dados_quentes('LEITURA_SENSOR_UMIDADE')
+        )
+    with perfil.etapa('dataframe'):
+        granularidade, df_resumo = carregar_resumo_umidade(conn, inicio, fim, id_sensor)
     
     if resultados:
-        # Criar DataFrame
-        df = pd.DataFrame(resultados, columns=[
-            'ID Leitura',
-            'ID Sensor',
-            'Data',
-            'Hora',
-            'Umidade (%)'
-        ])
-        
-        # Formatar data e hora
-        df['Hora'] = pd.to_datetime(df['Hora']).dt.strftime('%H:%M:%S')
-        df['Data'] = pd.to_datetime(df['Data']).dt.strftime('%d/%m/%Y')
-        
-        # Função de estilo para destacar valores fora do limite
-        def style_umidade(val):
-            if pd.isna(val):
-                return ''
-            try:
-                val = float(val)
-                if val < 45 or val > 55:
-                    return 'color: red; font-weight: bold'
-                return 'color: green; font-weight: normal'
-            except:
-                return ''
-        
-        # Aplicar estilo
-        styled_df = df.style\
-            .applymap(style_umidade, subset=['Umidade (%)'])\
-            .format({'Umidade (%)': '{:.2f}'})
-        
-        # Métricas
+        # Datas nativas e status vetorizado; a formatação fica no column_config
+        with perfil.etapa('dataframe'):
+            df = preparar_tabela_umidade(resultados)
+        
+        # Métricas do período inteiro, vindas do resumo (a página traz só parte das leituras)
+        if df_resumo is not None and not df_resumo.empty:
+            media = (df_resumo['Média'] * df_resumo['Leituras']).sum() / df_resumo['Leituras'].sum()
+            valores_fora = int(df_resumo['Fora do Limite'].sum())
+        else:
+            media = df['Umidade (%)'].mean()
+            valores_fora = int((df['Status'] == STATUS_FORA).sum())
+
         col1, col2, col3 = st.columns(3)
         with col1:
             st.metric(
                 "Média de Umidade", 
-                f"{df['Umidade (%)'].mean():.2f}%",
+                f"{media:.2f}%",
                 delta_color="inverse"
             )
         with col2:
-            ultimo_valor = df['Umidade (%)'].iloc[0]
-            status = "🔴" if (ultimo_valor < 45 or ultimo_valor > 55) else "🟢"
-            st.metric(
-                "Última Leitura",
-                f"{ultimo_valor:.2f}% {status}"
-            )
+            with perfil.etapa('consulta'):
+                ultimo_valor = consultar_ultima_umidade(conn, id_sensor)
+            if ultimo_valor is None:
+                # Tabela ou sensor ainda sem leituras
+                st.metric("Última Leitura", "sem leituras")
+            else:
+                status = "🔴" if (ultimo_valor < 45 or ultimo_valor > 55) else "🟢"
+                st.metric(
+                    "Última Leitura",
+                    f"{ultimo_valor:.2f}% {status}"
+                )
         with col3:
-            valores_fora = len(df[(df['Umidade (%)'] < 45) | (df['Umidade (%)'] > 55)])
             st.metric("Leituras Fora do Limite", valores_fora)
         
         # Tabela
         st.write("### Histórico de Leituras")
-        st.dataframe(styled_df, width=1000)
-        
-        # Gráfico com limites
-        fig = px.line(df, x='Hora', y='Umidade (%)', title='Monitoramento de Umidade')
-        fig.add_hline(y=55, line_dash="dash", line_color="red")
-        fig.add_hline(y=45, line_dash="dash", line_color="red")
-        st.plotly_chart(fig)
+        with perfil.etapa('emissao'):
+            st.dataframe(
+                df, width=1000, hide_index=True, column_config=CONFIGURACAO_TABELA_UMIDADE
+            )
+
+        # Navegação entre páginas
+        col_anterior, col_pagina, col_proxima = st.columns([1, 2, 1])
+        with col_anterior:
+            if st.button("◀ Anterior", disabled=len(paginas) == 1):
+                paginas.pop()
+                st.rerun()
+        with col_pagina:
+            st.caption(f"Página {len(paginas)}")
+        with col_proxima:
+            if st.button("Próxima ▶", disabled=proxima is None):
+                paginas.append(proxima)
+                st.rerun()
+        
+        # Gráfico com limites: a janela selecionada no gráfico é consultada de novo,
+        # com mais detalhe, e sempre reduzida ao orçamento de pontos
+        janela = st.session_state.get("janela_umidade")
+        inicio_grafico, fim_grafico = janela or (inicio, fim)
+        with perfil.etapa('dataframe'):
+            granularidade_grafico, df_grafico = carregar_serie_umidade(
+                conn, inicio_grafico, fim_grafico, id_sensor,
+                resumo=None if janela else (granularidade, df_resumo)
+            )
+        with perfil.etapa('figura'):
+            if granularidade_grafico is not None:
+                fig = px.line(
+                    df_grafico, x='Período', y=['Média', 'Mínima', 'Máxima'],
+                    title=f'Monitoramento de Umidade (resumo por {granularidade_grafico.lower()})'
+                )
+            else:
+                fig = px.line(
+                    df_grafico, x='Período', y='Umidade (%)', color='ID Sensor', title='Monitoramento de Umidade'
+                )
+            fig.add_hline(y=55, line_dash="dash", line_color="red")
+            fig.add_hline(y=45, line_dash="dash", line_color="red")
+
+        # A chave muda a cada nova janela para descartar a seleção anterior
+        versao = st.session_state.get("versao_grafico_umidade", 0)
+        with perfil.etapa('emissao'):
+            evento = st.plotly_chart(
+                fig, on_select="rerun", selection_mode="box", key=f"grafico_umidade_{versao}"
+            )
+        caixas = evento.selection.get("box", []) if evento else []
+        if caixas:
+            x_inicio, x_fim = sorted(pd.to_datetime(caixas[0]["x"]))
+            st.session_state.janela_umidade = (x_inicio.to_pydatetime(), x_fim.to_pydatetime())
+            st.session_state.versao_grafico_umidade = versao + 1
+            st.rerun()
+        if janela:
+            st.caption(
+                f"Janela: {inicio_grafico:%d/%m/%Y %H:%M} a {fim_grafico:%d/%m/%Y %H:%M}. "
+                "Selecione uma área do gráfico para aproximar."
+            )
+            if st.button("Ver período completo"):
+                st.session_state.janela_umidade = None
+                st.session_state.versao_grafico_umidade = versao + 1
+                st.rerun()
+        else:
+            st.caption("Selecione uma área do gráfico para aproximar.")
         
     else:
         st.info("Nenhum dado encontrado para o sensor de umidade.")
-    
-    cursor.close()
 
 def apagar_dados_sensor_umidade(conn):
     cursor = conn.cursor()
     cursor.execute("DELETE FROM LEITURA_SENSOR_UMIDADE")
+    for granularidade in ('MINUTO', 'HORA', 'DIA'):
+        cursor.execute(f"DELETE FROM RESUMO_UMIDADE_{granularidade}")
     conn.commit()
     st.success("Dados do sensor de umidade apagados com sucesso.")
     cursor.close()
 
+def exibir_perfil(perfil, pagina):
+    """Mostra no menu lateral o tempo de cada etapa da reexecução e grava o cProfile, se pedido"""
+    resumo = perfil.resumo()
+    total_ms = perfil.total * 1000
+
+    # Comparação com a reexecução anterior da mesma página
+    anteriores = st.session_state.setdefault("perfil_anterior", {})
+    anterior = anteriores.get(pagina)
+    anteriores[pagina] = total_ms
+
+    st.sidebar.write("### Perfil da execução")
+    st.sidebar.metric(
+        pagina, f"{total_ms:.0f} ms",
+        delta=f"{total_ms - anterior:+.0f} ms" if anterior is not None else None, delta_color="inverse"
+    )
+    st.sidebar.dataframe(resumo, hide_index=True, column_config={
+        'Tempo (ms)': st.column_config.NumberColumn(format='%.1f'),
+        '%': st.column_config.ProgressColumn(format='%.0f%%', min_value=0, max_value=100),
+    })
+
+    caminho = perfil.salvar_cprofile(pagina)
+    if caminho:
+        with open(caminho, 'rb') as f:
+            st.sidebar.download_button("Baixar cProfile", f.read(), file_name=os.path.basename(caminho))
+        st.sidebar.caption(f"Salvo em {caminho}")
+    elif perfil.erro_cprofile:
+        st.sidebar.warning(f"cProfile indisponível nesta execução: {perfil.erro_cprofile}")
+
 # Inicializar estado
 if "selected_button" not in st.session_state:
     st.session_state.selected_button = "Exibir Dados do Sensor de Umidade"
@@ -653,63 +891,84 @@ for option in menu_options:
     if st.sidebar.button(option):
         st.session_state.selected_button = option
 
-# Conexão com o banco de dados
-conn = conectar_banco()
-if not conn:
-    st.error("Erro ao conectar ao banco de dados.")
-else:
-    selected = st.session_state.selected_button
-
-    if selected == "Exibir Dados do Sensor de Umidade":
-        st.title("Exibir Dados do Sensor de Umidade")
-        exibir_dados_sensor_umidade(conn)
-    
-    elif selected == "Ligar Bomba de Água":
-        st.title("Ligar Bomba de Água")
-        ligar_bomba_agua()
-    
-    elif selected == "Desligar Bomba de Água":
-        st.title("Desligar Bomba de Água")
-        desligar_bomba_agua()
-    
-    elif selected == "Consultar Previsão do Tempo":
-        st.title("Consultar Previsão do Tempo")
-        previsao = consultar_climatologia(CITY)
-    
-    elif selected == "Apagar Dados do Sensor de Umidade":
-        st.title("Apagar Dados do Sensor de Umidade")
-        apagar_dados_sensor_umidade(conn)
-    
-    elif selected == "Configuração Inicial do Banco":
-        st.title("Configuração Inicial do Banco")
-        setup_banco_dados(conn)
-        st.success("Banco de dados configurado com sucesso.")
-
-    elif selected == "Previsão de Precipitação":
-        st.subheader("Predição de Precipitação")
-        dados_clima = consultar_climatologia(CITY)
-        if dados_clima:
-            main_predicao_chuva(dados_clima)
-
-    elif selected == "Predição de Irrigação":
-        st.title("Predição de Irrigação")
-        dados_clima = consultar_climatologia(CITY)
-        if dados_clima:
-            predizer_necessidade_irrigacao(dados_clima)
-
-    elif selected == "Simulador Wokwi":
-        st.title("Simulador Wokwi")
-        wokwi_url = "https://wokwi.com/projects/416547430655986689"
-        st.markdown(f"""
-            <iframe 
-                src="{wokwi_url}" 
-                width="100%" 
-                height="600" 
-                style="border:none;"></iframe>
-        """, unsafe_allow_html=True)
-
-    
-
-fechar_conexao(conn)
-client.loop_stop()
-
+if PERFIL_DISPONIVEL:
+    st.sidebar.toggle("Perfil da execução", key='perfil_ativo')
+    st.sidebar.toggle("Gravar cProfile", key='perfil_cprofile', disabled=not perfil.ativo)
+
+# Endpoint de métricas do processo (consultas ao banco e APIs externas)
+iniciar_metricas()
+
+# st.rerun() e st.stop() interrompem o script com uma exceção: o finally devolve a conexão
+# ao pool e desliga o cProfile, que de outro modo impediria o perfil da execução seguinte
+conn = None
+try:
+    # Conexão com o banco de dados (sessão emprestada do pool do processo)
+    with perfil.etapa('conexao'):
+        conn = conectar_banco() if obter_pool_banco() is not None else None
+    if not conn:
+        st.error("Erro ao conectar ao banco de dados.")
+    else:
+        selected = st.session_state.selected_button
+
+        if selected == "Exibir Dados do Sensor de Umidade":
+            st.title("Exibir Dados do Sensor de Umidade")
+            exibir_dados_sensor_umidade(conn)
+    
+        elif selected == "Ligar Bomba de Água":
+            st.title("Ligar Bomba de Água")
+            ligar_bomba_agua()
+    
+        elif selected == "Desligar Bomba de Água":
+            st.title("Desligar Bomba de Água")
+            desligar_bomba_agua()
+    
+        elif selected == "Consultar Previsão do Tempo":
+            st.title("Consultar Previsão do Tempo")
+            previsao = consultar_climatologia(CITY)
+    
+        elif selected == "Apagar Dados do Sensor de Umidade":
+            st.title("Apagar Dados do Sensor de Umidade")
+            apagar_dados_sensor_umidade(conn)
+    
+        elif selected == "Configuração Inicial do Banco":
+            st.title("Configuração Inicial do Banco")
+            from scripts.setup_db import setup_banco_dados
+            with perfil.etapa('consulta'):
+                setup_banco_dados(conn)
+            st.success("Banco de dados configurado com sucesso.")
+
+        elif selected == "Previsão de Precipitação":
+            st.subheader("Predição de Precipitação")
+            dados_clima = consultar_climatologia(CITY)
+            if dados_clima:
+                main_predicao_chuva(dados_clima)
+
+        elif selected == "Predição de Irrigação":
+            st.title("Predição de Irrigação")
+            dados_clima = consultar_climatologia(CITY)
+            if dados_clima:
+                predizer_necessidade_irrigacao(dados_clima)
+
+        elif selected == "Simulador Wokwi":
+            st.title("Simulador Wokwi")
+            wokwi_url = "https://wokwi.com/projects/416547430655986689"
+            st.markdown(f"""
+                <iframe 
+                    src="{wokwi_url}" 
+                    width="100%" 
+                    height="600" 
+                    style="border:none;"></iframe>
+            """, unsafe_allow_html=True)
+finally:
+    fechar_conexao(conn)
+    perfil.finalizar()
+
+if perfil.ativo:
+    exibir_perfil(perfil, st.session_state.selected_button)
+
+# Duração da execução (a primeira do processo inclui as importações: partida a frio)
+estado = estado_processo()
+observar_execucao_dashboard(
+    st.session_state.selected_button, time.perf_counter() - inicio_execucao, estado['primeira_execucao']
+)
+estado['primeira_execucao'] = False
@@ -0,0 +1,24 @@
+import random
+
+from gerenciador import Clima, Colheita, CondicoesSolo, DadosCompletos, MaturidadeCana
+
+
+def gerar_dados_simulados(ano_inicial=2000, anos=25, semente=None):
+    """
+    Gera dados anuais simulados da lavoura de cana para a carga inicial do banco.
+
+    :param ano_inicial: Primeiro ano gerado.
+    :param anos: Quantidade de anos consecutivos.
+    :param semente: Semente do gerador aleatório (None para dados diferentes a cada execução).
+    :return: Lista de objetos DadosCompletos, um por ano.
+    """
+    aleatorio = random.Random(semente)
+    dados = []
+    for ano in range(ano_inicial, ano_inicial + anos):
+        dados.append(DadosCompletos(
+            colheita=Colheita(ano, round(aleatorio.uniform(800, 1200), 2)),
+            clima=Clima(ano, round(aleatorio.uniform(20, 30), 1), round(aleatorio.uniform(1000, 2000), 1)),
+            maturidade=MaturidadeCana(ano, round(aleatorio.uniform(0.5, 1.0), 2)),
+            solo=CondicoesSolo(ano, round(aleatorio.uniform(5.0, 7.5), 1), round(aleatorio.uniform(10, 50), 1)),
+        ))
+    return dados
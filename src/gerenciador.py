@@ -0,0 +1,108 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class Colheita:
+    ano: int
+    quantidade_colhida: float
+
+
+@dataclass
+class Clima:
+    ano: int
+    temperatura_media: float
+    precipitacao: float
+
+
+@dataclass
+class MaturidadeCana:
+    ano: int
+    indice_maturidade: float
+
+
+@dataclass
+class CondicoesSolo:
+    ano: int
+    ph: float
+    nutrientes: float
+
+
+@dataclass
+class DadosCompletos:
+    """Dados de um ano: colheita, clima, maturidade da cana e condições do solo."""
+    colheita: Colheita
+    clima: Clima
+    maturidade: MaturidadeCana
+    solo: CondicoesSolo
+
+    @property
+    def ano(self):
+        return self.colheita.ano
+
+
+class GerenciadorDados:
+    """
+    Gerencia em memória os dados anuais da lavoura, os agendamentos de colheita
+    e os recursos alocados.
+    """
+
+    def __init__(self):
+        self.dados_por_ano = {}
+        self.agendamentos = []
+        self.recursos_alocados = []
+
+    def adicionar_dados(self, dados):
+        """
+        Adiciona (ou substitui) os dados de um ano.
+
+        :param dados: Objeto DadosCompletos.
+        """
+        self.dados_por_ano[dados.ano] = dados
+
+    def alterar_dados(self, ano, campo, valor):
+        """
+        Altera um campo dos dados de um ano.
+
+        :param ano: Ano dos dados.
+        :param campo: Nome do campo (por exemplo, 'quantidade_colhida' ou 'ph').
+        :param valor: Novo valor.
+        :raises KeyError: Se não houver dados para o ano.
+        :raises AttributeError: Se nenhum dos registros do ano tiver o campo.
+        """
+        dados = self.dados_por_ano[ano]
+        for registro in (dados.colheita, dados.clima, dados.maturidade, dados.solo):
+            if campo != 'ano' and hasattr(registro, campo):
+                setattr(registro, campo, valor)
+                return
+        raise AttributeError(f"Campo desconhecido: {campo}")
+
+    def excluir_dados(self, ano):
+        """
+        Remove os dados de um ano (nada acontece se o ano não existir).
+
+        :param ano: Ano dos dados.
+        """
+        self.dados_por_ano.pop(ano, None)
+
+    def agendar_colheita(self, plantacao_id, data_colheita):
+        """
+        Agenda a colheita de uma plantação.
+
+        :param plantacao_id: ID da plantação.
+        :param data_colheita: datetime da colheita.
+        """
+        self.agendamentos.append((data_colheita, plantacao_id))
+
+    def listar_agendamentos(self):
+        """
+        :return: Lista de tuplas (data_colheita, plantacao_id) em ordem de data.
+        """
+        return sorted(self.agendamentos)
+
+    def alocar_recurso(self, recurso):
+        """
+        Aloca um recurso (máquina, equipe, insumo) para as operações.
+
+        :param recurso: Nome do recurso.
+        """
+        self.recursos_alocados.append(recurso)
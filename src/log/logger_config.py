@@ -1,32 +1,233 @@
+import atexit
+import copy
+import itertools
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import re
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
-def configurar_logging():
-   
-    # Define o diretório onde o log será salvo
-    diretorio_log = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app_logs')
-    os.makedirs(diretorio_log, exist_ok=True)  # Cria o diretório se não existir
+# Nível mínimo, formato do arquivo ('texto' ou 'json') e caminho base do log (fora do controle de versão);
+# cada processo grava no seu próprio arquivo (arquivo_do_processo)
+NIVEL_PADRAO = os.getenv('LOG_NIVEL', 'INFO').upper()
+FORMATO_PADRAO = os.getenv('LOG_FORMATO', 'texto')
+ARQUIVO_PADRAO = os.getenv(
+    'LOG_ARQUIVO', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app_logs', 'execucao', 'app.txt')
+)
+# Registros por segundo aceitos de um mesmo ponto do código; o excesso é suprimido e contado
+LIMITE_POR_SEGUNDO = int(os.getenv('LOG_LIMITE_POR_SEGUNDO', '20'))
+# Loggers amostrados (obter_logger_amostrado) mantêm 1 a cada N registros abaixo de WARNING
+AMOSTRA_PADRAO = int(os.getenv('LOG_AMOSTRA', '100'))
+# Registros aguardando a thread de escrita; com a fila cheia, o registro é descartado
+CAPACIDADE_FILA = int(os.getenv('LOG_FILA_CAPACIDADE', '10000'))
 
-    caminho_log = os.path.join(diretorio_log, 'app.txt')
+# Papel do processo no nome do arquivo (o run.py define um por processo supervisionado)
+PAPEL_PADRAO = os.getenv('LOG_PAPEL')
 
-    handler = RotatingFileHandler(
-        caminho_log,
+FORMATO_TEXTO = '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
+
+# Atributos padrão de LogRecord; os demais (extra=...) vão como campos no JSON
+_ATRIBUTOS_PADRAO = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+_trava = threading.Lock()
+_listener = None
+_limitador = None
+
+
+class FormatadorJSON(logging.Formatter):
+    """Um objeto JSON por linha, com os campos passados em `extra` como chaves próprias."""
+
+    def format(self, record):
+        registro = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensagem': record.getMessage(),
+            'processo': record.process,
+            'thread': record.threadName,
+        }
+        for chave, valor in vars(record).items():
+            if chave not in _ATRIBUTOS_PADRAO:
+                registro[chave] = valor
+        if record.exc_text:
+            registro['excecao'] = record.exc_text
+        return json.dumps(registro, ensure_ascii=False, default=str)
+
+
+class LimitadorTaxa(logging.Filter):
+    """
+    Limita os registros por segundo de cada ponto do código (arquivo e linha).
+
+    Acima de `limite` por segundo os registros são descartados; o primeiro
+    registro aceito depois disso informa quantos foram suprimidos.
+    """
+
+    def __init__(self, limite=LIMITE_POR_SEGUNDO):
+        super().__init__()
+        self.limite = limite
+        self._janelas = {}
+        self._trava = threading.Lock()
+
+    def filter(self, record):
+        if not self.limite:
+            return True
+        chave = (record.pathname, record.lineno)
+        segundo = int(record.created)
+        with self._trava:
+            janela = self._janelas.get(chave)
+            if janela is None or janela[0] != segundo:
+                suprimidos = janela[2] if janela else 0
+                self._janelas[chave] = [segundo, 1, 0]
+            elif janela[1] < self.limite:
+                janela[1] += 1
+                return True
+            else:
+                janela[2] += 1
+                return False
+
+        if suprimidos:
+            record.msg = f"{record.getMessage()} [{suprimidos} registros semelhantes suprimidos]"
+            record.args = None
+            record.suprimidos = suprimidos
+        return True
+
+
+class AmostragemLog(logging.Filter):
+    """Mantém 1 a cada `taxa` registros abaixo de WARNING; avisos e erros passam sempre."""
+
+    def __init__(self, taxa=AMOSTRA_PADRAO):
+        super().__init__()
+        self.taxa = max(taxa, 1)
+        # next() de itertools.count é atômico: as threads de trabalho não perdem contagens
+        self._contador = itertools.count(1)
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        if next(self._contador) % self.taxa:
+            return False
+        record.amostragem = self.taxa
+        return True
+
+
+class _HandlerFila(QueueHandler):
+    """
+    QueueHandler que não bloqueia quem registra.
+
+    A mensagem e a exceção são resolvidas em texto aqui (os argumentos podem
+    mudar depois), mas os demais campos do registro são mantidos para o
+    formatador JSON. Com a fila cheia, o registro é descartado.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+def arquivo_do_processo(arquivo=ARQUIVO_PADRAO, papel=PAPEL_PADRAO):
+    """
+    Caminho do log deste processo.
+
+    Um RotatingFileHandler por arquivo: processos que gravassem no mesmo
+    arquivo rotacionariam uns por cima dos outros. O nome leva o papel
+    (LOG_PAPEL, ou o nome do script) e o pid.
+
+    :return: Caminho no formato <arquivo>-<papel>-<pid><extensão>.
+    """
+    papel = papel or os.path.splitext(os.path.basename(sys.argv[0]))[0] or 'python'
+    papel = re.sub(r'[^\w.-]+', '-', papel)
+    base, extensao = os.path.splitext(arquivo)
+    return f"{base}-{papel}-{os.getpid()}{extensao}"
+
+
+def _criar_handlers(formato, arquivo):
+    os.makedirs(os.path.dirname(arquivo), exist_ok=True)
+    handler_arquivo = RotatingFileHandler(
+        arquivo,
         maxBytes=5*1024*1024,    # 5 MB por arquivo de log
         backupCount=5,           # Mantém até 5 arquivos de backup
         encoding='utf-8'
     )
+    handler_arquivo.setFormatter(FormatadorJSON() if formato == 'json' else logging.Formatter(FORMATO_TEXTO))
+    handler_console = logging.StreamHandler()
+    handler_console.setFormatter(logging.Formatter(FORMATO_TEXTO))
+    return handler_arquivo, handler_console
 
-    # Configuração básica do logging
-    logging.basicConfig(
-        level=logging.INFO,  
-        format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',  
-        handlers=[
-            handler,           
-            logging.StreamHandler()  
-        ]
-    )
 
-    # Cria e retorna um logger para o módulo
-    logger = logging.getLogger(__name__)
-    return logger
\ No newline at end of file
+def _encerrar():
+    # Grava o que ainda está na fila antes de o processo terminar
+    _listener.stop()
+
+
+def _reiniciar_no_filho():
+    global _listener
+    # Processo criado por fork herda a fila, mas não a thread que a esvazia nem o direito ao arquivo do pai
+    if _listener is not None:
+        _limitador._trava = threading.Lock()
+        _listener = QueueListener(_listener.queue, *_criar_handlers(FORMATO_PADRAO, arquivo_do_processo()),
+                                  respect_handler_level=True)
+        _listener.start()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reiniciar_no_filho)
+
+
+def configurar_logging(nome=__name__):
+    """
+    Retorna um logger, configurando o logging do processo na primeira chamada.
+
+    O logger raiz recebe um único QueueHandler: quem registra só coloca o
+    registro numa fila, e uma thread (QueueListener) faz a escrita no arquivo
+    rotativo do processo (`arquivo_do_processo`) e no console. O limitador de taxa atua antes da fila, então os
+    registros suprimidos não custam nada além do filtro.
+
+    :param nome: Nome do logger (use __name__).
+    :return: logging.Logger
+    """
+    global _listener, _limitador
+    with _trava:
+        if _listener is None:
+            fila = queue.Queue(CAPACIDADE_FILA)
+            _limitador = LimitadorTaxa()
+            handler_fila = _HandlerFila(fila)
+            handler_fila.addFilter(_limitador)
+
+            raiz = logging.getLogger()
+            raiz.setLevel(NIVEL_PADRAO)
+            raiz.addHandler(handler_fila)
+
+            _listener = QueueListener(fila, *_criar_handlers(FORMATO_PADRAO, arquivo_do_processo()),
+                                      respect_handler_level=True)
+            _listener.start()
+            atexit.register(_encerrar)
+    return logging.getLogger(nome)
+
+
+def obter_logger_amostrado(nome, taxa=AMOSTRA_PADRAO):
+    """
+    Retorna um logger para eventos por mensagem, que mantém 1 a cada `taxa` registros abaixo de WARNING.
+
+    :param nome: Nome do logger.
+    :param taxa: Taxa de amostragem.
+    :return: logging.Logger
+    """
+    logger = configurar_logging(nome)
+    if not any(isinstance(filtro, AmostragemLog) for filtro in logger.filters):
+        logger.addFilter(AmostragemLog(taxa))
+    return logger
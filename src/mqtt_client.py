@@ -1,11 +1,33 @@
+import argparse
+import asyncio
 import os
+import signal
+import sys
 import paho.mqtt.client as mqtt
 import ssl
-import oracledb
 import json
-from dotenv import load_dotenv
 from datetime import datetime
-import streamlit as st
+
+from scripts.buffer_escrita import BufferEscrita
+from scripts.pipeline_ingestao import PipelineIngestao
+from scripts.spool_disco import SpoolDisco, DIRETORIO_PADRAO as DIRETORIO_SPOOL
+from scripts.controle_bomba import ControladorBomba
+from scripts.connect_db import conectar_banco, fechar_conexao, fechar_pool, criar_pool_assincrono
+from scripts.gravador_assincrono import GravadorAssincrono
+from scripts import metricas
+from log.logger_config import configurar_logging, obter_logger_amostrado
+from scripts.registro_sensores import registro_sensores
+from scripts.resumos import atualizar_resumos, atualizar_resumos_async
+
+# Cliente MQTT assíncrono: opcional, só é necessário para o motor asyncio
+try:
+    import aiomqtt
+except ImportError:
+    aiomqtt = None
+
+# Configura o logging: eventos por mensagem vão para um logger amostrado, em DEBUG
+logger = configurar_logging('mqtt_client')
+logger_mensagens = obter_logger_amostrado('mqtt_client.mensagens')
 
 # Configurações do HiveMQ Cloud
 mqtt_server = "91c5f1ea0f494ccebe45208ea8ffceff.s1.eu.hivemq.cloud"
@@ -16,201 +38,358 @@ mqtt_password = "Pato1234"
 # Tópicos MQTT
 humidity_topic = "sensor/umidade"
 pump_topic = "sensor/bomba"
+temperature_topic = "sensor/temperatura"
 ph_sensor = "sensor/ph"
 k_button_topic = "sensor/potassio"
 p_button_topic = "sensor/sodio"
 
-# Carrega as variáveis de ambiente para o banco de dados
-load_dotenv()
-db_user = os.getenv('DB_USER') or st.secrets["database"]["user"]
-db_password = os.getenv('DB_PASSWORD') or st.secrets["database"]["password"] 
-db_dsn = os.getenv('DB_DSN') or st.secrets["database"]["dsn"]
+# Instruções de inserção em lote, por tabela de destino
+# O id é gerado pelo banco: trigger no perfil 'padrao', identidade no perfil 'ingestao' (setup_db)
+INSERTS_LEITURAS = {
+    'LEITURA_SENSOR_UMIDADE': """
+        INSERT INTO LEITURA_SENSOR_UMIDADE 
+        (id_sensor_umidade, data_leitura, hora_leitura, valor_umidade_leitura)
+        VALUES (:id_sensor, :data_leitura, :hora_leitura, :valor)
+    """,
+    'LEITURA_SENSOR_TEMPERATURA': """
+        INSERT INTO leitura_sensor_temperatura 
+        (id_sensor_umidade, data_leitura, hora_leitura, valor_temperatura, limite_minimo_temperatura, limite_maximo_temperatura)
+        VALUES (:id_sensor, :data_leitura, :hora_leitura, :valor, 12.00, 36.00)
+    """,
+    'LEITURA_SENSOR_PH': """
+        INSERT INTO LEITURA_SENSOR_PH 
+        (id_sensor_ph, data_leitura, hora_leitura, valor_ph_leitura)
+        VALUES (:id_sensor, :data_leitura, :hora_leitura, :valor)
+    """,
+}
 
-# Função para conectar ao banco de dados Oracle
-def conectar_banco():
-    try:
-        conn = oracledb.connect(user=db_user, password=db_password, dsn=db_dsn)
-        print("Conectado ao banco de dados Oracle.")
-        return conn
-    except oracledb.DatabaseError as e:
-        print(f"Erro ao conectar ao banco de dados: {e}")
+# Tabela de destino de cada tópico de leitura
+TABELA_POR_TOPICO = {
+    humidity_topic: 'LEITURA_SENSOR_UMIDADE',
+    temperature_topic: 'LEITURA_SENSOR_TEMPERATURA',
+    ph_sensor: 'LEITURA_SENSOR_PH',
+}
+
+# Função para garantir que os sensores de um lote existem antes dos inserts
+def garantir_sensores(conn, lotes):
+    registro_sensores.garantir_lotes(conn, lotes)
+
+# Função para converter o payload recebido em uma linha para o buffer
+def montar_leitura(payload):
+    # Mapear campos recebidos para os esperados
+    id_sensor = payload.get("id_sensor")
+    data_leitura = payload.get("DATA_LEITURA") or payload.get("data_leitura")
+    hora_leitura = payload.get("HORA_LEITURA") or payload.get("hora_leitura")
+    valor = payload.get("Valor")
+
+    if not (id_sensor and data_leitura and hora_leitura and valor is not None):
         return None
 
-# Função para garantir que o sensor existe na tabela
-def verificar_ou_inserir_sensor_umidade(conn, id_sensor):
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM sensor_umidade WHERE id_sensor_umidade = :id_sensor", {'id_sensor': id_sensor})
-    if cursor.fetchone()[0] == 0:
-        cursor.execute("INSERT INTO sensor_umidade (id_sensor_umidade) VALUES (:id_sensor)", {'id_sensor': id_sensor})
-        conn.commit()
-        print(f"Sensor de umidade {id_sensor} inserido com sucesso.")
-    cursor.close()
-
-def verificar_ou_inserir_sensor_ph(conn, id_sensor):
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM sensor_ph WHERE id_sensor_ph = :id_sensor", {'id_sensor': id_sensor})
-    if cursor.fetchone()[0] == 0:
-        cursor.execute("INSERT INTO sensor_ph (id_sensor_ph) VALUES (:id_sensor)", {'id_sensor': id_sensor})
-        conn.commit()
-        print(f"Sensor de pH {id_sensor} inserido com sucesso.")
-    cursor.close()
-
-# Função para inserir leitura de umidade
-def inserir_leitura_umidade(conn, id_sensor, data_leitura, hora_leitura, valor_umidade):
-    verificar_ou_inserir_sensor_umidade(conn, id_sensor)
-    cursor = conn.cursor()
-    try:
-        # Combine data e hora em um único objeto datetime
-        data_hora_leitura = datetime.strptime(f"{data_leitura} {hora_leitura}", '%Y-%m-%d %H:%M')
-
-        umidade_formatada = round(float(valor_umidade), 2)
-
-        cursor.execute("""
-            INSERT INTO LEITURA_SENSOR_UMIDADE 
-            (id_leitura_umidade, id_sensor_umidade, data_leitura, hora_leitura, valor_umidade_leitura)
-            VALUES 
-            (LEITURA_SENSOR_UMIDADE_SEQ.NEXTVAL, :id_sensor, :data_leitura, :hora_leitura, :valor_umidade)
-        """, {
-            'id_sensor': id_sensor,
-            'data_leitura': data_hora_leitura.date(),
-            'hora_leitura': data_hora_leitura,
-            'valor_umidade': umidade_formatada
-        })
-        conn.commit()
-        print(f"Leitura de umidade inserida com sucesso: {umidade_formatada}%")
-    except oracledb.DatabaseError as e:
-        print(f"Erro ao inserir dados de umidade: {e}")
-        conn.rollback()
-    finally:
-        cursor.close()
+    # Combine data e hora em um único objeto datetime
+    data_hora_leitura = datetime.strptime(f"{data_leitura} {hora_leitura}", '%Y-%m-%d %H:%M')
 
-# Função para inserir leitura de pH
-def inserir_leitura_ph(conn, id_sensor, data_leitura, hora_leitura, ph_equivalente):
-    verificar_ou_inserir_sensor_ph(conn, id_sensor)
-    cursor = conn.cursor()
-    try:
-        # Combine data e hora em um único objeto datetime
-        data_hora_leitura = datetime.strptime(f"{data_leitura} {hora_leitura}", '%Y-%m-%d %H:%M')
-
-        ph_formatado = round(float(ph_equivalente), 2)
-
-        cursor.execute("""
-            INSERT INTO LEITURA_SENSOR_PH 
-            (id_leitura_ph, id_sensor_ph, data_leitura, hora_leitura, valor_ph_leitura)
-            VALUES 
-            (LEITURA_SENSOR_PH_SEQ.NEXTVAL, :id_sensor, :data_leitura, :hora_leitura, :valor_ph)
-        """, {
-            'id_sensor': id_sensor,
-            'data_leitura': data_hora_leitura.date(),
-            'hora_leitura': data_hora_leitura,
-            'valor_ph': ph_formatado
-        })
-        conn.commit()
-        print(f"Leitura de pH inserida com sucesso: {ph_formatado}")
-    except oracledb.DatabaseError as e:
-        print(f"Erro ao inserir dados de pH: {e}")
-        conn.rollback()
-    finally:
-        cursor.close()
+    return {
+        'id_sensor': id_sensor,
+        'data_leitura': data_hora_leitura.date(),
+        'hora_leitura': data_hora_leitura,
+        'valor': round(float(valor), 2)
+    }
 
+# Estágios da ingestão, criados por iniciar_ingestao()
+buffer = None
+spool = None
+pipeline = None
+controlador_bomba = None
 
+# Tópicos assinados pelo processo (com o prefixo $share/<grupo>/ quando há assinatura compartilhada)
+TOPICOS_LEITURA = [humidity_topic, temperature_topic, ph_sensor, k_button_topic, p_button_topic]
+assinaturas = list(TOPICOS_LEITURA)
 
-# Função para inserir leitura de temperatura
-def inserir_leitura_temperatura(conn, id_sensor, data_leitura, hora_leitura, temperatura):
-    verificar_ou_inserir_sensor_umidade(conn, id_sensor)  # Verifica ou insere o sensor
-    cursor = conn.cursor()
-    try:
-        data_leitura_formatada = datetime.strptime(data_leitura, '%Y-%m-%d').date()
-        hora_leitura_formatada = datetime.strptime(hora_leitura, '%H:%M:%S')
-        temperatura_formatada = round(float(temperatura), 2)
-
-        cursor.execute("""
-            INSERT INTO leitura_sensor_temperatura 
-            (id_sensor_umidade, data_leitura, hora_leitura, valor_temperatura, limite_minimo_temperatura, limite_maximo_temperatura)
-            VALUES (:id_sensor, :data_leitura, :hora_leitura, :valor_temperatura, :limite_minimo, :limite_maximo)
-        """, {
-            'id_sensor': id_sensor,
-            'data_leitura': data_leitura_formatada,
-            'hora_leitura': hora_leitura_formatada,
-            'valor_temperatura': temperatura_formatada,
-            'limite_minimo': 12.00,
-            'limite_maximo': 36.00
-        })
-        conn.commit()
-        print("Leitura de temperatura inserida com sucesso.")
-    except oracledb.DatabaseError as e:
-        print(f"Erro ao inserir dados de temperatura: {e}")
-        conn.rollback()
-    finally:
-        cursor.close()
+def definir_assinaturas(topicos, grupo=None):
+    """
+    Define os tópicos assinados ao conectar.
+
+    Com `grupo`, as assinaturas são compartilhadas ($share/<grupo>/<tópico>) e o
+    broker distribui as mensagens entre os workers do grupo.
+    """
+    global assinaturas
+    assinaturas = [f"$share/{grupo}/{topico}" if grupo else topico for topico in topicos]
 
-# Função para inserir leitura do sensor de pH
 # Callback para conexão
 def on_connect(client, userdata, flags, rc):
-    print(f"Conectado com código de resultado {rc}")
-    client.subscribe(humidity_topic)
-    client.subscribe(ph_sensor)
-    client.subscribe(k_button_topic)
-    client.subscribe(p_button_topic)
+    logger.info("Conectado com código de resultado %s", rc)
+    for topico in assinaturas:
+        client.subscribe(topico)
 
-# Callback para mensagens recebidas
+# Processa uma mensagem já decodificada (executado pelas threads do pipeline)
+def processar_mensagem(item):
+    topico, payload = item
+    logger_mensagens.debug("Mensagem recebida: %s - %s", topico, payload)
+
+    tabela = TABELA_POR_TOPICO.get(topico)
+    if tabela is None:
+        return
+
+    leitura = montar_leitura(payload)
+    if leitura is None:
+        metricas.invalidas_campos.inc()
+        logger_mensagens.warning("Campos faltando no payload de %s.", topico)
+        return
+
+    if buffer is not None:
+        buffer.adicionar(tabela, leitura)
+
+    if topico == humidity_topic and controlador_bomba is not None:
+        # Controle da bomba com histerese: publica apenas quando o estado muda
+        controlador_bomba.avaliar(leitura['id_sensor'], leitura['valor'])
+
+# Callback para mensagens recebidas: apenas decodifica e enfileira
 def on_message(client, userdata, msg):
+    metricas.contar_mensagem(msg.topic)
     try:
         payload = json.loads(msg.payload.decode())
-        print(f"Mensagem recebida: {msg.topic} - {payload}")
-        
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        metricas.invalidas_decodificacao.inc()
+        logger_mensagens.warning("Erro ao decodificar mensagem MQTT: %s", e)
+        return
+
+    if not pipeline.enfileirar((msg.topic, payload)):
+        logger_mensagens.warning("Fila de ingestão cheia, mensagem descartada: %s", msg.topic)
+
+def iniciar_ingestao(conectar, publicar, diretorio_spool=DIRETORIO_SPOOL, gravar=True, controlar_bomba=True):
+    """
+    Cria e inicia o buffer de escrita, o spool em disco, o pipeline de workers e o controlador da bomba.
+
+    :param conectar: Função que retorna uma conexão com o banco (pool ou substituto local).
+    :param publicar: Função que publica um comando ("ON"/"OFF") no tópico da bomba.
+    :param diretorio_spool: Diretório do spool usado quando o banco está indisponível ou atrasado.
+    :param gravar: Se False, as leituras não são gravadas (processo só de controle da bomba).
+    :param controlar_bomba: Se False, o controle da bomba fica a cargo de outro processo.
+    """
+    global buffer, spool, pipeline, controlador_bomba
+
+    if gravar:
+        buffer = BufferEscrita(conectar, INSERTS_LEITURAS, antes_de_gravar=garantir_sensores,
+                               apos_inserir=atualizar_resumos)
+        spool = SpoolDisco(buffer.gravar, diretorio=diretorio_spool, ocupado=buffer.atrasado)
+        buffer.spool = spool
+        buffer.iniciar()
+        spool.iniciar()
+    pipeline = PipelineIngestao(processar_mensagem)
+    controlador_bomba = ControladorBomba(publicar) if controlar_bomba else None
+
+    # Lidos só quando o endpoint de métricas é consultado
+    metricas.fila_profundidade.set_function(pipeline.fila.qsize)
+    if buffer is not None:
+        metricas.linhas_pendentes.set_function(lambda: buffer.estatisticas()['pendentes'])
+
+    pipeline.iniciar()
+
+def encerrar_ingestao():
+    """
+    Drena a fila, grava o que estiver no buffer e retorna as estatísticas dos estágios.
+
+    :return: Dicionário com as estatísticas do pipeline, do buffer, do spool e da bomba.
+    """
+    pipeline.parar()
+    estatisticas = {'pipeline': pipeline.estatisticas()}
+    if buffer is not None:
+        buffer.parar()
+        spool.parar()
+        estatisticas['buffer'] = buffer.estatisticas()
+        estatisticas['spool'] = spool.estatisticas()
+    if controlador_bomba is not None:
+        estatisticas['bomba'] = controlador_bomba.estatisticas()
+    return estatisticas
+
+async def iniciar_ingestao_assincrona(adquirir, publicar, diretorio_spool=DIRETORIO_SPOOL, gravar=True,
+                                     controlar_bomba=True):
+    """
+    Versão de `iniciar_ingestao` para o motor asyncio; deve ser aguardada no loop de eventos.
+
+    As mensagens são processadas no próprio loop (sem fila de threads) e o buffer
+    é um GravadorAssincrono, que mantém vários lotes gravando ao mesmo tempo.
+
+    :param adquirir: Função que retorna um gerenciador de contexto assíncrono com uma conexão (pool.acquire).
+    :param publicar: Função que publica um comando ("ON"/"OFF") no tópico da bomba.
+    """
+    global buffer, spool, pipeline, controlador_bomba
+
+    pipeline = None
+    if gravar:
+        buffer = GravadorAssincrono(adquirir, INSERTS_LEITURAS, antes_de_gravar=registro_sensores.garantir_lotes_async,
+                                    apos_inserir=atualizar_resumos_async)
+        spool = SpoolDisco(buffer.gravar_de_outra_thread, diretorio=diretorio_spool, ocupado=buffer.atrasado)
+        buffer.spool = spool
+        buffer.iniciar()
+        spool.iniciar()
+        metricas.linhas_pendentes.set_function(lambda: buffer.estatisticas()['pendentes'])
+    controlador_bomba = ControladorBomba(publicar) if controlar_bomba else None
+
+async def encerrar_ingestao_assincrona():
+    """
+    Espera as gravações em andamento, grava o que estiver pendente e retorna as estatísticas.
+
+    :return: Dicionário com as estatísticas do gravador, do spool e da bomba.
+    """
+    estatisticas = {}
+    if buffer is not None:
+        await buffer.parar()
+        # O reenvio do spool grava pelo loop de eventos: a thread é encerrada fora dele
+        await asyncio.to_thread(spool.parar)
+        estatisticas['buffer'] = buffer.estatisticas()
+        estatisticas['spool'] = spool.estatisticas()
+    if controlador_bomba is not None:
+        estatisticas['bomba'] = controlador_bomba.estatisticas()
+    return estatisticas
+
+async def receber_mensagens(client):
+    async for msg in client.messages:
+        metricas.contar_mensagem(msg.topic.value)
+        try:
+            payload = json.loads(msg.payload.decode())
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            metricas.invalidas_decodificacao.inc()
+            logger_mensagens.warning("Erro ao decodificar mensagem MQTT: %s", e)
+            continue
+        # Como nas threads do pipeline: uma mensagem com valor inválido não encerra a recepção
+        try:
+            processar_mensagem((msg.topic.value, payload))
+        except Exception as e:
+            logger_mensagens.error("Erro ao processar mensagem de %s: %s", msg.topic.value, e)
+
+async def main_assincrono(papel, diretorio_spool):
+    """
+    Loop principal do motor asyncio (aiomqtt + API assíncrona do oracledb).
+
+    :return: Código de saída do processo; diferente de 0 quando a conexão com o
+             broker cai, para que o supervisor (run.py) reinicie o worker.
+    """
+    gravar = papel != 'bomba'
+    pool = criar_pool_assincrono() if gravar else None
+    if gravar and pool is None:
+        return 1
+
+    if gravar:
+        # Carrega os sensores já cadastrados antes de receber leituras
+        async with pool.acquire() as conn:
+            await registro_sensores.carregar_async(conn)
+
+    loop = asyncio.get_running_loop()
+    parar = asyncio.Event()
+    for sinal in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sinal, parar.set)
+        except NotImplementedError:
+            # Windows: o encerramento fica a cargo do KeyboardInterrupt
+            pass
+
+    # Configuração de TLS/SSL (sem verificação do certificado, como no cliente paho)
+    contexto_tls = ssl.create_default_context()
+    contexto_tls.check_hostname = False
+    contexto_tls.verify_mode = ssl.CERT_NONE
+
+    iniciado = False
+    codigo = 0
+    try:
+        async with aiomqtt.Client(mqtt_server, mqtt_port, username=mqtt_user, password=mqtt_password,
+                                  tls_context=contexto_tls) as client:
+            await iniciar_ingestao_assincrona(
+                pool.acquire if pool else None,
+                lambda comando: loop.create_task(client.publish(pump_topic, comando)),
+                diretorio_spool, gravar=gravar, controlar_bomba=papel != 'ingestao'
+            )
+            iniciado = True
+            for topico in assinaturas:
+                await client.subscribe(topico)
+            logger.info("Conectado (motor asyncio)")
+
+            # Espera o pedido de encerramento ou o fim da recepção (queda do broker)
+            recebendo = asyncio.create_task(receber_mensagens(client))
+            parando = asyncio.create_task(parar.wait())
+            await asyncio.wait({recebendo, parando}, return_when=asyncio.FIRST_COMPLETED)
+            parando.cancel()
+            if recebendo.done():
+                logger.error("Recepção MQTT encerrada: %s", recebendo.exception())
+                codigo = 1
+            else:
+                recebendo.cancel()
+    except aiomqtt.MqttError as e:
+        logger.error("Erro na conexão MQTT (motor asyncio): %s", e)
+        codigo = 1
+    finally:
+        if iniciado:
+            for estagio, estatisticas in (await encerrar_ingestao_assincrona()).items():
+                logger.info("Estatísticas de %s: %s", estagio, estatisticas)
+        if pool is not None:
+            await pool.close(force=True)
+    return codigo
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestão das leituras MQTT.")
+    parser.add_argument('--papel', choices=['completo', 'ingestao', 'bomba'], default='completo',
+                        help="completo: grava e controla a bomba; ingestao: só grava; bomba: só controla a bomba")
+    parser.add_argument('--grupo', default=os.getenv('MQTT_GRUPO_COMPARTILHADO'),
+                        help="Grupo da assinatura compartilhada ($share/<grupo>/...) entre workers de ingestão")
+    parser.add_argument('--worker', type=int, help="Número do worker (separa o diretório de spool)")
+    parser.add_argument('--motor', choices=['threads', 'asyncio'], default=os.getenv('INGESTAO_MOTOR', 'threads'),
+                        help="threads: paho + pipeline de workers; asyncio: aiomqtt + oracledb assíncrono")
+    parser.add_argument('--metricas-porta', type=int, default=metricas.PORTA_PADRAO,
+                        help="Porta do endpoint de métricas Prometheus (0 desativa)")
+    args = parser.parse_args()
+
+    metricas.registrar_topicos(TOPICOS_LEITURA)
+    metricas.iniciar_servidor_metricas(args.metricas_porta)
+
+    # O controle da bomba precisa de todas as leituras de umidade, então nunca usa assinatura compartilhada
+    if args.papel == 'bomba':
+        definir_assinaturas([humidity_topic])
+    else:
+        definir_assinaturas(TOPICOS_LEITURA, args.grupo)
+    diretorio_spool = DIRETORIO_SPOOL
+    if args.worker is not None:
+        diretorio_spool = os.path.join(DIRETORIO_SPOOL, f"worker-{args.worker}")
+
+    if args.motor == 'asyncio':
+        if aiomqtt is None:
+            logger.error("O motor asyncio requer o pacote aiomqtt (pip install aiomqtt).")
+            return
+        sys.exit(asyncio.run(main_assincrono(args.papel, diretorio_spool)))
+
+    # Configuração do cliente MQTT
+    client = mqtt.Client()
+    client.username_pw_set(mqtt_user, mqtt_password)
+    client.on_connect = on_connect
+    client.on_message = on_message
+
+    # Configuração de TLS/SSL
+    client.tls_set(cert_reqs=ssl.CERT_NONE)
+
+    # SIGTERM (enviado pelo supervisor) encerra o loop e drena o buffer no finally
+    signal.signal(signal.SIGTERM, lambda *_: client.disconnect())
+
+    # Carrega os sensores já cadastrados antes de receber leituras
+    if args.papel != 'bomba':
         conn = conectar_banco()
         if conn:
-            if msg.topic == humidity_topic:
-                # Mapear campos recebidos para os esperados
-                id_sensor = payload.get("id_sensor")
-                data_leitura = payload.get("DATA_LEITURA") or payload.get("data_leitura")
-                hora_leitura = payload.get("HORA_LEITURA") or payload.get("hora_leitura")
-                umidade = payload.get("Valor")
-
-                if id_sensor and data_leitura and hora_leitura and umidade:
-                    inserir_leitura_umidade(conn, id_sensor, data_leitura, hora_leitura, umidade)
-
-                    # Lógica para controle da bomba
-                    if float(umidade) > 50:
-                        client.publish(pump_topic, "OFF")
-                        print("Umidade alta, enviando 'OFF' para o tópico da bomba.")
-                    else:
-                        client.publish(pump_topic, "ON")
-                        print("Umidade baixa, enviando 'ON' para o tópico da bomba.")
-                else:
-                    print("Campos faltando no payload de umidade.")
-
-            elif msg.topic == ph_sensor:
-                # Mapear campos recebidos para os esperados
-                id_sensor = payload.get("id_sensor")
-                data_leitura = payload.get("DATA_LEITURA") or payload.get("data_leitura")
-                hora_leitura = payload.get("HORA_LEITURA") or payload.get("hora_leitura")
-                ph_equivalente = payload.get("Valor")
-
-                if id_sensor and data_leitura and hora_leitura and ph_equivalente:
-                    inserir_leitura_ph(conn, id_sensor, data_leitura, hora_leitura, ph_equivalente)
-                else:
-                    print("Campos faltando no payload de pH.")
-
-            conn.close()
-            print("Conexão com o banco de dados encerrada.")
-            
-    except Exception as e:
-        print(f"Erro ao processar mensagem MQTT: {e}")
-
-
-# Configuração do cliente MQTT
-client = mqtt.Client()
-client.username_pw_set(mqtt_user, mqtt_password)
-client.on_connect = on_connect
-client.on_message = on_message
-
-# Configuração de TLS/SSL
-client.tls_set(cert_reqs=ssl.CERT_NONE)
-
-# Conexão com o broker
-client.connect(mqtt_server, mqtt_port, 60)
-
-# Inicia o loop de processamento
-client.loop_forever()
+            registro_sensores.carregar(conn)
+            fechar_conexao(conn)
+
+    # Conexão com o broker
+    client.connect(mqtt_server, mqtt_port, 60)
+
+    iniciar_ingestao(conectar_banco, lambda comando: client.publish(pump_topic, comando), diretorio_spool,
+                     gravar=args.papel != 'bomba', controlar_bomba=args.papel != 'ingestao')
+    try:
+        # Inicia o loop de processamento
+        client.loop_forever()
+    except KeyboardInterrupt:
+        logger.info("Encerrando cliente MQTT...")
+    finally:
+        client.disconnect()
+        for estagio, estatisticas in encerrar_ingestao().items():
+            logger.info("Estatísticas de %s: %s", estagio, estatisticas)
+        fechar_pool()
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,137 @@
 # run.py
+import argparse
+import os
+import signal
 import subprocess
 import sys
 import time
-import os
 
-def run_apps():
+# Quantidade de workers de ingestão (padrão: um por núcleo)
+WORKERS_PADRAO = int(os.getenv('INGESTAO_PROCESSOS', str(os.cpu_count() or 1)))
+# Grupo da assinatura compartilhada ($share/<grupo>/sensor/...) entre os workers
+GRUPO_PADRAO = os.getenv('MQTT_GRUPO_COMPARTILHADO', 'farmtech-ingestao')
+# Tempo máximo, em segundos, para um processo drenar o buffer ao encerrar
+TEMPO_DRENAGEM = float(os.getenv('INGESTAO_TEMPO_DRENAGEM', '30'))
+# Espera máxima, em segundos, entre reinícios de um processo que caiu repetidamente
+ESPERA_MAXIMA_REINICIO = 30.0
+# Primeira porta dos endpoints de métricas: workers, depois bomba, depois app (0 desativa)
+PORTA_METRICAS = int(os.getenv('METRICAS_PORTA', '9108'))
+
+
+class Processo:
+    """Processo supervisionado: reiniciado com espera crescente quando termina sem ser pedido."""
+
+    def __init__(self, nome, comando, ambiente=None):
+        self.nome = nome
+        self.comando = comando
+        self.ambiente = ambiente
+        self.popen = None
+        self.reinicios = 0
+        self.proximo_inicio = 0.0
+        self.iniciado_em = 0.0
+
+    def iniciar(self):
+        # Cada processo grava o seu próprio arquivo de log, identificado pelo nome
+        ambiente = {**(self.ambiente or os.environ), 'LOG_PAPEL': self.nome}
+        self.popen = subprocess.Popen(self.comando, env=ambiente)
+        self.iniciado_em = time.monotonic()
+        print(f"[supervisor] {self.nome} iniciado (pid {self.popen.pid})")
+
+    def verificar(self):
+        """Reinicia o processo se ele tiver terminado e a espera de reinício tiver passado."""
+        agora = time.monotonic()
+        if self.popen is None:
+            if agora >= self.proximo_inicio:
+                self.iniciar()
+            return
+
+        codigo = self.popen.poll()
+        if codigo is None:
+            # Processo estável por um minuto: zera a contagem de reinícios
+            if self.reinicios and agora - self.iniciado_em > 60:
+                self.reinicios = 0
+            return
+
+        espera = min(2 ** self.reinicios, ESPERA_MAXIMA_REINICIO)
+        self.reinicios += 1
+        self.popen = None
+        self.proximo_inicio = agora + espera
+        print(f"[supervisor] {self.nome} terminou com código {codigo}; reiniciando em {espera:.0f} s")
+
+    def sinalizar_parada(self):
+        if self.popen is not None and self.popen.poll() is None:
+            self.popen.terminate()
+
+    def aguardar(self, prazo):
+        if self.popen is None:
+            return
+        try:
+            self.popen.wait(timeout=max(prazo - time.monotonic(), 0))
+        except subprocess.TimeoutExpired:
+            print(f"[supervisor] {self.nome} não drenou em {TEMPO_DRENAGEM:.0f} s; finalizando")
+            self.popen.kill()
+            self.popen.wait()
+
+
+def montar_processos(workers, grupo, com_app=True, porta_metricas=PORTA_METRICAS):
+    """
+    Monta os processos supervisionados.
+
+    - `workers` processos de ingestão com assinatura compartilhada no `grupo`;
+    - um processo de controle da bomba, que precisa de todas as leituras de umidade;
+    - o app Streamlit.
+
+    Cada processo recebe a sua porta de métricas: `porta_metricas + i` para os
+    workers, a seguinte para a bomba e a próxima para o app.
+    """
+    def porta(deslocamento):
+        return str(porta_metricas + deslocamento if porta_metricas else 0)
+
+    cliente = [sys.executable, "src/mqtt_client.py"]
+    processos = [
+        Processo(f"ingestao-{i}", cliente + ["--papel", "ingestao", "--grupo", grupo, "--worker", str(i),
+                                             "--metricas-porta", porta(i)])
+        for i in range(workers)
+    ]
+    processos.append(Processo("bomba", cliente + ["--papel", "bomba", "--metricas-porta", porta(workers)]))
+    if com_app:
+        processos.append(Processo("streamlit", ["streamlit", "run", "src/app.py"],
+                                  {**os.environ, 'METRICAS_PORTA': porta(workers + 1)}))
+    return processos
+
+
+def run_apps(workers=WORKERS_PADRAO, grupo=GRUPO_PADRAO, com_app=True, porta_metricas=PORTA_METRICAS):
+    processos = montar_processos(workers, grupo, com_app, porta_metricas)
+    parar = False
+
+    def pedir_parada(*_):
+        nonlocal parar
+        parar = True
+
+    signal.signal(signal.SIGTERM, pedir_parada)
+    signal.signal(signal.SIGINT, pedir_parada)
+
     try:
-        # Iniciar MQTT Client em background
-        mqtt_process = subprocess.Popen([
-            sys.executable,
-            "src/mqtt_client.py"
-        ])
-        
-        # Iniciar Streamlit App
-        streamlit_process = subprocess.Popen([
-            "streamlit",
-            "run",
-            "src/app.py"
-        ])
-        
-        # Manter processos rodando
-        while True:
+        # Manter processos rodando, reiniciando os que caírem
+        while not parar:
+            for processo in processos:
+                processo.verificar()
             time.sleep(1)
-            
-    except KeyboardInterrupt:
-        print("\nEncerrando aplicações...")
-        mqtt_process.terminate()
-        streamlit_process.terminate()
-        
-    except Exception as e:
-        print(f"Erro: {e}")
-        if 'mqtt_process' in locals():
-            mqtt_process.terminate()
-        if 'streamlit_process' in locals():
-            streamlit_process.terminate()
+    finally:
+        print("\nEncerrando aplicações (drenando buffers)...")
+        for processo in processos:
+            processo.sinalizar_parada()
+        prazo = time.monotonic() + TEMPO_DRENAGEM
+        for processo in processos:
+            processo.aguardar(prazo)
+
 
 if __name__ == "__main__":
-    run_apps()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Supervisor do app e dos workers de ingestão MQTT.")
+    parser.add_argument('--workers', type=int, default=WORKERS_PADRAO, help="Workers de ingestão")
+    parser.add_argument('--grupo', default=GRUPO_PADRAO, help="Grupo da assinatura compartilhada")
+    parser.add_argument('--sem-app', action='store_true', help="Não inicia o app Streamlit")
+    parser.add_argument('--metricas-porta', type=int, default=PORTA_METRICAS,
+                        help="Primeira porta dos endpoints de métricas (0 desativa)")
+    args = parser.parse_args()
+    run_apps(args.workers, args.grupo, not args.sem_app, args.metricas_porta)
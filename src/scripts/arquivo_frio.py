@@ -0,0 +1,366 @@
+"""
+Arquivamento das leituras antigas em Parquet (armazenamento frio).
+
+Leituras com hora_leitura mais antiga que ARQUIVO_IDADE_DIAS são copiadas, em
+lotes, para arquivos Parquet comprimidos particionados por dia e sensor, e
+então apagadas da tabela Oracle. As tabelas de resumo não são alteradas.
+
+O corte usado fica gravado no diretório de cada tabela (ARQUIVO_CORTE), e o
+dashboard o lê de volta para saber quais janelas precisam do arquivo frio.
+
+Uso:
+    python src/scripts/arquivo_frio.py --idade-dias 90
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from pyarrow import fs
+
+# Permite executar o script diretamente (python src/scripts/arquivo_frio.py)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log.logger_config import configurar_logging
+
+# Configura o logging
+logger = configurar_logging(__name__)
+
+DIRETORIO_PADRAO = os.getenv(
+    'ARQUIVO_DIRETORIO',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'arquivo')
+)
+IDADE_PADRAO_DIAS = int(os.getenv('ARQUIVO_IDADE_DIAS', '90'))
+LOTE_PADRAO = int(os.getenv('ARQUIVO_LOTE', '100000'))
+COMPRESSAO = os.getenv('ARQUIVO_COMPRESSAO', 'zstd')
+
+# Tabelas arquivadas: (coluna id, coluna do sensor, coluna do valor, sufixo das colunas de limite)
+TABELAS_ARQUIVO = {
+    'LEITURA_SENSOR_UMIDADE': ('id_leitura_umidade', 'id_sensor_umidade', 'valor_umidade_leitura', 'umidade'),
+    'LEITURA_SENSOR_TEMPERATURA': ('id_leitura_temperatura', 'id_sensor_umidade', 'valor_temperatura', 'temperatura'),
+    'LEITURA_SENSOR_PH': ('id_leitura_ph', 'id_sensor_ph', 'valor_ph_leitura', 'ph'),
+    'LEITURA_SENSOR_NUTRIENTES': ('id_leitura_nutrientes', 'id_sensor_nutrientes', 'valor_nutrientes_leitura', 'nutrientes'),
+}
+
+# Corte do último arquivamento de cada tabela (prefixo '_': ignorado pelo pyarrow.dataset)
+ARQUIVO_CORTE = '_corte.json'
+
+# Unidade de truncamento de cada granularidade dos resumos
+UNIDADES_GRANULARIDADE = {'MINUTO': 'minute', 'HORA': 'hour', 'DIA': 'day'}
+
+# Esquema comum dos arquivos (os nomes das colunas não dependem da tabela)
+ESQUEMA = pa.schema([
+    ('id_leitura', pa.int64()),
+    ('id_sensor', pa.int64()),
+    ('data_leitura', pa.timestamp('us')),
+    ('hora_leitura', pa.timestamp('us')),
+    ('valor', pa.float64()),
+    ('limite_minimo', pa.float64()),
+    ('limite_maximo', pa.float64()),
+    ('dia', pa.string()),
+])
+
+# Diretórios dia=AAAA-MM-DD/id_sensor=N: filtros por dia e sensor descartam partições inteiras
+PARTICIONAMENTO = ds.partitioning(
+    pa.schema([('dia', pa.string()), ('id_sensor', pa.int64())]), flavor='hive'
+)
+
+
+def _diretorio_tabela(tabela, diretorio):
+    return os.path.join(diretorio, tabela.lower())
+
+
+def _salvar_corte(destino, corte):
+    """Registra o corte da tabela antes de mover as leituras; o corte gravado nunca recua."""
+    anterior = _ler_corte(destino)
+    if anterior is not None and anterior >= corte:
+        return
+    os.makedirs(destino, exist_ok=True)
+    temporario = os.path.join(destino, ARQUIVO_CORTE + '.tmp')
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump({'corte': corte.isoformat()}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, os.path.join(destino, ARQUIVO_CORTE))
+
+
+def _ler_corte(destino):
+    try:
+        with open(os.path.join(destino, ARQUIVO_CORTE), encoding='utf-8') as f:
+            return datetime.fromisoformat(json.load(f)['corte'])
+    except FileNotFoundError:
+        return None
+
+
+def _para_arrow(linhas):
+    """Converte as tuplas do banco numa tabela Arrow com o ESQUEMA dos arquivos."""
+    colunas = list(zip(*linhas))
+    colunas.append([hora.strftime('%Y-%m-%d') for hora in colunas[3]])
+    return pa.Table.from_arrays(
+        [pa.array(valores, type=campo.type) for valores, campo in zip(colunas, ESQUEMA)],
+        schema=ESQUEMA
+    )
+
+
+def _gravar_parquet(tabela_arrow, destino, nome_base):
+    """Grava o lote particionado e sincroniza os arquivos com o disco antes de retornar."""
+    escritos = []
+    ds.write_dataset(
+        tabela_arrow, destino, format='parquet', partitioning=PARTICIONAMENTO,
+        basename_template=nome_base + '-{i}.parquet',
+        existing_data_behavior='overwrite_or_ignore',
+        file_options=ds.ParquetFileFormat().make_write_options(compression=COMPRESSAO),
+        file_visitor=lambda arquivo: escritos.append(arquivo.path),
+    )
+    for caminho in escritos:
+        descritor = os.open(caminho, os.O_RDONLY)
+        try:
+            os.fsync(descritor)
+        finally:
+            os.close(descritor)
+    return len(escritos)
+
+
+def arquivar_tabela(conn, tabela, corte, diretorio=DIRETORIO_PADRAO, lote=LOTE_PADRAO):
+    """
+    Move para Parquet as leituras de uma tabela anteriores ao corte.
+
+    Cada lote é gravado e sincronizado em disco antes de ser apagado do banco.
+    O nome dos arquivos vem dos ids do lote, então repetir um lote interrompido
+    entre a gravação e o DELETE sobrescreve os mesmos arquivos. O corte é
+    registrado antes do primeiro lote, de modo que as leituras já movidas nunca
+    ficam depois do corte que o dashboard lê.
+
+    :param conn: Conexão com o banco de dados.
+    :param tabela: Tabela de leitura (chave de TABELAS_ARQUIVO).
+    :param corte: datetime; leituras com hora_leitura anterior a ele são arquivadas.
+    :param diretorio: Diretório raiz do arquivo frio.
+    :param lote: Quantidade de linhas por lote.
+    :return: Quantidade de leituras arquivadas.
+    """
+    coluna_id, coluna_sensor, coluna_valor, sufixo = TABELAS_ARQUIVO[tabela]
+    consulta = f"""
+        SELECT {coluna_id}, {coluna_sensor}, data_leitura, hora_leitura, {coluna_valor},
+               limite_minimo_{sufixo}, limite_maximo_{sufixo}
+        FROM {tabela}
+        WHERE hora_leitura < :corte
+        ORDER BY hora_leitura, {coluna_id}
+        FETCH FIRST :lote ROWS ONLY
+    """
+    destino = _diretorio_tabela(tabela, diretorio)
+    _salvar_corte(destino, corte)
+    total = 0
+
+    cursor = conn.cursor()
+    try:
+        cursor.arraysize = lote
+        cursor.prefetchrows = lote + 1
+        while True:
+            cursor.execute(consulta, {'corte': corte, 'lote': lote})
+            linhas = cursor.fetchall()
+            if not linhas:
+                break
+
+            ids = [linha[0] for linha in linhas]
+            arquivos = _gravar_parquet(_para_arrow(linhas), destino, f"{min(ids)}-{max(ids)}")
+            cursor.executemany(f"DELETE FROM {tabela} WHERE {coluna_id} = :1", [(i,) for i in ids])
+            conn.commit()
+
+            total += len(linhas)
+            logger.info(f"{tabela}: {len(linhas)} leituras arquivadas em {arquivos} arquivos (total {total}).")
+            if len(linhas) < lote:
+                break
+    finally:
+        cursor.close()
+    return total
+
+
+def arquivar(conn, idade_dias=IDADE_PADRAO_DIAS, tabelas=None, diretorio=DIRETORIO_PADRAO, lote=LOTE_PADRAO):
+    """
+    Arquiva as leituras mais antigas que `idade_dias` de todas as tabelas.
+
+    :return: Dicionário {tabela: leituras arquivadas}.
+    """
+    corte = datetime.now() - timedelta(days=idade_dias)
+    return {
+        tabela: arquivar_tabela(conn, tabela, corte, diretorio, lote)
+        for tabela in (tabelas or TABELAS_ARQUIVO)
+    }
+
+
+def abrir_arquivo(tabela, diretorio=DIRETORIO_PADRAO):
+    """
+    Abre o dataset Parquet de uma tabela com leitura por memória mapeada.
+
+    :return: pyarrow.dataset.Dataset ou None se a tabela ainda não tiver arquivo.
+    """
+    caminho = _diretorio_tabela(tabela, diretorio)
+    if not os.path.isdir(caminho):
+        return None
+    return ds.dataset(
+        caminho, format='parquet', partitioning=PARTICIONAMENTO,
+        filesystem=fs.LocalFileSystem(use_mmap=True)
+    )
+
+
+def ler_arquivo(tabela, inicio=None, fim=None, id_sensor=None, colunas=None, diretorio=DIRETORIO_PADRAO):
+    """
+    Lê leituras arquivadas, para consultas analíticas e treino de modelos.
+
+    Os filtros de dia e sensor eliminam partições sem abri-las; o filtro de
+    hora_leitura usa as estatísticas dos row groups do Parquet.
+
+    :param tabela: Tabela de leitura (chave de TABELAS_ARQUIVO).
+    :param inicio, fim: Intervalo [inicio, fim) de hora_leitura (None para sem limite).
+    :param id_sensor: Sensor a filtrar (None para todos).
+    :param colunas: Colunas de ESQUEMA a ler (None para todas).
+    :return: pyarrow.Table, vazia se não houver arquivo.
+    """
+    dataset = abrir_arquivo(tabela, diretorio)
+    if dataset is None:
+        esquema = ESQUEMA if colunas is None else pa.schema([ESQUEMA.field(c) for c in colunas])
+        return esquema.empty_table()
+
+    filtros = []
+    if inicio is not None:
+        filtros.append(ds.field('dia') >= inicio.strftime('%Y-%m-%d'))
+        filtros.append(ds.field('hora_leitura') >= pa.scalar(inicio, pa.timestamp('us')))
+    if fim is not None:
+        filtros.append(ds.field('dia') <= fim.strftime('%Y-%m-%d'))
+        filtros.append(ds.field('hora_leitura') < pa.scalar(fim, pa.timestamp('us')))
+    if id_sensor is not None:
+        filtros.append(ds.field('id_sensor') == id_sensor)
+
+    filtro = None
+    for expressao in filtros:
+        filtro = expressao if filtro is None else filtro & expressao
+    return dataset.to_table(columns=colunas, filter=filtro)
+
+
+def _dias_arquivados(tabela, diretorio):
+    """:return: Lista ordenada dos dias (AAAA-MM-DD) com partição no arquivo da tabela."""
+    caminho = _diretorio_tabela(tabela, diretorio)
+    if not os.path.isdir(caminho):
+        return []
+    return sorted(nome[len('dia='):] for nome in os.listdir(caminho) if nome.startswith('dia='))
+
+
+def ler_pagina_arquivo(tabela, inicio, fim, id_sensor=None, apos=None, tamanho=100, diretorio=DIRETORIO_PADRAO):
+    """
+    Lê uma página de leituras arquivadas na ordem do histórico (hora_leitura, id decrescentes).
+
+    As partições de dia são lidas da mais recente para a mais antiga, só até
+    completar a página.
+
+    :param tabela: Tabela de leitura (chave de TABELAS_ARQUIVO).
+    :param inicio, fim: Intervalo [inicio, fim) de hora_leitura.
+    :param id_sensor: Sensor a filtrar (None para todos).
+    :param apos: Chave (hora_leitura, id_leitura) da última linha da página anterior.
+    :param tamanho: Quantidade máxima de linhas.
+    :return: Lista de tuplas (id_leitura, id_sensor, data_leitura, hora_leitura, valor).
+    """
+    dataset = abrir_arquivo(tabela, diretorio)
+    if dataset is None:
+        return []
+
+    hora = ds.field('hora_leitura')
+    filtro = (hora >= pa.scalar(inicio, pa.timestamp('us'))) & (hora < pa.scalar(fim, pa.timestamp('us')))
+    if id_sensor is not None:
+        filtro = filtro & (ds.field('id_sensor') == id_sensor)
+    ultimo_dia = fim.strftime('%Y-%m-%d')
+    if apos is not None:
+        apos_hora = pa.scalar(apos[0], pa.timestamp('us'))
+        filtro = filtro & ((hora < apos_hora) | ((hora == apos_hora) & (ds.field('id_leitura') < apos[1])))
+        ultimo_dia = min(ultimo_dia, apos[0].strftime('%Y-%m-%d'))
+
+    colunas = ['id_leitura', 'id_sensor', 'data_leitura', 'hora_leitura', 'valor']
+    linhas = []
+    for dia in reversed(_dias_arquivados(tabela, diretorio)):
+        if dia > ultimo_dia:
+            continue
+        if dia < inicio.strftime('%Y-%m-%d') or len(linhas) >= tamanho:
+            break
+        resultado = dataset.to_table(columns=colunas, filter=filtro & (ds.field('dia') == dia))
+        resultado = resultado.sort_by([('hora_leitura', 'descending'), ('id_leitura', 'descending')])
+        resultado = resultado.slice(0, tamanho - len(linhas))
+        linhas.extend(zip(*(resultado.column(coluna).to_pylist() for coluna in colunas)))
+    return linhas
+
+
+def resumir_arquivo(tabela, granularidade, inicio, fim, limite_minimo, limite_maximo, id_sensor=None,
+                    diretorio=DIRETORIO_PADRAO):
+    """
+    Agrega as leituras arquivadas por período, no formato de `resumos.consultar_resumo`.
+
+    Usada para os períodos que as tabelas de resumo não cobrem (por exemplo,
+    leituras arquivadas antes de o resumo existir).
+
+    :param granularidade: 'MINUTO', 'HORA' ou 'DIA'.
+    :param limite_minimo, limite_maximo: Faixa ideal de valores (fora dela conta em fora_limite).
+    :return: Lista de tuplas (periodo, minimo, maximo, media, quantidade, fora_limite) em ordem de período.
+    """
+    leituras = ler_arquivo(tabela, inicio, fim, id_sensor, colunas=['hora_leitura', 'valor'], diretorio=diretorio)
+    if not leituras.num_rows:
+        return []
+    valor = leituras.column('valor')
+    fora = pc.or_(pc.less(valor, limite_minimo), pc.greater(valor, limite_maximo))
+    periodos = pa.table({
+        'periodo': pc.floor_temporal(leituras.column('hora_leitura'), unit=UNIDADES_GRANULARIDADE[granularidade]),
+        'valor': valor,
+        'fora': pc.cast(fora, pa.int64()),
+    })
+    agregado = periodos.group_by('periodo').aggregate([
+        ('valor', 'min'), ('valor', 'max'), ('valor', 'mean'), ('valor', 'count'), ('fora', 'sum'),
+    ]).sort_by('periodo')
+    colunas = ['periodo', 'valor_min', 'valor_max', 'valor_mean', 'valor_count', 'fora_sum']
+    return list(zip(*(agregado.column(coluna).to_pylist() for coluna in colunas)))
+
+
+def inicio_arquivo(tabela, diretorio=DIRETORIO_PADRAO):
+    """
+    :return: datetime do primeiro dia com leituras arquivadas, ou None se não houver arquivo.
+    """
+    dias = _dias_arquivados(tabela, diretorio)
+    return datetime.strptime(dias[0], '%Y-%m-%d') if dias else None
+
+
+def inicio_dados_quentes(tabela, diretorio=DIRETORIO_PADRAO):
+    """
+    Lê o corte gravado pelo último arquivamento da tabela.
+
+    As leituras com hora_leitura anterior ao corte podem estar no arquivo frio;
+    as posteriores estão sempre no banco.
+
+    :return: datetime do corte, ou None se a tabela nunca foi arquivada.
+    """
+    return _ler_corte(_diretorio_tabela(tabela, diretorio))
+
+
+def main():
+    from scripts.connect_db import conectar_banco, fechar_conexao, fechar_pool
+
+    parser = argparse.ArgumentParser(description="Arquiva leituras antigas em Parquet.")
+    parser.add_argument('--idade-dias', type=int, default=IDADE_PADRAO_DIAS,
+                        help="Leituras mais antigas que isso são arquivadas")
+    parser.add_argument('--tabelas', nargs='+', choices=list(TABELAS_ARQUIVO), help="Tabelas a arquivar")
+    parser.add_argument('--lote', type=int, default=LOTE_PADRAO, help="Linhas por lote")
+    args = parser.parse_args()
+
+    conn = conectar_banco()
+    if not conn:
+        return
+    try:
+        resultado = arquivar(conn, args.idade_dias, args.tabelas, lote=args.lote)
+        for tabela, quantidade in resultado.items():
+            print(f"{tabela}: {quantidade} leituras arquivadas")
+    finally:
+        fechar_conexao(conn)
+        fechar_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark da leitura de consultas para DataFrame.
+
+Compara, para várias quantidades de linhas, três caminhos:
+    read_sql   - pd.read_sql sobre o engine SQLAlchemy (caminho anterior de carregar_dados_umidade)
+    fetchall   - cursor.fetchall() e pd.DataFrame das tuplas (caminho anterior do histórico)
+    arrow      - consultar_dataframe (fetch_df_all do python-oracledb 3.x: colunas Arrow preenchidas pelo driver)
+
+Por padrão as linhas são geradas pelo próprio banco (CONNECT BY sobre DUAL) no
+formato de LEITURA_SENSOR_UMIDADE, sem depender de dados gravados; com
+--tabela a consulta lê as leituras reais.
+
+Uso:
+    python src/scripts/benchmark_consulta_arrow.py --linhas 10000 100000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+# Permite executar o script diretamente (python src/scripts/benchmark_consulta_arrow.py)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.connect_db import conectar_banco, fechar_conexao, fechar_pool, obter_engine
+from scripts.consulta_banco import consultar_dataframe
+
+CONSULTA_SINTETICA = """
+    SELECT LEVEL AS id_leitura_umidade,
+           MOD(LEVEL, 10) + 1 AS id_sensor_umidade,
+           TRUNC(SYSDATE) - FLOOR(LEVEL / 43200) AS data_leitura,
+           CAST(SYSDATE AS TIMESTAMP) - NUMTODSINTERVAL(2 * LEVEL, 'SECOND') AS hora_leitura,
+           ROUND(50 + 10 * SIN(LEVEL / 500), 2) AS valor_umidade_leitura
+    FROM dual
+    CONNECT BY LEVEL <= :linhas
+"""
+
+CONSULTA_TABELA = """
+    SELECT id_leitura_umidade, id_sensor_umidade, data_leitura, hora_leitura, valor_umidade_leitura
+    FROM LEITURA_SENSOR_UMIDADE
+    FETCH FIRST :linhas ROWS ONLY
+"""
+
+
+def via_read_sql(conn, sql, parametros):
+    return pd.read_sql(sql, obter_engine(), params=parametros)
+
+
+def via_fetchall(conn, sql, parametros):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, parametros)
+        colunas = [coluna[0].lower() for coluna in cursor.description]
+        return pd.DataFrame(cursor.fetchall(), columns=colunas)
+    finally:
+        cursor.close()
+
+
+def via_arrow(conn, sql, parametros):
+    return consultar_dataframe(conn, sql, parametros)
+
+
+CAMINHOS = {'read_sql': via_read_sql, 'fetchall': via_fetchall, 'arrow': via_arrow}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da leitura de consultas para DataFrame.")
+    parser.add_argument('--linhas', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help="Quantidades de linhas a medir")
+    parser.add_argument('--tabela', action='store_true', help="Lê LEITURA_SENSOR_UMIDADE em vez de linhas geradas")
+    parser.add_argument('--repeticoes', type=int, default=3, help="Execuções por caminho (vale a melhor)")
+    args = parser.parse_args()
+
+    sql = CONSULTA_TABELA if args.tabela else CONSULTA_SINTETICA
+    conn = conectar_banco()
+    if not conn:
+        return
+    try:
+        print(f"{'linhas':>10} {'caminho':>10} {'tempo (s)':>10} {'linhas/s':>12} {'memória (MB)':>13}")
+        for quantidade in args.linhas:
+            for nome, caminho in CAMINHOS.items():
+                tempos = []
+                for _ in range(args.repeticoes):
+                    inicio = time.perf_counter()
+                    df = caminho(conn, sql, {'linhas': quantidade})
+                    tempos.append(time.perf_counter() - inicio)
+                melhor = min(tempos)
+                memoria = df.memory_usage(deep=True).sum() / 1e6
+                print(f"{len(df):>10} {nome:>10} {melhor:>10.3f} {len(df) / melhor:>12,.0f} {memoria:>13.1f}")
+    finally:
+        fechar_conexao(conn)
+        fechar_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark da partida a frio do dashboard.
+
+Mede, sempre em processos novos:
+    servidor   - tempo até o `streamlit run` responder em /_stcore/health
+    primeira   - por página, a primeira execução do app.py (importações incluídas),
+                 que é o que o primeiro acesso espera até a página aparecer
+    reexecucao - a execução seguinte da mesma página, com os módulos já importados
+
+As execuções do script usam o AppTest do Streamlit, sem navegador. As páginas
+que consultam o banco ou as APIs externas incluem esse tempo na medida.
+
+Uso (a partir da raiz do repositório):
+    python src/scripts/benchmark_inicio_app.py --repeticoes 3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+CAMINHO_APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+TEMPO_MAXIMO = 120
+
+PAGINAS_PADRAO = [
+    "Exibir Dados do Sensor de Umidade",
+    "Consultar Previsão do Tempo",
+    "Predição de Irrigação",
+    "Simulador Wokwi",
+]
+
+# Os processos medidos não abrem endpoints de métricas (evita conflito de porta)
+AMBIENTE = {**os.environ, 'METRICAS_PORTA': '0'}
+
+
+def medir_servidor(porta):
+    """:return: Segundos até o servidor Streamlit responder, ou None se não responder a tempo."""
+    comando = [sys.executable, '-m', 'streamlit', 'run', CAMINHO_APP,
+               '--server.headless', 'true', '--server.port', str(porta)]
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(comando, env=AMBIENTE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - inicio < TEMPO_MAXIMO:
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{porta}/_stcore/health', timeout=1) as resposta:
+                    if resposta.status == 200:
+                        return time.perf_counter() - inicio
+            except OSError:
+                time.sleep(0.05)
+        return None
+    finally:
+        processo.terminate()
+        processo.wait()
+
+
+def medir_pagina(pagina):
+    """Executa a página duas vezes neste processo e retorna as durações (usado pelo subprocesso)."""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(CAMINHO_APP, default_timeout=TEMPO_MAXIMO)
+    app.session_state['selected_button'] = pagina
+
+    inicio = time.perf_counter()
+    app.run()
+    primeira = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    app.run()
+    reexecucao = time.perf_counter() - inicio
+    return {'primeira': primeira, 'reexecucao': reexecucao, 'modulos': len(sys.modules)}
+
+
+def medir_pagina_em_processo_novo(pagina):
+    resultado = subprocess.run(
+        [sys.executable, __file__, '--pagina', pagina],
+        env=AMBIENTE, capture_output=True, text=True, timeout=TEMPO_MAXIMO * 2
+    )
+    # A última linha da saída é o JSON da medida; o restante é log do app
+    return json.loads(resultado.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da partida a frio do dashboard.")
+    parser.add_argument('--paginas', nargs='+', default=PAGINAS_PADRAO, help="Páginas a medir")
+    parser.add_argument('--repeticoes', type=int, default=3, help="Medidas por página (vale a mediana)")
+    parser.add_argument('--porta', type=int, default=8599, help="Porta do servidor Streamlit medido")
+    parser.add_argument('--pagina', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.pagina:
+        print(json.dumps(medir_pagina(args.pagina)))
+        return
+
+    servidor = sorted(filter(None, (medir_servidor(args.porta) for _ in range(args.repeticoes))))
+    if servidor:
+        print(f"Servidor pronto em {servidor[len(servidor) // 2] * 1000:.0f} ms (mediana)")
+    else:
+        print("Servidor não respondeu no tempo máximo")
+
+    print(f"\n{'página':<36} {'primeira (ms)':>14} {'reexecução (ms)':>16} {'módulos':>8}")
+    for pagina in args.paginas:
+        medidas = [medir_pagina_em_processo_novo(pagina) for _ in range(args.repeticoes)]
+        mediana = sorted(medidas, key=lambda medida: medida['primeira'])[len(medidas) // 2]
+        print(f"{pagina:<36} {mediana['primeira'] * 1000:>14.0f} {mediana['reexecucao'] * 1000:>16.0f} "
+              f"{mediana['modulos']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Benchmark dos motores de ingestão (threads x asyncio) no simulador de frota.
+
+Para cada quantidade de dispositivos executa o simulador (broker e banco
+locais) com os dois motores de `mqtt_client.py` e compara vazão, latência
+ponta a ponta e perdas. A latência simulada do banco é o que diferencia os
+motores: o de threads grava um lote por vez, o asyncio mantém vários em
+andamento.
+
+Uso:
+    python src/scripts/benchmark_motores_ingestao.py --dispositivos 1000 5000 10000 --latencia-banco-ms 20
+"""
+import argparse
+import os
+import sys
+
+# Permite executar o script diretamente (python src/scripts/benchmark_motores_ingestao.py)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import simulador_frota
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos motores de ingestão.")
+    parser.add_argument('--dispositivos', type=int, nargs='+', default=[1000, 5000, 10000],
+                        help="Quantidades de dispositivos virtuais")
+    parser.add_argument('--intervalo', type=float, default=2.0, help="Segundos entre leituras de cada sensor")
+    parser.add_argument('--duracao', type=float, default=30.0, help="Duração de cada execução em segundos")
+    parser.add_argument('--latencia-banco-ms', type=float, default=20.0, help="Ida e volta simulada do banco")
+    parser.add_argument('--custo-linha-us', type=float, default=20.0, help="Custo simulado por linha inserida")
+    args = parser.parse_args()
+
+    resultados = []
+    for dispositivos in args.dispositivos:
+        for motor in ('threads', 'asyncio'):
+            relatorio = simulador_frota.executar(
+                dispositivos, args.intervalo, args.intervalo, args.duracao,
+                args.latencia_banco_ms, args.custo_linha_us, motor
+            )
+            resultados.append((dispositivos, motor, relatorio))
+
+    print(f"\n{'dispositivos':>12} {'motor':>8} {'msgs/s':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} "
+          f"{'perdidas':>9} {'commits':>8}")
+    for dispositivos, motor, relatorio in resultados:
+        print(f"{dispositivos:>12} {motor:>8} {relatorio['vazao_msgs_s']:>9.0f} "
+              f"{relatorio['latencia_p50_ms']:>9.0f} {relatorio['latencia_p99_ms']:>9.0f} "
+              f"{relatorio['perdidas']:>9} {relatorio['commits']:>8}")
+
+
+if __name__ == "__main__":
+    main()
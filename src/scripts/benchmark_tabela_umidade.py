@@ -0,0 +1,91 @@
+"""
+Benchmark da preparação da tabela do histórico de umidade.
+
+Compara, para tabelas de vários tamanhos, o caminho antigo (strftime nas
+colunas de data/hora e Styler.applymap célula a célula) com o atual
+(`preparar_tabela_umidade`: datetimes nativos e status vetorizado). Em ambos
+os casos é medida também a serialização em Arrow, que é o que o
+`st.dataframe` envia ao navegador; para o Styler, inclui o cálculo dos estilos.
+
+Uso:
+    python src/scripts/benchmark_tabela_umidade.py --linhas 10000 100000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Permite executar o script diretamente (python src/scripts/benchmark_tabela_umidade.py)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.tabela_umidade import (
+    COLUNAS_TABELA_UMIDADE, UMIDADE_MINIMA, UMIDADE_MAXIMA, preparar_tabela_umidade
+)
+
+
+def gerar_linhas(quantidade, sensores=10):
+    """Gera linhas no formato retornado pelo banco (uma leitura a cada 2 s)."""
+    rng = np.random.default_rng(42)
+    inicio = datetime(2024, 1, 1)
+    valores = rng.normal(50, 6, quantidade).round(2)
+    return [
+        (i + 1, i % sensores + 1, (inicio + timedelta(seconds=2 * i)).replace(hour=0, minute=0, second=0),
+         inicio + timedelta(seconds=2 * i), float(valores[i]))
+        for i in range(quantidade)
+    ]
+
+
+def preparar_styler(linhas):
+    """Caminho anterior: strftime nas datas e estilo aplicado célula a célula."""
+    df = pd.DataFrame(linhas, columns=COLUNAS_TABELA_UMIDADE)
+    df['Hora'] = pd.to_datetime(df['Hora']).dt.strftime('%H:%M:%S')
+    df['Data'] = pd.to_datetime(df['Data']).dt.strftime('%d/%m/%Y')
+
+    def style_umidade(val):
+        if pd.isna(val):
+            return ''
+        val = float(val)
+        if val < UMIDADE_MINIMA or val > UMIDADE_MAXIMA:
+            return 'color: red; font-weight: bold'
+        return 'color: green; font-weight: normal'
+
+    styled_df = df.style.map(style_umidade, subset=['Umidade (%)']).format({'Umidade (%)': '{:.2f}'})
+    # O Streamlit calcula os estilos e a formatação de cada célula antes de serializar
+    styled_df._compute()
+    return df
+
+
+def medir(funcao, linhas):
+    inicio = time.perf_counter()
+    df = funcao(linhas)
+    preparo = time.perf_counter() - inicio
+    pa.Table.from_pandas(df, preserve_index=False)
+    total = time.perf_counter() - inicio
+    return preparo, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da tabela do histórico de umidade.")
+    parser.add_argument('--linhas', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help="Tamanhos de tabela a medir")
+    parser.add_argument('--sem-styler', action='store_true', help="Mede apenas o caminho vetorizado")
+    args = parser.parse_args()
+
+    print(f"{'linhas':>10} {'caminho':>12} {'preparo (s)':>12} {'total (s)':>10}")
+    for quantidade in args.linhas:
+        linhas = gerar_linhas(quantidade)
+        caminhos = [('vetorizado', preparar_tabela_umidade)]
+        if not args.sem_styler:
+            caminhos.insert(0, ('styler', preparar_styler))
+        for nome, funcao in caminhos:
+            preparo, total = medir(funcao, linhas)
+            print(f"{quantidade:>10} {nome:>12} {preparo:>12.3f} {total:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+import os
+import threading
+import time
+
+import oracledb
+
+from log.logger_config import configurar_logging
+from scripts import metricas
+
+# Configura o logging
+logger = configurar_logging(__name__)
+
+# Parâmetros padrão do buffer (podem ser sobrescritos por variáveis de ambiente)
+TAMANHO_LOTE_PADRAO = int(os.getenv('BUFFER_TAMANHO_LOTE', '500'))
+LATENCIA_MAXIMA_PADRAO = float(os.getenv('BUFFER_LATENCIA_MAXIMA', '2.0'))
+# Linhas pendentes a partir das quais, com uma descarga já em andamento, o excesso vai para o spool
+LIMITE_ATRASO_PADRAO = int(os.getenv('BUFFER_LIMITE_ATRASO', '5000'))
+# Quantidade máxima de linhas recusadas registradas individualmente no log por lote
+ERROS_REGISTRADOS = 10
+
+
+def separar_recusadas(tabela, linhas, erros):
+    """
+    Separa as linhas recusadas pelo executemany com batcherrors das aceitas.
+
+    :param tabela: Tabela de destino (apenas para o log).
+    :param linhas: Linhas enviadas no executemany.
+    :param erros: Resultado de cursor.getbatcherrors().
+    :return: Tupla (linhas aceitas, linhas recusadas, motivo do primeiro erro).
+    """
+    if not erros:
+        return linhas, [], None
+    for erro in erros[:ERROS_REGISTRADOS]:
+        logger.error(f"Linha {erro.offset} do lote de '{tabela}' recusada: {erro.message}")
+    if len(erros) > ERROS_REGISTRADOS:
+        logger.error(f"... e mais {len(erros) - ERROS_REGISTRADOS} linhas recusadas em '{tabela}'.")
+    indices = {erro.offset for erro in erros}
+    aceitas = [linha for i, linha in enumerate(linhas) if i not in indices]
+    recusadas = [linha for i, linha in enumerate(linhas) if i in indices]
+    return aceitas, recusadas, erros[0].message
+
+
+class BufferEscrita:
+    """
+    Buffer de escrita (write-behind) para as leituras dos sensores.
+
+    As leituras são acumuladas por tabela de destino e gravadas em lote com
+    `executemany` quando o lote atinge `tamanho_lote` linhas ou quando a leitura
+    mais antiga ultrapassa `latencia_maxima` segundos. Cada descarga usa uma única
+    conexão e um único commit para todas as tabelas.
+
+    Se o banco estiver indisponível, ou se o buffer acumular mais de `limite_atraso`
+    linhas enquanto uma descarga está em andamento, as leituras vão para o spool
+    em disco (quando configurado) em vez de serem descartadas. Uma linha recusada
+    pelo banco (valor fora da precisão da coluna, por exemplo) não desfaz o lote:
+    o executemany usa batcherrors, as demais linhas são confirmadas e a recusada
+    vai para as rejeitadas do spool.
+    """
+
+    def __init__(self, conectar, instrucoes, antes_de_gravar=None, apos_inserir=None,
+                 tamanho_lote=TAMANHO_LOTE_PADRAO, latencia_maxima=LATENCIA_MAXIMA_PADRAO,
+                 spool=None, limite_atraso=LIMITE_ATRASO_PADRAO):
+        """
+        :param conectar: Função sem argumentos que retorna uma conexão Oracle (ou None).
+        :param instrucoes: Dicionário {tabela: INSERT com binds nomeados}.
+        :param antes_de_gravar: Função opcional (conn, lotes) chamada antes dos inserts.
+        :param apos_inserir: Função opcional (conn, lotes) chamada depois dos inserts, antes do commit.
+        :param tamanho_lote: Quantidade de linhas que dispara a descarga.
+        :param latencia_maxima: Tempo máximo, em segundos, que uma leitura espera no buffer.
+        :param spool: SpoolDisco opcional que recebe as leituras que não puderam ser gravadas.
+        :param limite_atraso: Linhas pendentes que caracterizam o banco como atrasado.
+        """
+        self.conectar = conectar
+        self.instrucoes = instrucoes
+        self.antes_de_gravar = antes_de_gravar
+        self.apos_inserir = apos_inserir
+        self.tamanho_lote = tamanho_lote
+        self.latencia_maxima = latencia_maxima
+        self.spool = spool
+        self.limite_atraso = limite_atraso
+
+        self._pendentes = {tabela: [] for tabela in instrucoes}
+        self._total_pendente = 0
+        self._mais_antiga = None
+        self._trava = threading.Lock()
+        self._trava_descarga = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+
+        self._estatisticas = {
+            'descargas': 0,
+            'linhas_gravadas': 0,
+            'linhas_descartadas': 0,
+            'linhas_spool': 0,
+            'linhas_rejeitadas': 0,
+            'ultima_descarga': {},
+            'ultima_duracao_ms': 0.0,
+        }
+
+    def adicionar(self, tabela, linha):
+        """
+        Adiciona uma leitura ao buffer da tabela informada.
+
+        :param tabela: Nome da tabela de destino (chave de `instrucoes`).
+        :param linha: Dicionário com os binds do INSERT.
+        """
+        with self._trava:
+            self._pendentes[tabela].append(linha)
+            self._total_pendente += 1
+            if self._mais_antiga is None:
+                self._mais_antiga = time.monotonic()
+            cheio = self._total_pendente >= self.tamanho_lote
+            atrasado = self._total_pendente >= self.limite_atraso
+
+        if not cheio:
+            return
+
+        if self._trava_descarga.acquire(blocking=not (atrasado and self.spool is not None)):
+            try:
+                self._descarregar()
+            finally:
+                self._trava_descarga.release()
+        else:
+            # Banco atrasado: o excesso vai para o spool em vez de acumular em memória
+            self._desviar(self._retirar_pendentes())
+
+    def atrasado(self):
+        """
+        Indica ao reenvio do spool que a ingestão ao vivo precisa do banco.
+
+        :return: True se há uma descarga em andamento ou um lote cheio esperando por ela.
+        """
+        with self._trava:
+            cheio = self._total_pendente >= self.tamanho_lote
+        return cheio or self._trava_descarga.locked()
+
+    def _retirar_pendentes(self):
+        with self._trava:
+            lotes = {tabela: linhas for tabela, linhas in self._pendentes.items() if linhas}
+            self._pendentes = {tabela: [] for tabela in self.instrucoes}
+            self._total_pendente = 0
+            self._mais_antiga = None
+        return lotes
+
+    def gravar(self, lotes):
+        """
+        Grava os lotes em uma única transação.
+
+        As linhas recusadas individualmente pelo banco vão para as rejeitadas do
+        spool; as demais são confirmadas.
+
+        :param lotes: Dicionário {tabela: [linhas]}.
+        :return: True se a transação foi confirmada, False caso contrário.
+        """
+        return self._gravar(lotes) is not None
+
+    def _gravar(self, lotes):
+        """:return: Dicionário {tabela: [linhas aceitas]} confirmado, ou None se a transação falhou."""
+        conn = self.conectar()
+        if not conn:
+            logger.error("Sem conexão com o banco para gravar o lote de leituras.")
+            return None
+
+        cursor = None
+        recusadas = {}
+        motivo = None
+        try:
+            cursor = conn.cursor()
+            if self.antes_de_gravar:
+                self.antes_de_gravar(conn, lotes)
+            aceitas = {}
+            for tabela, linhas in lotes.items():
+                with metricas.banco_execucao.labels(tabela).time():
+                    cursor.executemany(self.instrucoes[tabela], linhas, batcherrors=True)
+                aceitas[tabela], recusadas[tabela], erro = separar_recusadas(
+                    tabela, linhas, cursor.getbatcherrors()
+                )
+                motivo = motivo or erro
+            aceitas = {tabela: linhas for tabela, linhas in aceitas.items() if linhas}
+            # Os resumos consideram só as linhas que o banco aceitou
+            if self.apos_inserir:
+                self.apos_inserir(conn, aceitas)
+            with metricas.banco_commit.time():
+                conn.commit()
+        except Exception as e:
+            # Qualquer erro (do banco ou de bind) desfaz o lote, que volta ao chamador para o spool
+            logger.error(f"Erro ao gravar lote de leituras: {e}")
+            metricas.banco_falhas.inc()
+            try:
+                conn.rollback()
+            except oracledb.Error:
+                # Sessão perdida: a transação já não existe no banco
+                pass
+            return None
+        finally:
+            if cursor is not None:
+                cursor.close()
+            conn.close()
+
+        self._rejeitar({tabela: linhas for tabela, linhas in recusadas.items() if linhas}, motivo)
+        return aceitas
+
+    def _rejeitar(self, lotes, motivo):
+        total = sum(len(linhas) for linhas in lotes.values())
+        if not total:
+            return
+        if self.spool is not None:
+            self.spool.rejeitar(lotes, motivo)
+        else:
+            logger.error(f"{total} leituras recusadas pelo banco descartadas.")
+        with self._trava:
+            self._estatisticas['linhas_rejeitadas'] += total
+
+    def _desviar(self, lotes):
+        total = sum(len(linhas) for linhas in lotes.values())
+        if not total:
+            return
+        if self.spool is not None:
+            self.spool.gravar_lotes(lotes)
+            with self._trava:
+                self._estatisticas['linhas_spool'] += total
+            metricas.linhas_spool.inc(total)
+        else:
+            logger.error(f"{total} leituras descartadas.")
+            with self._trava:
+                self._estatisticas['linhas_descartadas'] += total
+
+    def _descarregar(self):
+        lotes = self._retirar_pendentes()
+        if not lotes:
+            return {}
+
+        inicio = time.perf_counter()
+        aceitas = self._gravar(lotes)
+        if aceitas is None:
+            self._desviar(lotes)
+            return {}
+
+        metricas.observar_lote(aceitas)
+        contagem = {tabela: len(linhas) for tabela, linhas in aceitas.items()}
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        with self._trava:
+            self._estatisticas['descargas'] += 1
+            self._estatisticas['linhas_gravadas'] += sum(contagem.values())
+            self._estatisticas['ultima_descarga'] = contagem
+            self._estatisticas['ultima_duracao_ms'] = duracao_ms
+        logger.info(f"Lote gravado em {duracao_ms:.1f} ms: {contagem}")
+        return contagem
+
+    def descarregar(self):
+        """
+        Grava todas as leituras pendentes em uma única transação.
+
+        :return: Dicionário {tabela: linhas gravadas} da descarga.
+        """
+        with self._trava_descarga:
+            return self._descarregar()
+
+    def _executar(self):
+        intervalo = max(self.latencia_maxima / 4, 0.05)
+        while not self._parar.wait(intervalo):
+            with self._trava:
+                vencido = (self._mais_antiga is not None
+                           and time.monotonic() - self._mais_antiga >= self.latencia_maxima)
+            if vencido:
+                self.descarregar()
+
+    def iniciar(self):
+        """Inicia a thread que descarrega o buffer por tempo."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._executar, name="buffer-escrita", daemon=True)
+            self._thread.start()
+
+    def parar(self):
+        """Interrompe a thread de descarga e grava o que ainda estiver pendente."""
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.descarregar()
+
+    def estatisticas(self):
+        """
+        Retorna uma cópia das estatísticas do buffer.
+
+        :return: Dicionário com descargas, linhas gravadas/descartadas/no spool/rejeitadas, pendentes e a última descarga.
+        """
+        with self._trava:
+            estatisticas = dict(self._estatisticas)
+            estatisticas['pendentes'] = self._total_pendente
+        estatisticas['tamanho_lote'] = self.tamanho_lote
+        estatisticas['latencia_maxima'] = self.latencia_maxima
+        return estatisticas
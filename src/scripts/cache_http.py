@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+import requests
+
+from log.logger_config import configurar_logging
+from scripts import metricas
+
+# Configura o logging
+logger = configurar_logging(__name__)
+
+DIRETORIO_PADRAO = os.getenv(
+    'CACHE_HTTP_DIRETORIO',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache_http')
+)
+
+# Tempo de validade (segundos) de cada fonte; depois disso a resposta é servida
+# como "stale" enquanto uma atualização roda em segundo plano
+TTL_FONTES = {
+    'openweather_coordenadas': int(os.getenv('CACHE_TTL_COORDENADAS', str(30 * 24 * 3600))),
+    'openweather_previsao': int(os.getenv('CACHE_TTL_PREVISAO', str(30 * 60))),
+    'nasa_power': int(os.getenv('CACHE_TTL_NASA', str(7 * 24 * 3600))),
+}
+
+
+class CacheHTTP:
+    """
+    Cache em disco de respostas JSON com stale-while-revalidate.
+
+    Cada resposta é guardada num arquivo identificado pela fonte, URL e parâmetros.
+    Dentro do TTL da fonte a resposta é servida direto do disco; depois do TTL ela
+    continua sendo servida imediatamente, enquanto uma thread busca a versão nova.
+    Só há espera pela rede quando a entrada ainda não existe.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_PADRAO, ttl_fontes=None):
+        self.diretorio = diretorio
+        self.ttl_fontes = ttl_fontes or TTL_FONTES
+        self.sessao = requests.Session()
+        self._atualizando = set()
+        self._trava = threading.Lock()
+        os.makedirs(diretorio, exist_ok=True)
+
+    def _chave(self, fonte, url, params):
+        conteudo = json.dumps([fonte, url, sorted((params or {}).items())], default=str)
+        return hashlib.sha256(conteudo.encode()).hexdigest()
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, f"{chave}.json")
+
+    def _ler(self, chave):
+        try:
+            with open(self._caminho(chave), encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _salvar(self, chave, dados):
+        descritor, temporario = tempfile.mkstemp(dir=self.diretorio, suffix='.tmp')
+        with os.fdopen(descritor, 'w', encoding='utf-8') as f:
+            json.dump({'salvo_em': time.time(), 'dados': dados}, f)
+        os.replace(temporario, self._caminho(chave))
+
+    def _buscar(self, fonte, chave, url, params, timeout):
+        with metricas.dashboard_http.labels(fonte).time():
+            response = self.sessao.get(url, params=params, timeout=timeout)
+        response.raise_for_status()
+        dados = response.json()
+        self._salvar(chave, dados)
+        return dados
+
+    def _atualizar_em_segundo_plano(self, fonte, chave, url, params, timeout):
+        with self._trava:
+            if chave in self._atualizando:
+                return
+            self._atualizando.add(chave)
+
+        def atualizar():
+            try:
+                self._buscar(fonte, chave, url, params, timeout)
+                logger.info(f"Cache atualizado em segundo plano: {url}")
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.error(f"Erro ao atualizar cache de {url}: {e}")
+            finally:
+                with self._trava:
+                    self._atualizando.discard(chave)
+
+        threading.Thread(target=atualizar, name="cache-http", daemon=True).start()
+
+    def obter_json(self, fonte, url, params=None, timeout=10):
+        """
+        Retorna a resposta JSON de uma requisição GET, usando o cache.
+
+        :param fonte: Nome da fonte (chave de TTL_FONTES).
+        :param url: URL da requisição.
+        :param params: Parâmetros da query string.
+        :param timeout: Timeout, em segundos, da requisição.
+        :return: Conteúdo JSON da resposta.
+        :raises requests.exceptions.RequestException: Se não houver cache e a requisição falhar.
+        """
+        chave = self._chave(fonte, url, params)
+        entrada = self._ler(chave)
+        if entrada is None:
+            return self._buscar(fonte, chave, url, params, timeout)
+
+        if time.time() - entrada['salvo_em'] >= self.ttl_fontes[fonte]:
+            self._atualizar_em_segundo_plano(fonte, chave, url, params, timeout)
+        return entrada['dados']
+
+
+# Cache compartilhado pelo processo
+cache_http = CacheHTTP()
@@ -1,3 +1,5 @@
+import threading
+
 import oracledb
 from dotenv import load_dotenv
 from log.logger_config import configurar_logging
@@ -5,41 +7,165 @@ import os
 import streamlit as st
 
 # Configura o logging
-logger = configurar_logging()
+logger = configurar_logging(__name__)
 
-def conectar_banco():
+load_dotenv()  # Carrega as variáveis de ambiente
+
+# Parâmetros do pool de sessões (podem ser ajustados por variáveis de ambiente)
+POOL_MINIMO = int(os.getenv('DB_POOL_MIN', '1'))
+POOL_MAXIMO = int(os.getenv('DB_POOL_MAX', '8'))
+POOL_INCREMENTO = int(os.getenv('DB_POOL_INCREMENTO', '1'))
+CACHE_INSTRUCOES = int(os.getenv('DB_CACHE_INSTRUCOES', '50'))
+# Sessões ociosas há mais de N segundos são testadas (ping) ao serem obtidas; 0 testa sempre
+INTERVALO_PING = int(os.getenv('DB_POOL_PING', '60'))
+# Máximo de sessões do pool assíncrono (poucas sessões, com várias gravações em andamento)
+POOL_ASSINCRONO_MAXIMO = int(os.getenv('DB_POOL_ASYNC_MAX', '4'))
+
+_pool = None
+_engine = None
+_trava = threading.Lock()
+
+def obter_credenciais():
     """
-    Conecta ao banco de dados Oracle utilizando as variáveis de ambiente.
-    
-    :return: Objeto de conexão ou None em caso de erro.
+    Lê as credenciais do banco das variáveis de ambiente ou do secrets do Streamlit.
+
+    :return: Tupla (user, password, dsn).
     """
-    load_dotenv()  # Carrega as variáveis de ambiente
     user = os.getenv('DB_USER') or st.secrets["database"]["user"]
-    password = os.getenv('DB_PASSWORD') or st.secrets["database"]["password"] 
+    password = os.getenv('DB_PASSWORD') or st.secrets["database"]["password"]
     dsn = os.getenv('DB_DSN') or st.secrets["database"]["dsn"]
+    return user, password, dsn
 
-    # Verificar se as variáveis de ambiente foram carregadas
-    if not all([user, password, dsn]):
-        logger.error("Uma ou mais variáveis de ambiente não estão definidas.")
+def obter_pool():
+    """
+    Retorna o pool de sessões Oracle do processo, criando-o na primeira chamada.
+
+    :return: Objeto oracledb.ConnectionPool ou None em caso de erro.
+    """
+    global _pool
+    if _pool is not None:
+        return _pool
+
+    with _trava:
+        if _pool is not None:
+            return _pool
+
+        user, password, dsn = obter_credenciais()
+
+        # Verificar se as variáveis de ambiente foram carregadas
+        if not all([user, password, dsn]):
+            logger.error("Uma ou mais variáveis de ambiente não estão definidas.")
+            return None
+
+        try:
+            _pool = oracledb.create_pool(
+                user=user,
+                password=password,
+                dsn=dsn,
+                min=POOL_MINIMO,
+                max=POOL_MAXIMO,
+                increment=POOL_INCREMENTO,
+                stmtcachesize=CACHE_INSTRUCOES,
+                ping_interval=INTERVALO_PING,
+                getmode=oracledb.POOL_GETMODE_WAIT
+            )
+            logger.info(f"Pool de sessões criado (min={POOL_MINIMO}, max={POOL_MAXIMO}).")
+        except oracledb.DatabaseError as e:
+            logger.error(f"Erro ao criar pool de sessões: {e}")
+            return None
+
+    return _pool
+
+def conectar_banco():
+    """
+    Obtém uma sessão do pool compartilhado do processo.
+
+    :return: Objeto de conexão ou None em caso de erro.
+    """
+    pool = obter_pool()
+    if pool is None:
         return None
 
     try:
-        conn = oracledb.connect(user=user, password=password, dsn=dsn)
-        logger.info("Conectado ao banco de dados.")
-        return conn
+        return pool.acquire()
     except oracledb.DatabaseError as e:
         logger.error(f"Erro ao conectar ao banco de dados: {e}")
         return None
 
 def fechar_conexao(conn):
     """
-    Fecha a conexão com o banco de dados.
+    Devolve a conexão ao pool de sessões.
 
     :param conn: Objeto de conexão com o banco de dados.
     """
     if conn:
         conn.close()
-        logger.info("Conexão com o banco de dados encerrada.")
+
+def obter_engine():
+    """
+    Retorna um engine SQLAlchemy que reutiliza as sessões do pool oracledb.
+
+    :return: Objeto sqlalchemy.Engine ou None em caso de erro.
+    """
+    global _engine
+    if _engine is not None:
+        return _engine
+
+    pool = obter_pool()
+    if pool is None:
+        return None
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import NullPool
+
+    with _trava:
+        if _engine is None:
+            # NullPool: o SQLAlchemy não mantém conexões próprias, quem faz o pooling é o oracledb
+            _engine = create_engine("oracle+oracledb://", creator=pool.acquire, poolclass=NullPool)
+    return _engine
+
+def criar_pool_assincrono():
+    """
+    Cria um pool de sessões assíncrono (API asyncio do oracledb) para o motor de ingestão assíncrono.
+
+    O pool pertence ao loop de eventos que o usa; quem o cria é responsável por fechá-lo.
+
+    :return: Objeto oracledb.AsyncConnectionPool ou None em caso de erro.
+    """
+    user, password, dsn = obter_credenciais()
+    if not all([user, password, dsn]):
+        logger.error("Uma ou mais variáveis de ambiente não estão definidas.")
+        return None
+
+    try:
+        pool = oracledb.create_pool_async(
+            user=user,
+            password=password,
+            dsn=dsn,
+            min=POOL_MINIMO,
+            max=POOL_ASSINCRONO_MAXIMO,
+            increment=POOL_INCREMENTO,
+            stmtcachesize=CACHE_INSTRUCOES,
+            ping_interval=INTERVALO_PING,
+            getmode=oracledb.POOL_GETMODE_WAIT
+        )
+        logger.info(f"Pool de sessões assíncrono criado (max={POOL_ASSINCRONO_MAXIMO}).")
+        return pool
+    except oracledb.DatabaseError as e:
+        logger.error(f"Erro ao criar pool de sessões assíncrono: {e}")
+        return None
+
+def fechar_pool():
+    """Fecha o pool de sessões do processo, se existir."""
+    global _pool, _engine
+    with _trava:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+        if _pool is not None:
+            _pool.close(force=True)
+            _pool = None
+            logger.info("Pool de sessões encerrado.")
 
 def main():
     # Conecta ao banco de dados
@@ -48,6 +174,7 @@ def main():
         # Configura o banco de dados
        # setup_banco_dados(conn)
         fechar_conexao(conn)
+    fechar_pool()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
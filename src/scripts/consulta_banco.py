@@ -1,12 +1,49 @@
 import os
-from sqlalchemy import create_engine
+from datetime import timedelta
+
+import numpy as np
 import pandas as pd
-import streamlit as st
+import pyarrow as pa
+
+from scripts import metricas
+
+# Linhas por ida e volta ao banco nas consultas colunares
+TAMANHO_LOTE_ARROW = int(os.getenv('CONSULTA_TAMANHO_LOTE', '10000'))
+
+def consultar_arrow(conn, sql, parametros=None, tamanho_lote=TAMANHO_LOTE_ARROW):
+    """
+    Executa uma consulta e retorna o resultado em colunas Arrow.
+
+    Usa `Connection.fetch_df_all` (python-oracledb 3.x): o driver preenche os
+    buffers Arrow diretamente, sem criar um objeto Python por célula, lendo
+    `tamanho_lote` linhas por ida e volta ao banco.
+
+    Args:
+    conn: Conexão com o banco de dados.
+    sql: Consulta SELECT.
+    parametros: Binds da consulta.
+    tamanho_lote: Linhas por ida e volta ao banco.
+
+    Returns:
+    pyarrow.Table: Resultado, com os nomes de coluna em minúsculas.
+    """
+    with metricas.dashboard_consulta.time():
+        resultado = conn.fetch_df_all(sql, parametros or {}, arraysize=tamanho_lote)
+        nomes = [nome.lower() for nome in resultado.column_names()]
+        return pa.Table.from_arrays(resultado.column_arrays(), names=nomes)
+
+def consultar_dataframe(conn, sql, parametros=None, tamanho_lote=TAMANHO_LOTE_ARROW):
+    """
+    Executa uma consulta e retorna um DataFrame construído a partir das colunas Arrow.
 
-class Config:
-    user = os.getenv('DB_USER') or st.secrets["database"]["user"]
-    password = os.getenv('DB_PASSWORD') or st.secrets["database"]["password"] 
-    dsn = os.getenv('DB_DSN') or st.secrets["database"]["dsn"]
+    Colunas numéricas sem nulos são repassadas ao pandas sem cópia; a tabela
+    Arrow é liberada durante a conversão.
+
+    Returns:
+    pandas.DataFrame: Resultado da consulta.
+    """
+    tabela = consultar_arrow(conn, sql, parametros, tamanho_lote)
+    return tabela.to_pandas(split_blocks=True, self_destruct=True)
 
 def carregar_dados_umidade(conn, logging):
     """
@@ -21,9 +58,6 @@ def carregar_dados_umidade(conn, logging):
     pandas.DataFrame: DataFrame contendo os dados de leitura e umidade com o estado da bomba.
     """
     try:
-        # Conexão usando SQLAlchemy com o Oracle
-        engine = create_engine(f'oracle+oracledb://{Config.user}:{Config.password}@{Config.dsn}')
-        
         # Query para carregar apenas dados de leitura e umidade
         query = """
         SELECT 
@@ -34,15 +68,15 @@ def carregar_dados_umidade(conn, logging):
             data_leitura ASC
         """
         
-        # Executa a query e carrega os dados em um DataFrame
-        df = pd.read_sql(query, engine)
+        # Executa a query e carrega os dados em um DataFrame (via colunas Arrow)
+        df = consultar_dataframe(conn, query)
         logging.info("Dados de umidade carregados do banco com sucesso.")
         
         # Formatando a coluna 'hora_leitura' para exibir apenas horas, minutos e segundos
         df['hora_leitura'] = pd.to_datetime(df['hora_leitura']).dt.strftime('%H:%M:%S')
         
         # Adicionar coluna com o estado da bomba
-        df['estado_bomba'] = df['valor_umidade_leitura'].apply(lambda x: "bomba ligada" if x < 50 else "bomba desligada")
+        df['estado_bomba'] = np.where(df['valor_umidade_leitura'] < 50, "bomba ligada", "bomba desligada")
         
         # Configurações de exibição para mostrar todas as colunas no terminal
         pd.set_option('display.max_columns', None)  # Mostra todas as colunas
@@ -58,3 +92,276 @@ def carregar_dados_umidade(conn, logging):
         logging.error(f"Erro ao carregar dados de umidade do banco: {e}")
         print("Erro ao carregar dados de umidade do banco.")
         return None
+
+
+def consultar_pagina_umidade(conn, inicio, fim, id_sensor=None, apos=None, tamanho=100, corte=None):
+    """
+    Consulta uma página do histórico de umidade com paginação por chave.
+
+    A ordenação é (hora_leitura, id_leitura_umidade) decrescente, servida pelos
+    índices LEITURA_SENSOR_UMIDADE_HORA_IX e LEITURA_SENSOR_UMIDADE_SENSOR_IX.
+    Quando a página alcança leituras anteriores ao `corte` do arquivo frio, as
+    linhas arquivadas entram na mesma ordenação e a chave continua valendo para
+    as duas origens.
+
+    Args:
+    conn: Conexão com o banco de dados.
+    inicio, fim: Intervalo [inicio, fim) de hora_leitura.
+    id_sensor: Sensor a filtrar (None para todos).
+    apos: Chave (hora_leitura, id_leitura_umidade) da última linha da página anterior.
+    tamanho: Quantidade de linhas por página.
+    corte: Corte do arquivo frio (`arquivo_frio.inicio_dados_quentes`), None se não houver arquivo.
+
+    Returns:
+    tuple: (linhas, chave da última linha ou None se não houver próxima página).
+    """
+    filtros = ["hora_leitura >= :inicio", "hora_leitura < :fim"]
+    parametros = {'inicio': inicio, 'fim': fim, 'tamanho': tamanho + 1}
+    if id_sensor is not None:
+        filtros.append("id_sensor_umidade = :id_sensor")
+        parametros['id_sensor'] = id_sensor
+    if apos is not None:
+        filtros.append("(hora_leitura < :apos_hora OR (hora_leitura = :apos_hora AND id_leitura_umidade < :apos_id))")
+        parametros['apos_hora'], parametros['apos_id'] = apos
+
+    cursor = conn.cursor()
+    try:
+        cursor.arraysize = tamanho + 1
+        with metricas.dashboard_consulta.time():
+            cursor.execute(f"""
+                SELECT id_leitura_umidade, id_sensor_umidade, data_leitura, hora_leitura, valor_umidade_leitura
+                FROM LEITURA_SENSOR_UMIDADE
+                WHERE {' AND '.join(filtros)}
+                ORDER BY hora_leitura DESC, id_leitura_umidade DESC
+                FETCH FIRST :tamanho ROWS ONLY
+            """, parametros)
+            linhas = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    # Só há linhas arquivadas antes do corte: basta ler o arquivo se o banco não completou
+    # a página com leituras posteriores a ele
+    if corte is not None and inicio < corte and (len(linhas) <= tamanho or linhas[-1][3] < corte):
+        from scripts.arquivo_frio import ler_pagina_arquivo
+
+        with metricas.dashboard_consulta.time():
+            arquivadas = ler_pagina_arquivo(
+                'LEITURA_SENSOR_UMIDADE', inicio, min(fim, corte), id_sensor, apos, tamanho + 1
+            )
+        # Por id: um lote interrompido entre a gravação e o DELETE aparece nas duas origens
+        unicas = {linha[0]: linha for linha in arquivadas}
+        unicas.update((linha[0], linha) for linha in linhas)
+        linhas = sorted(unicas.values(), key=lambda linha: (linha[3], linha[0]), reverse=True)[:tamanho + 1]
+
+    # Uma linha a mais indica que existe próxima página
+    if len(linhas) > tamanho:
+        linhas = linhas[:tamanho]
+        ultima = linhas[-1]
+        return linhas, (ultima[3], ultima[0])
+    return linhas, None
+
+def consultar_serie_umidade(conn, inicio, fim, id_sensor=None, limite=50000):
+    """
+    Consulta as leituras brutas de umidade de uma janela, para o gráfico.
+
+    Usada quando a janela é curta demais para as tabelas de resumo; o resultado
+    é reduzido ao orçamento de pontos do gráfico antes de ser plotado.
+
+    Args:
+    conn: Conexão com o banco de dados.
+    inicio, fim: Intervalo [inicio, fim) de hora_leitura.
+    id_sensor: Sensor a filtrar (None para todos).
+    limite: Quantidade máxima de linhas lidas.
+
+    Returns:
+    pandas.DataFrame: Colunas id_sensor_umidade, hora_leitura e valor_umidade_leitura, em ordem de hora.
+    """
+    filtros = ["hora_leitura >= :inicio", "hora_leitura < :fim"]
+    parametros = {'inicio': inicio, 'fim': fim, 'limite': limite}
+    if id_sensor is not None:
+        filtros.append("id_sensor_umidade = :id_sensor")
+        parametros['id_sensor'] = id_sensor
+
+    return consultar_dataframe(conn, f"""
+        SELECT id_sensor_umidade, hora_leitura, valor_umidade_leitura
+        FROM LEITURA_SENSOR_UMIDADE
+        WHERE {' AND '.join(filtros)}
+        ORDER BY hora_leitura, id_leitura_umidade
+        FETCH FIRST :limite ROWS ONLY
+    """, parametros)
+
+def consultar_novas_umidade(conn, apos_id=None, id_sensor=None, limite=2000):
+    """
+    Consulta as leituras de umidade acima de uma marca d'água (id da última leitura vista).
+
+    Sem marca d'água, retorna as `limite` leituras mais recentes, para iniciar o
+    painel ao vivo. A consulta usa a chave primária de LEITURA_SENSOR_UMIDADE.
+
+    Args:
+    conn: Conexão com o banco de dados.
+    apos_id: Maior id_leitura_umidade já lido (None para começar pelas mais recentes).
+    id_sensor: Sensor a filtrar (None para todos).
+    limite: Quantidade máxima de linhas lidas.
+
+    Returns:
+    list: Tuplas (id_leitura_umidade, id_sensor_umidade, hora_leitura, valor_umidade_leitura) em ordem de id.
+    """
+    filtros = []
+    parametros = {'limite': limite}
+    if id_sensor is not None:
+        filtros.append("id_sensor_umidade = :id_sensor")
+        parametros['id_sensor'] = id_sensor
+    if apos_id is not None:
+        filtros.append("id_leitura_umidade > :apos_id")
+        parametros['apos_id'] = apos_id
+    where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+    # Sem marca d'água, as mais recentes são lidas em ordem decrescente e invertidas
+    ordem = "ASC" if apos_id is not None else "DESC"
+
+    cursor = conn.cursor()
+    try:
+        cursor.arraysize = limite
+        with metricas.dashboard_consulta.time():
+            cursor.execute(f"""
+                SELECT id_leitura_umidade, id_sensor_umidade, hora_leitura, valor_umidade_leitura
+                FROM LEITURA_SENSOR_UMIDADE
+                {where}
+                ORDER BY id_leitura_umidade {ordem}
+                FETCH FIRST :limite ROWS ONLY
+            """, parametros)
+            linhas = cursor.fetchall()
+    finally:
+        cursor.close()
+    return linhas if apos_id is not None else linhas[::-1]
+
+def consultar_atrasadas_umidade(conn, apos_id, desde, vistos, id_sensor=None):
+    """
+    Consulta as leituras com id abaixo da marca d'água que só ficaram visíveis depois dela.
+
+    Com vários workers gravando ao mesmo tempo (e identidades com CACHE), uma
+    transação com ids menores pode confirmar depois de outra com ids maiores, que
+    já levou a marca d'água adiante. Os ids abaixo da marca com hora_leitura a
+    partir de `desde` são listados só pelos índices (hora_leitura, id); apenas os
+    que não estão em `vistos` são lidos.
+
+    Args:
+    conn: Conexão com o banco de dados.
+    apos_id: Marca d'água atual (maior id_leitura_umidade já lido).
+    desde: Início da janela de reverificação em hora_leitura.
+    vistos: Conjunto (ou dicionário) com os ids já lidos na janela.
+    id_sensor: Sensor a filtrar (None para todos).
+
+    Returns:
+    list: Tuplas no formato de `consultar_novas_umidade`, em ordem de id.
+    """
+    filtros = ["hora_leitura >= :desde", "id_leitura_umidade < :apos_id"]
+    parametros = {'desde': desde, 'apos_id': apos_id}
+    if id_sensor is not None:
+        filtros.append("id_sensor_umidade = :id_sensor")
+        parametros['id_sensor'] = id_sensor
+
+    cursor = conn.cursor()
+    try:
+        with metricas.dashboard_consulta.time():
+            cursor.execute(f"""
+                SELECT id_leitura_umidade
+                FROM LEITURA_SENSOR_UMIDADE
+                WHERE {' AND '.join(filtros)}
+            """, parametros)
+            faltantes = sorted({linha[0] for linha in cursor.fetchall()} - set(vistos))
+            linhas = []
+            # Normalmente vazio; em lotes de no máximo 1000 binds no IN
+            for i in range(0, len(faltantes), 1000):
+                ids = faltantes[i:i + 1000]
+                binds = ', '.join(f":id{j}" for j in range(len(ids)))
+                cursor.execute(f"""
+                    SELECT id_leitura_umidade, id_sensor_umidade, hora_leitura, valor_umidade_leitura
+                    FROM LEITURA_SENSOR_UMIDADE
+                    WHERE id_leitura_umidade IN ({binds})
+                    ORDER BY id_leitura_umidade
+                """, {f"id{j}": id_leitura for j, id_leitura in enumerate(ids)})
+                linhas.extend(cursor.fetchall())
+    finally:
+        cursor.close()
+    return linhas
+
+def acompanhar_umidade(conn, estado, id_sensor=None, limite=2000, margem=timedelta(seconds=60)):
+    """
+    Busca as leituras de umidade ainda não exibidas pelo painel ao vivo.
+
+    Além das leituras acima da marca d'água, reverifica a janela de `margem`
+    antes da leitura mais recente já vista, para pegar as que confirmaram fora da
+    ordem dos ids (ver `consultar_atrasadas_umidade`). Os ids já lidos na janela
+    ficam em `estado['vistos']`, de modo que nenhuma leitura é devolvida duas vezes.
+
+    Args:
+    conn: Conexão com o banco de dados.
+    estado: Dicionário do painel, atualizado aqui ('marca': maior id lido, 'vistos': {id: hora_leitura},
+        'inicio': hora_leitura mais antiga da carga inicial).
+    id_sensor: Sensor a filtrar (None para todos).
+    limite: Quantidade máxima de leituras novas por consulta.
+    margem: timedelta da janela de reverificação.
+
+    Returns:
+    list: Tuplas (id_leitura_umidade, id_sensor_umidade, hora_leitura, valor_umidade_leitura) ainda não vistas.
+    """
+    vistos = estado.setdefault('vistos', {})
+    marca = estado.get('marca')
+    atrasadas = []
+    if marca is not None and vistos:
+        desde = max(vistos.values()) - margem
+        # Leituras anteriores à carga inicial (cortadas pelo limite) não são buscadas depois
+        if estado.get('inicio') is not None:
+            desde = max(desde, estado['inicio'])
+        atrasadas = consultar_atrasadas_umidade(conn, marca, desde, vistos, id_sensor)
+    novas = consultar_novas_umidade(conn, marca, id_sensor, limite)
+    if marca is None and novas:
+        estado['inicio'] = min((linha[2] for linha in novas if linha[2] is not None), default=None)
+
+    linhas = atrasadas + novas
+    for id_leitura, _, hora, _ in linhas:
+        if hora is not None:
+            vistos[id_leitura] = hora
+    if novas:
+        estado['marca'] = max(marca or 0, novas[-1][0])
+    if vistos:
+        desde = max(vistos.values()) - margem
+        estado['vistos'] = {id_leitura: hora for id_leitura, hora in vistos.items() if hora >= desde}
+    return linhas
+
+def consultar_ultima_umidade(conn, id_sensor=None):
+    """
+    Consulta a leitura de umidade mais recente.
+
+    Returns:
+    float ou None: Valor da última leitura.
+    """
+    filtro = "WHERE id_sensor_umidade = :id_sensor" if id_sensor is not None else ""
+    parametros = {'id_sensor': id_sensor} if id_sensor is not None else {}
+    cursor = conn.cursor()
+    try:
+        with metricas.dashboard_consulta.time():
+            cursor.execute(f"""
+                SELECT valor_umidade_leitura
+                FROM LEITURA_SENSOR_UMIDADE
+                {filtro}
+                ORDER BY hora_leitura DESC, id_leitura_umidade DESC
+                FETCH FIRST 1 ROWS ONLY
+            """, parametros)
+            linha = cursor.fetchone()
+    finally:
+        cursor.close()
+    return linha[0] if linha else None
+
+def listar_sensores_umidade(conn):
+    """
+    Returns:
+    list: IDs dos sensores de umidade cadastrados.
+    """
+    cursor = conn.cursor()
+    try:
+        with metricas.dashboard_consulta.time():
+            cursor.execute("SELECT id_sensor_umidade FROM SENSOR_UMIDADE ORDER BY id_sensor_umidade")
+            return [linha[0] for linha in cursor.fetchall()]
+    finally:
+        cursor.close()
@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+from collections import deque
+
+from log.logger_config import configurar_logging
+from scripts import metricas
+
+# Configura o logging
+logger = configurar_logging(__name__)
+
+# Faixa de umidade ideal (a mesma usada pelo dashboard) e tempo mínimo em cada estado
+UMIDADE_MINIMA = float(os.getenv('BOMBA_UMIDADE_MINIMA', '45'))
+UMIDADE_MAXIMA = float(os.getenv('BOMBA_UMIDADE_MAXIMA', '55'))
+PERMANENCIA_MINIMA = float(os.getenv('BOMBA_PERMANENCIA_MINIMA', '30'))
+
+# Quantidade de latências guardadas para o cálculo dos percentis
+AMOSTRAS_LATENCIA = 1000
+
+
+class ControladorBomba:
+    """
+    Controle da bomba com histerese por sensor.
+
+    A bomba liga quando a umidade fica abaixo de `limite_inferior` e desliga quando
+    passa de `limite_superior`; dentro da faixa o estado atual é mantido. Uma troca
+    de estado só acontece depois de `permanencia_minima` segundos no estado anterior,
+    e o comando só é publicado quando o estado muda.
+    """
+
+    def __init__(self, publicar, limite_inferior=UMIDADE_MINIMA, limite_superior=UMIDADE_MAXIMA,
+                 permanencia_minima=PERMANENCIA_MINIMA):
+        """
+        :param publicar: Função que recebe o comando ("ON" ou "OFF") e o publica.
+        :param limite_inferior: Umidade abaixo da qual a bomba é ligada.
+        :param limite_superior: Umidade acima da qual a bomba é desligada.
+        :param permanencia_minima: Tempo mínimo, em segundos, entre duas trocas de estado.
+        """
+        if limite_inferior >= limite_superior:
+            raise ValueError("O limite inferior de umidade deve ser menor que o superior.")
+
+        self.publicar = publicar
+        self.limite_inferior = limite_inferior
+        self.limite_superior = limite_superior
+        self.permanencia_minima = permanencia_minima
+
+        self._estados = {}
+        self._trava = threading.Lock()
+        self._latencias_ms = deque(maxlen=AMOSTRAS_LATENCIA)
+        self._comandos = {'ON': 0, 'OFF': 0}
+        self._suprimidas = 0
+
+    def estado(self, id_sensor):
+        """
+        :param id_sensor: ID do sensor de umidade.
+        :return: Estado atual da bomba para o sensor ("ON", "OFF" ou None).
+        """
+        with self._trava:
+            atual = self._estados.get(id_sensor)
+        return atual[0] if atual else None
+
+    def avaliar(self, id_sensor, umidade):
+        """
+        Avalia uma leitura de umidade e publica o comando se o estado mudar.
+
+        :param id_sensor: ID do sensor de umidade.
+        :param umidade: Valor da umidade lida (%).
+        :return: Comando publicado ("ON"/"OFF") ou None se nada foi publicado.
+        """
+        inicio = time.perf_counter()
+        agora = time.monotonic()
+
+        if umidade < self.limite_inferior:
+            desejado = "ON"
+        elif umidade > self.limite_superior:
+            desejado = "OFF"
+        else:
+            return None
+
+        with self._trava:
+            atual = self._estados.get(id_sensor)
+            if atual is not None:
+                estado_atual, desde = atual
+                if estado_atual == desejado:
+                    return None
+                if agora - desde < self.permanencia_minima:
+                    self._suprimidas += 1
+                    return None
+            self._estados[id_sensor] = (desejado, agora)
+
+        self.publicar(desejado)
+
+        latencia_ms = (time.perf_counter() - inicio) * 1000
+        with self._trava:
+            self._latencias_ms.append(latencia_ms)
+            self._comandos[desejado] += 1
+        metricas.comandos_bomba.labels(desejado).inc()
+        logger.info(f"Bomba {desejado} (sensor {id_sensor}, umidade {umidade:.2f}%, {latencia_ms:.2f} ms)")
+        return desejado
+
+    def estatisticas(self):
+        """
+        Retorna os comandos publicados e a latência decisão-publicação.
+
+        :return: Dicionário com contagem de comandos, trocas suprimidas e latências p50/p99/máxima em ms.
+        """
+        with self._trava:
+            latencias = sorted(self._latencias_ms)
+            estatisticas = {
+                'comandos': dict(self._comandos),
+                'suprimidas_permanencia': self._suprimidas,
+                'estados': {id_sensor: estado for id_sensor, (estado, _) in self._estados.items()},
+            }
+
+        if latencias:
+            estatisticas['latencia_p50_ms'] = latencias[len(latencias) // 2]
+            estatisticas['latencia_p99_ms'] = latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))]
+            estatisticas['latencia_max_ms'] = latencias[-1]
+        return estatisticas
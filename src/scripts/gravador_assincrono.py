@@ -0,0 +1,250 @@
+import asyncio
+import os
+import time
+
+import oracledb
+
+from log.logger_config import configurar_logging
+from scripts import metricas
+from scripts.buffer_escrita import TAMANHO_LOTE_PADRAO, LATENCIA_MAXIMA_PADRAO, separar_recusadas
+
+# Configura o logging
+logger = configurar_logging(__name__)
+
+# Lotes gravados ao mesmo tempo (cada um numa sessão do pool assíncrono)
+GRAVACOES_SIMULTANEAS_PADRAO = int(os.getenv('INGESTAO_ASYNC_GRAVACOES', '4'))
+# Lotes em andamento ou na fila a partir dos quais, com o banco atrasado, os novos vão para o spool
+LOTES_MAXIMOS_PADRAO = int(os.getenv('INGESTAO_ASYNC_LOTES_MAXIMOS', '16'))
+
+
+class GravadorAssincrono:
+    """
+    Buffer de escrita do motor de ingestão assíncrono.
+
+    Tem a mesma interface de `adicionar` do BufferEscrita, mas cada lote cheio
+    (ou vencido por `latencia_maxima`) vira uma tarefa asyncio que grava com a API
+    assíncrona do oracledb. Até `gravacoes_simultaneas` lotes ficam em andamento ao
+    mesmo tempo, de modo que a espera de ida e volta ao banco de um lote não
+    impede o próximo de ser enviado. Com `lotes_maximos` lotes já em andamento
+    ou na fila, os seguintes vão para o spool em vez de acumular em memória.
+
+    Todos os métodos, exceto `gravar_de_outra_thread`, devem ser chamados no loop
+    de eventos.
+    """
+
+    def __init__(self, adquirir, instrucoes, antes_de_gravar=None, apos_inserir=None,
+                 tamanho_lote=TAMANHO_LOTE_PADRAO, latencia_maxima=LATENCIA_MAXIMA_PADRAO,
+                 gravacoes_simultaneas=GRAVACOES_SIMULTANEAS_PADRAO, spool=None,
+                 lotes_maximos=LOTES_MAXIMOS_PADRAO):
+        """
+        :param adquirir: Função que retorna um gerenciador de contexto assíncrono com uma conexão (pool.acquire).
+        :param instrucoes: Dicionário {tabela: INSERT com binds nomeados}.
+        :param antes_de_gravar: Corrotina opcional (conn, lotes) chamada antes dos inserts.
+        :param apos_inserir: Corrotina opcional (conn, lotes) chamada depois dos inserts, antes do commit.
+        :param tamanho_lote: Quantidade de linhas que dispara a gravação.
+        :param latencia_maxima: Tempo máximo, em segundos, que uma leitura espera no buffer.
+        :param gravacoes_simultaneas: Quantidade máxima de lotes gravando ao mesmo tempo.
+        :param spool: SpoolDisco opcional que recebe os lotes que não puderam ser gravados.
+        :param lotes_maximos: Lotes em andamento ou na fila que caracterizam o banco como atrasado.
+        """
+        self.adquirir = adquirir
+        self.instrucoes = instrucoes
+        self.antes_de_gravar = antes_de_gravar
+        self.apos_inserir = apos_inserir
+        self.tamanho_lote = tamanho_lote
+        self.latencia_maxima = latencia_maxima
+        self.gravacoes_simultaneas = gravacoes_simultaneas
+        self.spool = spool
+        self.lotes_maximos = lotes_maximos
+
+        self._pendentes = {tabela: [] for tabela in instrucoes}
+        self._total_pendente = 0
+        self._mais_antiga = None
+        self._semaforo = asyncio.Semaphore(gravacoes_simultaneas)
+        self._tarefas = set()
+        self._temporizador = None
+        self._loop = None
+
+        self._estatisticas = {
+            'descargas': 0,
+            'linhas_gravadas': 0,
+            'linhas_descartadas': 0,
+            'linhas_spool': 0,
+            'linhas_rejeitadas': 0,
+            'ultima_descarga': {},
+            'ultima_duracao_ms': 0.0,
+        }
+
+    def adicionar(self, tabela, linha):
+        """
+        Adiciona uma leitura ao buffer da tabela informada.
+
+        :param tabela: Nome da tabela de destino (chave de `instrucoes`).
+        :param linha: Dicionário com os binds do INSERT.
+        """
+        self._pendentes[tabela].append(linha)
+        self._total_pendente += 1
+        if self._mais_antiga is None:
+            self._mais_antiga = time.monotonic()
+        if self._total_pendente >= self.tamanho_lote:
+            self._disparar()
+
+    def atrasado(self):
+        """
+        Indica ao reenvio do spool que a ingestão ao vivo precisa do banco.
+
+        :return: True se há um lote ao vivo gravando ou um lote cheio esperando.
+        """
+        return bool(self._tarefas) or self._total_pendente >= self.tamanho_lote
+
+    def _retirar_pendentes(self):
+        lotes = {tabela: linhas for tabela, linhas in self._pendentes.items() if linhas}
+        self._pendentes = {tabela: [] for tabela in self.instrucoes}
+        self._total_pendente = 0
+        self._mais_antiga = None
+        return lotes
+
+    def _disparar(self):
+        lotes = self._retirar_pendentes()
+        if not lotes:
+            return
+        if len(self._tarefas) >= self.lotes_maximos:
+            # Banco atrasado: o excesso vai para o spool em vez de acumular tarefas em memória
+            tarefa = asyncio.create_task(self._desviar(lotes))
+        else:
+            tarefa = asyncio.create_task(self._descarregar(lotes))
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._tarefas.discard)
+
+    async def gravar(self, lotes):
+        """
+        Grava os lotes em uma única transação.
+
+        Como no BufferEscrita, as linhas recusadas individualmente pelo banco vão
+        para as rejeitadas do spool e as demais são confirmadas.
+
+        :param lotes: Dicionário {tabela: [linhas]}.
+        :return: True se a transação foi confirmada, False caso contrário.
+        """
+        return await self._gravar(lotes) is not None
+
+    async def _gravar(self, lotes):
+        """:return: Dicionário {tabela: [linhas aceitas]} confirmado, ou None se a transação falhou."""
+        recusadas = {}
+        motivo = None
+        async with self._semaforo:
+            try:
+                async with self.adquirir() as conn:
+                    try:
+                        if self.antes_de_gravar:
+                            await self.antes_de_gravar(conn, lotes)
+                        aceitas = {}
+                        cursor = conn.cursor()
+                        try:
+                            for tabela, linhas in lotes.items():
+                                inicio = time.perf_counter()
+                                await cursor.executemany(self.instrucoes[tabela], linhas, batcherrors=True)
+                                metricas.banco_execucao.labels(tabela).observe(time.perf_counter() - inicio)
+                                aceitas[tabela], recusadas[tabela], erro = separar_recusadas(
+                                    tabela, linhas, cursor.getbatcherrors()
+                                )
+                                motivo = motivo or erro
+                        finally:
+                            cursor.close()
+                        aceitas = {tabela: linhas for tabela, linhas in aceitas.items() if linhas}
+                        if self.apos_inserir:
+                            await self.apos_inserir(conn, aceitas)
+                        inicio = time.perf_counter()
+                        await conn.commit()
+                        metricas.banco_commit.observe(time.perf_counter() - inicio)
+                    except Exception:
+                        try:
+                            await conn.rollback()
+                        except oracledb.Error:
+                            # Sessão perdida: a transação já não existe no banco
+                            pass
+                        raise
+            except Exception as e:
+                logger.error(f"Erro ao gravar lote de leituras: {e}")
+                metricas.banco_falhas.inc()
+                return None
+
+        recusadas = {tabela: linhas for tabela, linhas in recusadas.items() if linhas}
+        if recusadas:
+            self._estatisticas['linhas_rejeitadas'] += sum(len(linhas) for linhas in recusadas.values())
+            if self.spool is not None:
+                await asyncio.to_thread(self.spool.rejeitar, recusadas, motivo)
+        return aceitas
+
+    def gravar_de_outra_thread(self, lotes):
+        """
+        Grava os lotes a partir de outra thread (usado pelo reenvio do spool).
+
+        :return: True se os lotes foram gravados e confirmados, False caso contrário.
+        """
+        if self._loop is None or self._loop.is_closed():
+            return False
+        return asyncio.run_coroutine_threadsafe(self.gravar(lotes), self._loop).result()
+
+    async def _desviar(self, lotes):
+        total = sum(len(linhas) for linhas in lotes.values())
+        if self.spool is not None:
+            # A escrita no spool faz fsync: fica numa thread para não parar o loop de eventos
+            await asyncio.to_thread(self.spool.gravar_lotes, lotes)
+            self._estatisticas['linhas_spool'] += total
+            metricas.linhas_spool.inc(total)
+        else:
+            logger.error(f"{total} leituras descartadas.")
+            self._estatisticas['linhas_descartadas'] += total
+
+    async def _descarregar(self, lotes):
+        inicio = time.perf_counter()
+        aceitas = await self._gravar(lotes)
+        if aceitas is None:
+            await self._desviar(lotes)
+            return
+
+        metricas.observar_lote(aceitas)
+        contagem = {tabela: len(linhas) for tabela, linhas in aceitas.items()}
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        self._estatisticas['descargas'] += 1
+        self._estatisticas['linhas_gravadas'] += sum(contagem.values())
+        self._estatisticas['ultima_descarga'] = contagem
+        self._estatisticas['ultima_duracao_ms'] = duracao_ms
+        logger.info(f"Lote gravado em {duracao_ms:.1f} ms: {contagem}")
+
+    async def _executar(self):
+        intervalo = max(self.latencia_maxima / 4, 0.05)
+        while True:
+            await asyncio.sleep(intervalo)
+            if self._mais_antiga is not None and time.monotonic() - self._mais_antiga >= self.latencia_maxima:
+                self._disparar()
+
+    def iniciar(self):
+        """Inicia a tarefa que dispara a gravação por tempo."""
+        self._loop = asyncio.get_running_loop()
+        if self._temporizador is None:
+            self._temporizador = asyncio.create_task(self._executar())
+
+    async def parar(self):
+        """Interrompe a tarefa de tempo, grava o que estiver pendente e espera as gravações em andamento."""
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+        self._disparar()
+        if self._tarefas:
+            await asyncio.gather(*self._tarefas)
+
+    def estatisticas(self):
+        """
+        Retorna uma cópia das estatísticas do gravador.
+
+        :return: Dicionário com descargas, linhas gravadas/descartadas/no spool/rejeitadas, pendentes e gravações em andamento.
+        """
+        estatisticas = dict(self._estatisticas)
+        estatisticas['pendentes'] = self._total_pendente
+        estatisticas['em_andamento'] = len(self._tarefas)
+        estatisticas['tamanho_lote'] = self.tamanho_lote
+        estatisticas['latencia_maxima'] = self.latencia_maxima
+        estatisticas['lotes_maximos'] = self.lotes_maximos
+        return estatisticas
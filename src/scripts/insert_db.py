@@ -1,38 +1,18 @@
 # src/insert_data.py
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import oracledb
-from dotenv import load_dotenv
 from dados_simulados import gerar_dados_simulados
-import streamlit as st
 
 from log.logger_config import configurar_logging
+from scripts.buffer_escrita import separar_recusadas
+from scripts.connect_db import conectar_banco, fechar_conexao, fechar_pool
 from scripts.setup_db import setup_banco_dados
 
 # Configura o logging
-logger = configurar_logging()
-
-def conectar_banco():
-    """
-    Conecta ao banco de dados Oracle utilizando as variáveis de ambiente.
-    
-    :return: Objeto de conexão ou None em caso de erro.
-    """
-    load_dotenv()
-    user = os.getenv('DB_USER') or st.secrets["database"]["user"]
-    password = os.getenv('DB_PASSWORD') or st.secrets["database"]["password"] 
-    dsn = os.getenv('DB_DSN') or st.secrets["database"]["dsn"]
-
-    if not all([user, password, dsn]):
-        logger.error("Uma ou mais variáveis de ambiente não estão definidas.")
-        return None
-
-    try:
-        conn = oracledb.connect(user=user, password=password, dsn=dsn)
-        logger.info("Conectado ao banco de dados.")
-        return conn
-    except oracledb.DatabaseError as e:
-        logger.error(f"Erro ao conectar ao banco de dados: {e}")
-        return None
+logger = configurar_logging(__name__)
 
 def verificar_dados_existentes(conn):
     """
@@ -53,54 +33,127 @@ def verificar_dados_existentes(conn):
     finally:
         cursor.close()
 
-def inserir_dados(conn, dados):
+# Instruções da carga em lote: tabela -> (INSERT, função que extrai os binds de um DadosCompletos)
+INSERTS_CARGA = {
+    'Colheita': (
+        "INSERT INTO Colheita (ano, quantidade_colhida) VALUES (:ano, :quantidade_colhida)",
+        lambda item: {'ano': item.colheita.ano, 'quantidade_colhida': item.colheita.quantidade_colhida},
+    ),
+    'Clima': (
+        "INSERT INTO Clima (ano, temperatura_media, precipitacao) VALUES (:ano, :temperatura_media, :precipitacao)",
+        lambda item: {'ano': item.clima.ano, 'temperatura_media': item.clima.temperatura_media,
+                      'precipitacao': item.clima.precipitacao},
+    ),
+    'MaturidadeCana': (
+        "INSERT INTO MaturidadeCana (ano, indice_maturidade) VALUES (:ano, :indice_maturidade)",
+        lambda item: {'ano': item.maturidade.ano, 'indice_maturidade': item.maturidade.indice_maturidade},
+    ),
+    'CondicoesSolo': (
+        "INSERT INTO CondicoesSolo (ano, ph, nutrientes) VALUES (:ano, :ph, :nutrientes)",
+        lambda item: {'ano': item.solo.ano, 'ph': item.solo.ph, 'nutrientes': item.solo.nutrientes},
+    ),
+}
+
+# Linhas por executemany e conexões usadas em paralelo (1 = uma única transação na conexão recebida)
+TAMANHO_LOTE_CARGA = int(os.getenv('CARGA_TAMANHO_LOTE', '5000'))
+PARALELISMO_CARGA = int(os.getenv('CARGA_PARALELISMO', '1'))
+
+def agrupar_por_tabela(dados):
     """
-    Insere os dados simulados nas tabelas correspondentes.
-    
-    :param conn: Conexão com o banco de dados Oracle.
-    :param dados: Lista de objetos DadosCompletos com os dados a serem inseridos.
+    Agrupa os binds dos itens por tabela de destino.
+
+    :param dados: Lista de objetos DadosCompletos.
+    :return: Dicionário {tabela: [binds]}.
+    """
+    return {tabela: [extrair(item) for item in dados] for tabela, (_, extrair) in INSERTS_CARGA.items()}
+
+def inserir_lote(conn, tabela, linhas):
+    """
+    Insere um lote com executemany, registrando as linhas rejeitadas sem abortar o lote.
+
+    :param conn: Conexão com o banco de dados.
+    :param tabela: Tabela de destino (chave de INSERTS_CARGA).
+    :param linhas: Lista de binds.
+    :return: Tupla (linhas inseridas, linhas com erro).
     """
     cursor = conn.cursor()
     try:
-        for item in dados:
-            # Inserir na tabela Colheita
-            cursor.execute("""
-                INSERT INTO Colheita (ano, quantidade_colhida)
-                VALUES (:ano, :quantidade_colhida)
-            """, ano=item.colheita.ano, quantidade_colhida=item.colheita.quantidade_colhida)
-            logger.info(f"Registro inserido na tabela 'Colheita' para o ano: {item.colheita.ano}")
-
-            # Inserir na tabela Clima
-            cursor.execute("""
-                INSERT INTO Clima (ano, temperatura_media, precipitacao)
-                VALUES (:ano, :temperatura_media, :precipitacao)
-            """, ano=item.clima.ano, temperatura_media=item.clima.temperatura_media, precipitacao=item.clima.precipitacao)
-            logger.info(f"Registro inserido na tabela 'Clima' para o ano: {item.clima.ano}")
-
-            # Inserir na tabela MaturidadeCana
-            cursor.execute("""
-                INSERT INTO MaturidadeCana (ano, indice_maturidade)
-                VALUES (:ano, :indice_maturidade)
-            """, ano=item.maturidade.ano, indice_maturidade=item.maturidade.indice_maturidade)
-            logger.info(f"Registro inserido na tabela 'MaturidadeCana' para o ano: {item.maturidade.ano}")
-
-            # Inserir na tabela CondicoesSolo
-            cursor.execute("""
-                INSERT INTO CondicoesSolo (ano, ph, nutrientes)
-                VALUES (:ano, :ph, :nutrientes)
-            """, ano=item.solo.ano, ph=item.solo.ph, nutrientes=item.solo.nutrientes)
-            logger.info(f"Registro inserido na tabela 'CondicoesSolo' para o ano: {item.solo.ano}")
-
-            
-
-        # Commit das inserções
+        cursor.executemany(INSERTS_CARGA[tabela][0], linhas, batcherrors=True)
+        erros = cursor.getbatcherrors()
+    finally:
+        cursor.close()
+    aceitas, recusadas, _ = separar_recusadas(tabela, linhas, erros)
+    return len(aceitas), len(recusadas)
+
+def _inserir_lote_em_conexao_do_pool(tabela, linhas):
+    """Insere e confirma um lote numa conexão própria, emprestada do pool."""
+    conn = conectar_banco()
+    if not conn:
+        return 0, len(linhas)
+    try:
+        resultado = inserir_lote(conn, tabela, linhas)
         conn.commit()
-        logger.info("Dados inseridos com sucesso.")
+        return resultado
     except oracledb.DatabaseError as e:
-        logger.error(f"Erro ao inserir dados: {e}")
+        logger.error(f"Erro ao inserir lote em '{tabela}': {e}")
         conn.rollback()
+        return 0, len(linhas)
     finally:
-        cursor.close()
+        fechar_conexao(conn)
+
+def inserir_dados(conn, dados, tamanho_lote=TAMANHO_LOTE_CARGA, paralelismo=PARALELISMO_CARGA):
+    """
+    Insere os dados simulados nas tabelas correspondentes, em lotes.
+
+    Os itens são agrupados por tabela e gravados com executemany em lotes de
+    `tamanho_lote` linhas. Com `paralelismo` igual a 1 tudo é confirmado numa
+    única transação em `conn`; acima disso, os lotes são distribuídos entre
+    conexões do pool e cada um é confirmado separadamente, sem `conn`.
+
+    :param conn: Conexão com o banco de dados Oracle; None quando `paralelismo` é maior que 1.
+    :param dados: Lista de objetos DadosCompletos com os dados a serem inseridos.
+    :param tamanho_lote: Linhas por executemany.
+    :param paralelismo: Quantidade de conexões usadas em paralelo.
+    :return: Dicionário {tabela: {'inseridas': n, 'erros': n}}.
+    :raises ValueError: Se `conn` for informada com `paralelismo` maior que 1, ou omitida com 1.
+    """
+    if paralelismo > 1 and conn is not None:
+        raise ValueError("Com paralelismo maior que 1 os lotes usam conexões do pool; não informe conn.")
+    if paralelismo <= 1 and conn is None:
+        raise ValueError("Com paralelismo 1 a carga é uma transação em conn; informe a conexão.")
+
+    lotes = [
+        (tabela, linhas[inicio:inicio + tamanho_lote])
+        for tabela, linhas in agrupar_por_tabela(dados).items()
+        for inicio in range(0, len(linhas), tamanho_lote)
+    ]
+    resumo = {tabela: {'inseridas': 0, 'erros': 0} for tabela in INSERTS_CARGA}
+    inicio = time.perf_counter()
+
+    if paralelismo > 1:
+        with ThreadPoolExecutor(max_workers=paralelismo, thread_name_prefix="carga") as executor:
+            resultados = executor.map(lambda lote: _inserir_lote_em_conexao_do_pool(*lote), lotes)
+            for (tabela, _), (inseridas, erros) in zip(lotes, resultados):
+                resumo[tabela]['inseridas'] += inseridas
+                resumo[tabela]['erros'] += erros
+    else:
+        try:
+            for tabela, linhas in lotes:
+                inseridas, erros = inserir_lote(conn, tabela, linhas)
+                resumo[tabela]['inseridas'] += inseridas
+                resumo[tabela]['erros'] += erros
+            # Commit das inserções
+            conn.commit()
+        except oracledb.DatabaseError as e:
+            logger.error(f"Erro ao inserir dados: {e}")
+            conn.rollback()
+            return resumo
+
+    duracao = time.perf_counter() - inicio
+    for tabela, contagem in resumo.items():
+        logger.info(f"Tabela '{tabela}': {contagem['inseridas']} registros inseridos, {contagem['erros']} com erro.")
+    logger.info(f"Dados inseridos em {duracao:.2f} s ({len(lotes)} lotes, paralelismo {paralelismo}).")
+    return resumo
 
 def main():
     # Conecta ao banco de dados
@@ -112,13 +165,14 @@ def main():
         # Verifica se já existem dados na tabela 'Colheita' para evitar duplicações
         if not verificar_dados_existentes(conn):
             dados = gerar_dados_simulados()
-            inserir_dados(conn, dados)
+            # Em paralelo, cada lote usa uma conexão própria do pool
+            inserir_dados(None if PARALELISMO_CARGA > 1 else conn, dados)
         else:
             logger.info("Dados já existem no banco de dados. Inserção não realizada.")
 
-        # Fecha a conexão
-        conn.close()
-        logger.info("Conexão com o banco de dados encerrada.")
+        # Devolve a conexão ao pool
+        fechar_conexao(conn)
+    fechar_pool()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
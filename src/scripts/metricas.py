@@ -0,0 +1,160 @@
+"""
+Métricas da ingestão, do banco e do dashboard no formato de texto do Prometheus.
+
+As métricas ficam no registro padrão do prometheus_client e são servidas por
+`iniciar_servidor_metricas` em http://METRICAS_ENDERECO:METRICAS_PORTA/metrics.
+Cada processo (worker de ingestão, bomba, app) tem o seu próprio endpoint; o
+run.py atribui uma porta a cada um a partir de METRICAS_PORTA.
+
+No caminho de cada mensagem só há incrementos de contadores já resolvidos por
+tópico. Profundidade de fila e linhas pendentes são lidas apenas no momento da
+coleta, e as latências do banco são observadas uma vez por lote.
+"""
+import os
+from datetime import datetime
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+from log.logger_config import configurar_logging
+
+# Configura o logging
+logger = configurar_logging(__name__)
+
+# Porta do endpoint (0 desativa) e endereço de escuta (local por padrão)
+PORTA_PADRAO = int(os.getenv('METRICAS_PORTA', '9108'))
+ENDERECO_PADRAO = os.getenv('METRICAS_ENDERECO', '127.0.0.1')
+
+# Limites dos histogramas, em segundos e em linhas
+BALDES_BANCO = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BALDES_ATRASO = (0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600, 1800)
+BALDES_LOTE = (1, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+BALDES_DASHBOARD = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Ingestão MQTT
+mensagens_recebidas = Counter(
+    'farmtech_mqtt_mensagens_recebidas_total', 'Mensagens MQTT recebidas, por tópico', ['topico']
+)
+mensagens_invalidas = Counter(
+    'farmtech_mqtt_mensagens_invalidas_total',
+    'Mensagens MQTT rejeitadas (decodificacao: payload não é JSON; campos: campos obrigatórios ausentes)',
+    ['motivo']
+)
+mensagens_descartadas = Counter(
+    'farmtech_ingestao_mensagens_descartadas_total', 'Mensagens descartadas com a fila de ingestão cheia'
+)
+fila_profundidade = Gauge(
+    'farmtech_ingestao_fila_profundidade', 'Mensagens aguardando as threads de trabalho'
+)
+linhas_pendentes = Gauge(
+    'farmtech_ingestao_linhas_pendentes', 'Leituras no buffer de escrita aguardando gravação'
+)
+lote_linhas = Histogram(
+    'farmtech_ingestao_lote_linhas', 'Leituras por lote gravado', buckets=BALDES_LOTE
+)
+linhas_spool = Counter(
+    'farmtech_ingestao_linhas_spool_total', 'Leituras desviadas para o spool em disco'
+)
+atraso_leitura = Histogram(
+    'farmtech_ingestao_atraso_segundos',
+    'Tempo entre a hora da leitura no dispositivo e o commit no banco', buckets=BALDES_ATRASO
+)
+
+# Banco de dados
+banco_execucao = Histogram(
+    'farmtech_banco_executemany_segundos', 'Duração do executemany de um lote, por tabela', ['tabela'],
+    buckets=BALDES_BANCO
+)
+banco_commit = Histogram(
+    'farmtech_banco_commit_segundos', 'Duração do commit de um lote', buckets=BALDES_BANCO
+)
+banco_falhas = Counter(
+    'farmtech_banco_gravacoes_falhas_total', 'Lotes cuja gravação falhou e foi desfeita'
+)
+
+# Bomba
+comandos_bomba = Counter(
+    'farmtech_bomba_comandos_total', 'Comandos publicados para a bomba', ['comando']
+)
+
+# Dashboard
+dashboard_consulta = Histogram(
+    'farmtech_dashboard_consulta_segundos', 'Duração das consultas do dashboard ao banco',
+    buckets=BALDES_DASHBOARD
+)
+dashboard_http = Histogram(
+    'farmtech_dashboard_http_segundos', 'Duração das requisições às APIs externas, por fonte', ['fonte'],
+    buckets=BALDES_DASHBOARD
+)
+dashboard_execucao = Histogram(
+    'farmtech_dashboard_execucao_segundos', 'Duração de cada execução completa do script do dashboard, por página',
+    ['pagina'], buckets=BALDES_DASHBOARD
+)
+dashboard_inicio_frio = Gauge(
+    'farmtech_dashboard_inicio_frio_segundos',
+    'Duração da primeira execução do script no processo, importações incluídas', ['pagina']
+)
+
+# Filhos já resolvidos: evita a busca por rótulo a cada mensagem
+_recebidas_por_topico = {}
+_recebidas_outros = mensagens_recebidas.labels('outro')
+invalidas_decodificacao = mensagens_invalidas.labels('decodificacao')
+invalidas_campos = mensagens_invalidas.labels('campos')
+
+
+def registrar_topicos(topicos):
+    """Cria os contadores de mensagens recebidas dos tópicos conhecidos (os demais vão para 'outro')."""
+    for topico in topicos:
+        _recebidas_por_topico[topico] = mensagens_recebidas.labels(topico)
+
+
+def contar_mensagem(topico):
+    """Conta uma mensagem recebida no tópico."""
+    _recebidas_por_topico.get(topico, _recebidas_outros).inc()
+
+
+def observar_lote(lotes):
+    """
+    Registra o tamanho de um lote confirmado e o atraso de cada leitura até o commit.
+
+    :param lotes: Dicionário {tabela: [linhas]}, com `hora_leitura` em cada linha.
+    """
+    agora = datetime.now()
+    total = 0
+    for linhas in lotes.values():
+        total += len(linhas)
+        for linha in linhas:
+            atraso_leitura.observe(max((agora - linha['hora_leitura']).total_seconds(), 0.0))
+    lote_linhas.observe(total)
+
+
+def observar_execucao_dashboard(pagina, duracao, primeira=False):
+    """
+    Registra a duração de uma execução do script do dashboard.
+
+    :param pagina: Página exibida.
+    :param duracao: Segundos desde o início do script até o fim da página.
+    :param primeira: True na primeira execução do processo (partida a frio).
+    """
+    dashboard_execucao.labels(pagina).observe(duracao)
+    if primeira:
+        dashboard_inicio_frio.labels(pagina).set(duracao)
+        logger.info(f"Primeira execução do dashboard ({pagina}) em {duracao * 1000:.0f} ms")
+
+
+def iniciar_servidor_metricas(porta=PORTA_PADRAO, endereco=ENDERECO_PADRAO):
+    """
+    Inicia o servidor HTTP das métricas numa thread em segundo plano.
+
+    :param porta: Porta do endpoint; 0 não inicia o servidor.
+    :param endereco: Endereço de escuta.
+    :return: True se o servidor foi iniciado.
+    """
+    if not porta:
+        return False
+    try:
+        start_http_server(porta, addr=endereco)
+    except OSError as e:
+        logger.error(f"Não foi possível iniciar o endpoint de métricas em {endereco}:{porta}: {e}")
+        return False
+    logger.info(f"Métricas disponíveis em http://{endereco}:{porta}/metrics")
+    return True
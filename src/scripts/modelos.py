@@ -0,0 +1,69 @@
+import numpy as np
+
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
+from sklearn.metrics import mean_absolute_error, mean_squared_error
+
+# Hiperparâmetros dos modelos (fazem parte da chave do registro de modelos)
+HIPERPARAMETROS_PRECIPITACAO = {
+    'n_estimators': 200,
+    'random_state': 42,
+    'min_samples_split': 5,
+}
+HIPERPARAMETROS_IRRIGACAO = {
+    'n_estimators': 100,
+    'random_state': 42,
+}
+
+FEATURES_PRECIPITACAO = ['temp_max', 'temp_min', 'mes', 'dia_ano']
+FEATURES_IRRIGACAO = ['precipitacao', 'temp_max', 'temp_min']
+
+
+def treinar_modelo_precipitacao(df, **hiperparametros):
+    """Treina modelo de precipitação"""
+    X = df[FEATURES_PRECIPITACAO]
+    y = df['precipitacao_proxdia']
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42
+    )
+
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+
+    # n_jobs=-1: as árvores são treinadas em paralelo em todos os núcleos
+    modelo = RandomForestRegressor(n_jobs=-1, **hiperparametros)
+    modelo.fit(X_train_scaled, y_train)
+
+    y_pred = modelo.predict(X_test_scaled)
+
+    mae = mean_absolute_error(y_test, y_pred)
+    mse = mean_squared_error(y_test, y_pred)
+    rmse = np.sqrt(mse)
+
+    return modelo, scaler, {
+        'MAE': mae,
+        'MSE': mse,
+        'RMSE': rmse
+    }
+
+
+def treinar_modelo_irrigacao(df, **hiperparametros):
+    """Treina modelo de necessidade de irrigação"""
+    X = df[FEATURES_IRRIGACAO]
+    y = df['necessita_irrigacao']
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+
+    modelo = RandomForestClassifier(n_jobs=-1, **hiperparametros)
+    modelo.fit(X_train_scaled, y_train)
+
+    return modelo, scaler, {
+        'Acurácia': modelo.score(X_test_scaled, y_test)
+    }
@@ -0,0 +1,126 @@
+"""
+Perfil das reexecuções do dashboard Streamlit.
+
+Cada reexecução do app.py cria um PerfilExecucao; os trechos caros são
+marcados com `perfil.etapa(...)` e, ao final, o painel lateral mostra quanto
+tempo cada etapa levou. Com o perfil desativado, `etapa` não mede nada.
+
+O tempo de uma etapa é exclusivo: uma consulta feita dentro de um trecho
+marcado como 'figura' conta só em 'consulta'. O que não está em nenhuma etapa
+aparece como 'outros' (código Python do app e chamadas st.* não marcadas).
+"""
+import cProfile
+import os
+import re
+import time
+import unicodedata
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+DIRETORIO_PADRAO = os.getenv(
+    'PERFIL_DIRETORIO',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'perfis')
+)
+
+# Etapas medidas, na ordem do painel
+ETAPAS = {
+    'conexao': 'Conexão com o banco',
+    'consulta': 'Consultas ao banco',
+    'dataframe': 'Montagem de DataFrames',
+    'api_externa': 'APIs externas',
+    'treino': 'Modelos (treino/predição)',
+    'figura': 'Montagem de figuras',
+    'emissao': 'Emissão st.*',
+}
+
+
+class PerfilExecucao:
+    """Tempos por etapa de uma reexecução do dashboard e, opcionalmente, o cProfile dela."""
+
+    def __init__(self, ativo=False, cprofile=False):
+        """
+        :param ativo: Se False, nenhuma etapa é medida.
+        :param cprofile: Se True (e ativo), a reexecução também é registrada pelo cProfile.
+        """
+        self.ativo = ativo
+        self.tempos = {}
+        self.chamadas = {}
+        self.total = None
+        self.erro_cprofile = None
+
+        self._inicio = time.perf_counter()
+        self._pilha = []
+        self._cprofile = None
+        if ativo and cprofile:
+            self._cprofile = cProfile.Profile()
+            try:
+                self._cprofile.enable()
+            except ValueError as e:
+                # Só um profiler pode estar ativo por vez (outra sessão já está registrando)
+                self._cprofile = None
+                self.erro_cprofile = str(e)
+
+    @contextmanager
+    def etapa(self, nome):
+        """
+        Mede o trecho como parte da etapa `nome` (chave de ETAPAS).
+        """
+        if not self.ativo:
+            yield
+            return
+
+        filhos = [0.0]
+        self._pilha.append(filhos)
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracao = time.perf_counter() - inicio
+            self._pilha.pop()
+            if self._pilha:
+                self._pilha[-1][0] += duracao
+            self.tempos[nome] = self.tempos.get(nome, 0.0) + duracao - filhos[0]
+            self.chamadas[nome] = self.chamadas.get(nome, 0) + 1
+
+    def finalizar(self):
+        """Encerra a medição da reexecução (e o cProfile, se houver)."""
+        if self.total is None:
+            self.total = time.perf_counter() - self._inicio
+            if self._cprofile is not None:
+                self._cprofile.disable()
+        return self.total
+
+    def resumo(self):
+        """
+        :return: DataFrame com tempo (ms), chamadas e participação de cada etapa, mais 'outros'.
+        """
+        total = self.finalizar()
+        linhas = [
+            (rotulo, self.tempos[nome] * 1000, self.chamadas[nome])
+            for nome, rotulo in ETAPAS.items() if nome in self.tempos
+        ]
+        linhas.append(('Outros', max(total - sum(self.tempos.values()), 0.0) * 1000, None))
+        df = pd.DataFrame(linhas, columns=['Etapa', 'Tempo (ms)', 'Chamadas'])
+        df['%'] = df['Tempo (ms)'] / (total * 1000) * 100 if total else 0.0
+        return df
+
+    def salvar_cprofile(self, pagina, diretorio=DIRETORIO_PADRAO):
+        """
+        Grava as estatísticas do cProfile da reexecução.
+
+        O arquivo .prof abre com pstats, snakeviz ou flameprof (gráfico de chamas).
+
+        :param pagina: Nome da página, usado no nome do arquivo.
+        :return: Caminho do arquivo gravado, ou None se o cProfile não estava ativo.
+        """
+        if self._cprofile is None:
+            return None
+        self.finalizar()
+        os.makedirs(diretorio, exist_ok=True)
+        nome = unicodedata.normalize('NFKD', pagina).encode('ascii', 'ignore').decode()
+        nome = re.sub(r'[^a-z0-9]+', '-', nome.lower()).strip('-')
+        caminho = os.path.join(diretorio, f"{nome}-{datetime.now():%Y%m%d-%H%M%S}.prof")
+        self._cprofile.dump_stats(caminho)
+        return caminho
@@ -0,0 +1,140 @@
+import os
+import queue
+import threading
+
+from log.logger_config import configurar_logging
+from scripts import metricas
+
+# Configura o logging
+logger = configurar_logging(__name__)
+
+# Parâmetros padrão do pipeline (podem ser sobrescritos por variáveis de ambiente)
+NUM_WORKERS_PADRAO = int(os.getenv('INGESTAO_WORKERS', '4'))
+CAPACIDADE_FILA_PADRAO = int(os.getenv('INGESTAO_FILA_CAPACIDADE', '10000'))
+POLITICA_PADRAO = os.getenv('INGESTAO_POLITICA', 'bloquear')
+TIMEOUT_BLOQUEIO_PADRAO = float(os.getenv('INGESTAO_TIMEOUT_BLOQUEIO', '0.5'))
+
+# Comportamentos possíveis quando a fila está cheia:
+# - bloquear: espera até `timeout_bloqueio` segundos por espaço e descarta a mensagem se não houver
+# - descartar_novo: descarta a mensagem que está chegando
+# - descartar_antigo: descarta a mensagem mais antiga da fila para abrir espaço
+POLITICAS = ('bloquear', 'descartar_novo', 'descartar_antigo')
+
+_FIM = object()
+
+
+class PipelineIngestao:
+    """
+    Pipeline em estágios para a ingestão MQTT.
+
+    O callback do paho apenas decodifica a mensagem e a coloca numa fila limitada;
+    um conjunto de threads de trabalho consome a fila e faz a persistência, de
+    forma que chamadas lentas ao banco não bloqueiam o loop de rede.
+    """
+
+    def __init__(self, processar, num_workers=NUM_WORKERS_PADRAO, capacidade=CAPACIDADE_FILA_PADRAO,
+                 politica=POLITICA_PADRAO, timeout_bloqueio=TIMEOUT_BLOQUEIO_PADRAO):
+        """
+        :param processar: Função chamada pelas threads de trabalho para cada item da fila.
+        :param num_workers: Quantidade de threads de trabalho.
+        :param capacidade: Tamanho máximo da fila.
+        :param politica: Comportamento com a fila cheia (ver POLITICAS).
+        :param timeout_bloqueio: Espera máxima, em segundos, da política 'bloquear'.
+        """
+        if politica not in POLITICAS:
+            raise ValueError(f"Política de fila inválida: {politica}. Use uma de {POLITICAS}.")
+
+        self.processar = processar
+        self.num_workers = num_workers
+        self.politica = politica
+        self.timeout_bloqueio = timeout_bloqueio
+        self.fila = queue.Queue(maxsize=capacidade)
+
+        self._threads = []
+        self._trava = threading.Lock()
+        self._contadores = {
+            'enfileiradas': 0,
+            'processadas': 0,
+            'descartadas': 0,
+            'erros': 0,
+        }
+
+    def _incrementar(self, contador, valor=1):
+        with self._trava:
+            self._contadores[contador] += valor
+
+    def enfileirar(self, item):
+        """
+        Coloca um item na fila aplicando a política de contrapressão.
+
+        :param item: Item a ser processado pelas threads de trabalho.
+        :return: True se o item entrou na fila, False se foi descartado.
+        """
+        try:
+            if self.politica == 'bloquear':
+                self.fila.put(item, timeout=self.timeout_bloqueio)
+            elif self.politica == 'descartar_novo':
+                self.fila.put_nowait(item)
+            else:
+                while True:
+                    try:
+                        self.fila.put_nowait(item)
+                        break
+                    except queue.Full:
+                        try:
+                            self.fila.get_nowait()
+                            self.fila.task_done()
+                            self._incrementar('descartadas')
+                            metricas.mensagens_descartadas.inc()
+                        except queue.Empty:
+                            pass
+        except queue.Full:
+            self._incrementar('descartadas')
+            metricas.mensagens_descartadas.inc()
+            return False
+
+        self._incrementar('enfileiradas')
+        return True
+
+    def _executar(self):
+        while True:
+            item = self.fila.get()
+            try:
+                if item is _FIM:
+                    return
+                self.processar(item)
+                self._incrementar('processadas')
+            except Exception as e:
+                self._incrementar('erros')
+                logger.error(f"Erro ao processar item da fila de ingestão: {e}")
+            finally:
+                self.fila.task_done()
+
+    def iniciar(self):
+        """Inicia as threads de trabalho."""
+        for i in range(self.num_workers):
+            thread = threading.Thread(target=self._executar, name=f"ingestao-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Pipeline de ingestão iniciado com {self.num_workers} workers "
+                    f"(fila={self.fila.maxsize}, política={self.politica}).")
+
+    def parar(self):
+        """Processa o que ainda está na fila e encerra as threads de trabalho."""
+        for _ in self._threads:
+            self.fila.put(_FIM)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def estatisticas(self):
+        """
+        Retorna os contadores do pipeline.
+
+        :return: Dicionário com profundidade da fila, capacidade e contadores de mensagens.
+        """
+        with self._trava:
+            estatisticas = dict(self._contadores)
+        estatisticas['profundidade'] = self.fila.qsize()
+        estatisticas['capacidade'] = self.fila.maxsize
+        return estatisticas
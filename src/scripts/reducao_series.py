@@ -0,0 +1,114 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Quantidade máxima de pontos enviada a um gráfico (plotly ou matplotlib)
+PONTOS_MAXIMOS_PADRAO = int(os.getenv('GRAFICO_PONTOS_MAXIMOS', '1000'))
+
+
+def _numerico(valores):
+    """Converte o eixo x (números ou datas) para float, preservando a ordem."""
+    serie = pd.Series(valores)
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.astype('int64').to_numpy(dtype=float)
+    return serie.to_numpy(dtype=float)
+
+
+def indices_lttb(x, y, pontos):
+    """
+    Seleciona pontos pelo algoritmo Largest-Triangle-Three-Buckets.
+
+    O primeiro e o último ponto são mantidos; os demais são divididos em
+    `pontos - 2` baldes e, de cada balde, fica o ponto que forma o maior
+    triângulo com o ponto escolhido no balde anterior e a média do próximo.
+
+    :param x: Valores do eixo x, em ordem crescente.
+    :param y: Valores do eixo y.
+    :param pontos: Quantidade de pontos desejada.
+    :return: Array com os índices selecionados, em ordem crescente.
+    """
+    n = len(y)
+    if pontos >= n or pontos < 3:
+        return np.arange(n)
+
+    x = _numerico(x)
+    y = np.asarray(y, dtype=float)
+    limites = np.linspace(1, n - 1, pontos - 1).astype(np.int64)
+    limites = np.append(limites, n)
+
+    indices = np.empty(pontos, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    anterior = 0
+    for balde in range(pontos - 2):
+        inicio, fim = limites[balde], limites[balde + 1]
+        proximo_inicio, proximo_fim = limites[balde + 1], limites[balde + 2]
+        media_x = x[proximo_inicio:proximo_fim].mean()
+        media_y = y[proximo_inicio:proximo_fim].mean()
+
+        areas = np.abs(
+            (x[anterior] - media_x) * (y[inicio:fim] - y[anterior])
+            - (x[anterior] - x[inicio:fim]) * (media_y - y[anterior])
+        )
+        anterior = inicio + int(np.argmax(areas))
+        indices[balde + 1] = anterior
+    return indices
+
+
+def indices_minmax(y, pontos):
+    """
+    Seleciona, em cada balde, o menor e o maior valor.
+
+    Preserva picos e vales (por exemplo, leituras fora do limite), ao custo de
+    uma forma menos suave que a do LTTB.
+
+    :param y: Valores do eixo y.
+    :param pontos: Quantidade de pontos desejada.
+    :return: Array com os índices selecionados, em ordem crescente.
+    """
+    n = len(y)
+    if pontos >= n or pontos < 2:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=float)
+    limites = np.linspace(0, n, pontos // 2 + 1).astype(np.int64)
+    indices = set()
+    for inicio, fim in zip(limites[:-1], limites[1:]):
+        if fim > inicio:
+            indices.add(inicio + int(np.argmin(y[inicio:fim])))
+            indices.add(inicio + int(np.argmax(y[inicio:fim])))
+    return np.array(sorted(indices), dtype=np.int64)
+
+
+def reduzir_serie(df, coluna_x, colunas_y, pontos=PONTOS_MAXIMOS_PADRAO, metodo='lttb'):
+    """
+    Reduz um DataFrame a um orçamento fixo de pontos antes de plotá-lo.
+
+    Os índices são escolhidos para cada coluna y (com orçamento dividido entre
+    elas) e unidos, de modo que todas as colunas continuam alinhadas no mesmo x.
+
+    :param df: DataFrame ordenado por `coluna_x`.
+    :param coluna_x: Coluna do eixo x.
+    :param colunas_y: Coluna ou lista de colunas do eixo y.
+    :param pontos: Quantidade máxima de pontos (aproximada quando há várias colunas).
+    :param metodo: 'lttb' ou 'minmax'.
+    :return: DataFrame reduzido (o próprio df quando já cabe no orçamento).
+    """
+    if len(df) <= pontos:
+        return df
+    if isinstance(colunas_y, str):
+        colunas_y = [colunas_y]
+
+    pontos_coluna = max(pontos // len(colunas_y), 3)
+    selecionados = set()
+    for coluna in colunas_y:
+        validos = np.flatnonzero(df[coluna].notna().to_numpy())
+        if metodo == 'minmax':
+            escolhidos = indices_minmax(df[coluna].to_numpy()[validos], pontos_coluna)
+        else:
+            escolhidos = indices_lttb(
+                df[coluna_x].to_numpy()[validos], df[coluna].to_numpy()[validos], pontos_coluna
+            )
+        selecionados.update(validos[escolhidos].tolist())
+    return df.iloc[sorted(selecionados)]
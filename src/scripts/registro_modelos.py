@@ -0,0 +1,139 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import pandas as pd
+
+from log.logger_config import configurar_logging
+
+# Configura o logging
+logger = configurar_logging(__name__)
+
+DIRETORIO_PADRAO = os.getenv(
+    'MODELOS_DIRETORIO',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'modelos')
+)
+PROCESSOS_TREINO_PADRAO = int(os.getenv('MODELOS_PROCESSOS', '2'))
+
+
+def calcular_chave(nome, dados, hiperparametros):
+    """
+    Calcula a chave do modelo a partir dos dados de treino e dos hiperparâmetros.
+
+    :param nome: Nome do modelo.
+    :param dados: DataFrame de treino.
+    :param hiperparametros: Dicionário de hiperparâmetros.
+    :return: Hash hexadecimal (16 caracteres).
+    """
+    hash_dados = pd.util.hash_pandas_object(dados, index=True).values.tobytes()
+    conteudo = hashlib.sha256()
+    conteudo.update(nome.encode())
+    conteudo.update(hash_dados)
+    conteudo.update(json.dumps(hiperparametros, sort_keys=True).encode())
+    return conteudo.hexdigest()[:16]
+
+
+def _treinar_e_salvar(caminho, treinar, dados, hiperparametros):
+    """Executado no processo de treino: treina, serializa e grava o artefato de forma atômica."""
+    inicio = time.perf_counter()
+    modelo, scaler, metricas = treinar(dados, **hiperparametros)
+    artefato = {
+        'modelo': modelo,
+        'scaler': scaler,
+        'metricas': metricas,
+        'hiperparametros': hiperparametros,
+        'treinado_em': time.time(),
+        'duracao_treino_s': time.perf_counter() - inicio,
+    }
+    temporario = caminho + '.tmp'
+    joblib.dump(artefato, temporario)
+    os.replace(temporario, caminho)
+    return caminho
+
+
+class RegistroModelos:
+    """
+    Registro de modelos treinados, persistidos em disco.
+
+    Cada artefato (modelo, scaler e métricas) é identificado pelo nome e por um
+    hash dos dados de treino e hiperparâmetros. As páginas apenas carregam o
+    artefato; quando ele não existe, o treino é enviado a um processo separado e
+    a página é informada de que o modelo ainda está sendo treinado.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_PADRAO, processos=PROCESSOS_TREINO_PADRAO):
+        self.diretorio = diretorio
+        self.processos = processos
+        self._carregados = {}
+        self._em_treino = {}
+        self._executor = None
+        self._trava = threading.Lock()
+        os.makedirs(diretorio, exist_ok=True)
+
+    def _caminho(self, nome, chave):
+        return os.path.join(self.diretorio, f"{nome}-{chave}.joblib")
+
+    def _obter_executor(self):
+        if self._executor is None:
+            # spawn: o processo de treino não herda as threads do servidor Streamlit
+            contexto = multiprocessing.get_context('spawn')
+            self._executor = ProcessPoolExecutor(max_workers=self.processos, mp_context=contexto)
+        return self._executor
+
+    def _ao_terminar(self, chave, futuro):
+        with self._trava:
+            self._em_treino.pop(chave, None)
+        erro = futuro.exception()
+        if erro is not None:
+            logger.error(f"Erro ao treinar modelo {chave}: {erro}")
+        else:
+            logger.info(f"Modelo salvo em {futuro.result()}")
+
+    def obter(self, nome, treinar, dados, hiperparametros):
+        """
+        Retorna o artefato do modelo, disparando o treino em segundo plano se necessário.
+
+        :param nome: Nome do modelo.
+        :param treinar: Função (dados, **hiperparametros) -> (modelo, scaler, metricas), importável.
+        :param dados: DataFrame de treino.
+        :param hiperparametros: Dicionário de hiperparâmetros.
+        :return: Dicionário do artefato ou None enquanto o modelo é treinado.
+        """
+        chave = calcular_chave(nome, dados, hiperparametros)
+        with self._trava:
+            if chave in self._carregados:
+                return self._carregados[chave]
+
+        caminho = self._caminho(nome, chave)
+        if os.path.exists(caminho):
+            artefato = joblib.load(caminho)
+            artefato['chave'] = chave
+            with self._trava:
+                self._carregados[chave] = artefato
+            return artefato
+
+        with self._trava:
+            if chave in self._em_treino:
+                return None
+            logger.info(f"Modelo '{nome}' ({chave}) não encontrado; treinando em segundo plano.")
+            futuro = self._obter_executor().submit(_treinar_e_salvar, caminho, treinar, dados, hiperparametros)
+            self._em_treino[chave] = futuro
+        # Fora da trava: se o treino já terminou, o callback roda aqui mesmo e precisa dela
+        futuro.add_done_callback(lambda f: self._ao_terminar(chave, f))
+        return None
+
+    def em_treino(self):
+        """
+        :return: Quantidade de treinos em andamento.
+        """
+        with self._trava:
+            return len(self._em_treino)
+
+
+# Registro compartilhado pelo processo
+registro_modelos = RegistroModelos()
@@ -0,0 +1,181 @@
+import asyncio
+import threading
+
+import oracledb
+
+from log.logger_config import configurar_logging
+from scripts.resumos import executar_merges, executar_merges_async, repetir_colisoes
+
+# Configura o logging
+logger = configurar_logging(__name__)
+
+# Tabela e coluna de identificação de cada tipo de sensor
+TABELAS_SENSORES = {
+    'umidade': ('SENSOR_UMIDADE', 'id_sensor_umidade'),
+    'ph': ('SENSOR_PH', 'id_sensor_ph'),
+}
+
+# Tipo de sensor de cada tabela de leitura (a temperatura vem do sensor DHT, cadastrado como umidade)
+TIPO_POR_TABELA = {
+    'LEITURA_SENSOR_UMIDADE': 'umidade',
+    'LEITURA_SENSOR_TEMPERATURA': 'umidade',
+    'LEITURA_SENSOR_PH': 'ph',
+}
+
+
+def ids_por_tipo(lotes):
+    """
+    :param lotes: Dicionário {tabela de leitura: [linhas com 'id_sensor']}.
+    :return: Dicionário {tipo de sensor: conjunto de IDs}.
+    """
+    ids = {tipo: set() for tipo in TABELAS_SENSORES}
+    for tabela, linhas in lotes.items():
+        ids[TIPO_POR_TABELA[tabela]].update(linha['id_sensor'] for linha in linhas)
+    return ids
+
+
+def instrucao_cadastro(tipo):
+    tabela, coluna = TABELAS_SENSORES[tipo]
+    return f"""
+        MERGE INTO {tabela} s
+        USING (SELECT :id_sensor AS id_sensor FROM dual) n
+        ON (s.{coluna} = n.id_sensor)
+        WHEN NOT MATCHED THEN INSERT ({coluna}) VALUES (n.id_sensor)
+    """
+
+
+class RegistroSensores:
+    """
+    Registro em memória dos sensores já cadastrados no banco.
+
+    Os IDs são carregados uma única vez; sensores desconhecidos são cadastrados
+    com um MERGE na primeira vez em que aparecem. Depois do aquecimento, a
+    ingestão não faz nenhuma consulta de existência.
+    """
+
+    def __init__(self):
+        self._conhecidos = {tipo: set() for tipo in TABELAS_SENSORES}
+        self._carregado = False
+        self._trava = threading.Lock()
+        # Serializa os cadastros feitos pelas gravações simultâneas do motor assíncrono
+        self._trava_assincrona = asyncio.Lock()
+
+    def carregar(self, conn):
+        """
+        Carrega os IDs de todos os sensores cadastrados.
+
+        :param conn: Conexão com o banco de dados.
+        """
+        cursor = conn.cursor()
+        try:
+            for tipo, (tabela, coluna) in TABELAS_SENSORES.items():
+                cursor.execute(f"SELECT {coluna} FROM {tabela}")
+                ids = {linha[0] for linha in cursor.fetchall()}
+                with self._trava:
+                    self._conhecidos[tipo].update(ids)
+            self._carregado = True
+            quantidades = {tipo: len(ids) for tipo, ids in self._conhecidos.items()}
+            logger.info(f"Registro de sensores carregado: {quantidades}")
+        finally:
+            cursor.close()
+
+    def desconhecidos(self, tipo, ids):
+        """
+        Filtra os IDs que ainda não estão no registro.
+
+        :param tipo: Tipo do sensor ('umidade' ou 'ph').
+        :param ids: Iterável de IDs de sensor.
+        :return: Conjunto de IDs desconhecidos.
+        """
+        with self._trava:
+            return set(ids) - self._conhecidos[tipo]
+
+    def garantir(self, conn, tipo, ids):
+        """
+        Garante que os sensores informados existem no banco.
+
+        Os desconhecidos são cadastrados com MERGE e commit próprio, de forma que
+        o cadastro não depende do sucesso do lote de leituras que o disparou.
+        Se outro worker cadastrou o mesmo sensor ao mesmo tempo (ORA-00001), o
+        MERGE é repetido para esse ID, que então já existe e não é inserido.
+
+        :param conn: Conexão com o banco de dados.
+        :param tipo: Tipo do sensor ('umidade' ou 'ph').
+        :param ids: Iterável de IDs de sensor.
+        """
+        if not self._carregado:
+            self.carregar(conn)
+
+        novos = self.desconhecidos(tipo, ids)
+        if not novos:
+            return
+
+        cursor = conn.cursor()
+        try:
+            executar_merges(cursor, self._passos_cadastro(tipo, novos))
+            conn.commit()
+        except oracledb.DatabaseError as e:
+            logger.error(f"Erro ao cadastrar sensores de {tipo} {sorted(novos)}: {e}")
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+        self._registrar(tipo, novos)
+
+    @staticmethod
+    def _passos_cadastro(tipo, novos):
+        tabela, _ = TABELAS_SENSORES[tipo]
+        binds = [{'id_sensor': id_sensor} for id_sensor in sorted(novos)]
+        return repetir_colisoes(instrucao_cadastro(tipo), binds, tabela, f"Cadastro em {tabela}")
+
+    def _registrar(self, tipo, novos):
+        with self._trava:
+            self._conhecidos[tipo].update(novos)
+        logger.info(f"Sensores de {tipo} cadastrados: {sorted(novos)}")
+
+    def garantir_lotes(self, conn, lotes):
+        """
+        Garante que os sensores de um lote de leituras existem (chamada antes dos inserts).
+
+        :param conn: Conexão com o banco de dados.
+        :param lotes: Dicionário {tabela de leitura: [linhas]}.
+        """
+        for tipo, ids in ids_por_tipo(lotes).items():
+            self.garantir(conn, tipo, ids)
+
+    async def carregar_async(self, conn):
+        """Versão de `carregar` para conexões assíncronas (oracledb.AsyncConnection)."""
+        for tipo, (tabela, coluna) in TABELAS_SENSORES.items():
+            linhas = await conn.fetchall(f"SELECT {coluna} FROM {tabela}")
+            with self._trava:
+                self._conhecidos[tipo].update(linha[0] for linha in linhas)
+        self._carregado = True
+        quantidades = {tipo: len(ids) for tipo, ids in self._conhecidos.items()}
+        logger.info(f"Registro de sensores carregado: {quantidades}")
+
+    async def garantir_lotes_async(self, conn, lotes):
+        """Versão de `garantir_lotes` para conexões assíncronas (oracledb.AsyncConnection)."""
+        if not self._carregado:
+            await self.carregar_async(conn)
+
+        async with self._trava_assincrona:
+            for tipo, ids in ids_por_tipo(lotes).items():
+                novos = self.desconhecidos(tipo, ids)
+                if not novos:
+                    continue
+                cursor = conn.cursor()
+                try:
+                    await executar_merges_async(cursor, self._passos_cadastro(tipo, novos))
+                    await conn.commit()
+                except oracledb.DatabaseError as e:
+                    logger.error(f"Erro ao cadastrar sensores de {tipo} {sorted(novos)}: {e}")
+                    await conn.rollback()
+                    raise
+                finally:
+                    cursor.close()
+                self._registrar(tipo, novos)
+
+
+# Registro compartilhado pelo processo
+registro_sensores = RegistroSensores()
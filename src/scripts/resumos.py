@@ -0,0 +1,268 @@
+from datetime import datetime, timedelta
+
+import oracledb
+
+from log.logger_config import configurar_logging
+
+# Configura o logging
+logger = configurar_logging(__name__)
+
+# Tabelas de leitura com resumo: prefixo das tabelas de resumo e faixa ideal de valores
+RESUMOS = {
+    'LEITURA_SENSOR_UMIDADE': ('RESUMO_UMIDADE', 45.0, 55.0),
+    'LEITURA_SENSOR_TEMPERATURA': ('RESUMO_TEMPERATURA', 12.0, 36.0),
+}
+
+# Granularidades, da mais fina para a mais grossa, com a duração de cada período
+GRANULARIDADES = (
+    ('MINUTO', timedelta(minutes=1)),
+    ('HORA', timedelta(hours=1)),
+    ('DIA', timedelta(days=1)),
+)
+
+# Quantidade mínima de períodos para que uma granularidade seja usada no gráfico
+PERIODOS_MINIMOS = 48
+
+# ORA-00001: a chave foi criada por outro worker entre o ON e o INSERT do MERGE
+DUP_VAL_ON_INDEX = 1
+# Tentativas do MERGE para as linhas que colidiram com uma chave recém-criada
+TENTATIVAS_MERGE = 3
+
+
+def truncar(momento, granularidade):
+    """
+    Trunca um datetime para o início do período da granularidade.
+
+    :param momento: datetime da leitura.
+    :param granularidade: 'MINUTO', 'HORA' ou 'DIA'.
+    :return: datetime truncado.
+    """
+    if granularidade == 'MINUTO':
+        return momento.replace(second=0, microsecond=0)
+    if granularidade == 'HORA':
+        return momento.replace(minute=0, second=0, microsecond=0)
+    return momento.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def agregar(linhas, granularidade, limite_minimo, limite_maximo):
+    """
+    Agrega as leituras de um lote por sensor e período.
+
+    :param linhas: Lista de dicionários com 'id_sensor', 'hora_leitura' e 'valor'.
+    :return: Lista de binds para o MERGE da tabela de resumo.
+    """
+    grupos = {}
+    for linha in linhas:
+        chave = (linha['id_sensor'], truncar(linha['hora_leitura'], granularidade))
+        valor = linha['valor']
+        fora = 1 if valor < limite_minimo or valor > limite_maximo else 0
+        grupo = grupos.get(chave)
+        if grupo is None:
+            grupos[chave] = [valor, valor, valor, 1, fora]
+        else:
+            grupo[0] = min(grupo[0], valor)
+            grupo[1] = max(grupo[1], valor)
+            grupo[2] += valor
+            grupo[3] += 1
+            grupo[4] += fora
+
+    # Ordem fixa de (sensor, período): transações simultâneas bloqueiam as linhas na mesma ordem
+    return [
+        {'id_sensor': id_sensor, 'periodo': periodo, 'minimo': g[0], 'maximo': g[1],
+         'soma': g[2], 'quantidade': g[3], 'fora': g[4]}
+        for (id_sensor, periodo), g in sorted(grupos.items())
+    ]
+
+
+def instrucao_merge(tabela_resumo):
+    return f"""
+        MERGE INTO {tabela_resumo} r
+        USING (
+            SELECT :id_sensor AS id_sensor, :periodo AS periodo, :minimo AS minimo, :maximo AS maximo,
+                   :soma AS soma, :quantidade AS quantidade, :fora AS fora
+            FROM dual
+        ) n
+        ON (r.id_sensor = n.id_sensor AND r.periodo = n.periodo)
+        WHEN MATCHED THEN UPDATE SET
+            r.valor_minimo = LEAST(r.valor_minimo, n.minimo),
+            r.valor_maximo = GREATEST(r.valor_maximo, n.maximo),
+            r.soma_valores = r.soma_valores + n.soma,
+            r.quantidade = r.quantidade + n.quantidade,
+            r.fora_limite = r.fora_limite + n.fora
+        WHEN NOT MATCHED THEN INSERT
+            (id_sensor, periodo, valor_minimo, valor_maximo, soma_valores, quantidade, fora_limite)
+            VALUES (n.id_sensor, n.periodo, n.minimo, n.maximo, n.soma, n.quantidade, n.fora)
+    """
+
+
+def colisoes(binds, erros, tabela):
+    """
+    Separa, dos erros de um MERGE com batcherrors, as linhas que colidiram com uma chave recém-criada.
+
+    Usada também pelo cadastro de sensores (registro_sensores), sujeito à mesma corrida entre workers.
+
+    :param binds: Binds enviados no executemany.
+    :param erros: Resultado de cursor.getbatcherrors().
+    :param tabela: Tabela do MERGE (apenas para a mensagem de erro).
+    :return: Lista de binds a repetir.
+    :raises oracledb.DatabaseError: Se algum erro não for ORA-00001.
+    """
+    for erro in erros:
+        if erro.code != DUP_VAL_ON_INDEX:
+            raise oracledb.DatabaseError(f"Erro no MERGE de {tabela}: {erro.message}")
+    return [binds[erro.offset] for erro in erros]
+
+
+def repetir_colisoes(instrucao, binds, tabela, descricao):
+    """
+    Passos de um MERGE com batcherrors, repetido só para as linhas que colidiram.
+
+    Gerador compartilhado pelas versões síncrona e assíncrona: cada passo produz
+    (instrução, binds) para um executemany e recebe de volta o resultado de
+    cursor.getbatcherrors() (ver `executar_merges`).
+
+    :param instrucao: MERGE a executar.
+    :param binds: Binds do executemany.
+    :param tabela: Tabela do MERGE (apenas para as mensagens de erro).
+    :param descricao: Início da mensagem de colisões persistentes (por exemplo, "Resumo RESUMO_UMIDADE_DIA").
+    :raises oracledb.DatabaseError: Se as colisões persistirem após TENTATIVAS_MERGE execuções.
+    """
+    for _ in range(TENTATIVAS_MERGE):
+        erros = yield instrucao, binds
+        binds = colisoes(binds, erros, tabela)
+        if not binds:
+            return
+    raise oracledb.DatabaseError(f"{descricao}: colisões persistentes em {len(binds)} linhas")
+
+
+def executar_merges(cursor, passos):
+    """
+    Executa os passos de um gerador de MERGEs (`repetir_colisoes`) com executemany e batcherrors.
+
+    :param cursor: Cursor da conexão.
+    :param passos: Gerador de (instrução, binds).
+    """
+    try:
+        instrucao, binds = next(passos)
+        while True:
+            cursor.executemany(instrucao, binds, batcherrors=True)
+            instrucao, binds = passos.send(cursor.getbatcherrors())
+    except StopIteration:
+        pass
+
+
+async def executar_merges_async(cursor, passos):
+    """Versão de `executar_merges` para cursores assíncronos (oracledb.AsyncCursor)."""
+    try:
+        instrucao, binds = next(passos)
+        while True:
+            await cursor.executemany(instrucao, binds, batcherrors=True)
+            instrucao, binds = passos.send(cursor.getbatcherrors())
+    except StopIteration:
+        pass
+
+
+def merges_resumo(lotes):
+    """
+    Passos de MERGE que atualizam as tabelas de resumo com um lote de leituras.
+
+    :param lotes: Dicionário {tabela de leitura: [linhas]}.
+    """
+    for tabela, linhas in lotes.items():
+        if tabela not in RESUMOS or not linhas:
+            continue
+        prefixo, limite_minimo, limite_maximo = RESUMOS[tabela]
+        for granularidade, _ in GRANULARIDADES:
+            tabela_resumo = f"{prefixo}_{granularidade}"
+            binds = agregar(linhas, granularidade, limite_minimo, limite_maximo)
+            yield from repetir_colisoes(instrucao_merge(tabela_resumo), binds, tabela_resumo, f"Resumo {tabela_resumo}")
+
+
+def atualizar_resumos(conn, lotes):
+    """
+    Atualiza incrementalmente as tabelas de resumo com um lote de leituras.
+
+    Deve ser chamada na mesma transação dos inserts, para que leituras e resumos
+    sejam confirmados juntos.
+
+    Com vários workers de ingestão, dois processos podem ver primeiro o mesmo
+    (sensor, período): ambos caem no INSERT do MERGE e o segundo recebe
+    ORA-00001 quando o primeiro confirma. O MERGE usa batcherrors e só as linhas
+    que colidiram são repetidas (agora como UPDATE), sem desfazer o lote.
+
+    :param conn: Conexão com o banco de dados.
+    :param lotes: Dicionário {tabela de leitura: [linhas]}.
+    """
+    cursor = conn.cursor()
+    try:
+        executar_merges(cursor, merges_resumo(lotes))
+    finally:
+        cursor.close()
+
+
+async def atualizar_resumos_async(conn, lotes):
+    """Versão de `atualizar_resumos` para conexões assíncronas (oracledb.AsyncConnection)."""
+    cursor = conn.cursor()
+    try:
+        await executar_merges_async(cursor, merges_resumo(lotes))
+    finally:
+        cursor.close()
+
+
+def escolher_granularidade(inicio, fim):
+    """
+    Escolhe a granularidade mais grossa que ainda produz PERIODOS_MINIMOS períodos no intervalo.
+
+    :param inicio: datetime inicial.
+    :param fim: datetime final.
+    :return: 'DIA', 'HORA', 'MINUTO' ou None quando o intervalo pede as leituras brutas
+             (menos de PERIODOS_MINIMOS minutos, isto é, janelas abaixo de 48 minutos).
+    """
+    intervalo = fim - inicio
+    for granularidade, duracao in reversed(GRANULARIDADES):
+        if intervalo / duracao >= PERIODOS_MINIMOS:
+            return granularidade
+    return None
+
+
+def consultar_resumo(conn, tabela_leitura, granularidade, inicio, fim, id_sensor=None):
+    """
+    Consulta a tabela de resumo de uma granularidade no intervalo informado.
+
+    :return: Lista de tuplas (periodo, minimo, maximo, media, quantidade, fora_limite) em ordem de período.
+    """
+    prefixo, _, _ = RESUMOS[tabela_leitura]
+    filtro_sensor = "AND id_sensor = :id_sensor" if id_sensor is not None else ""
+    parametros = {'inicio': inicio, 'fim': fim}
+    if id_sensor is not None:
+        parametros['id_sensor'] = id_sensor
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"""
+            SELECT periodo, MIN(valor_minimo), MAX(valor_maximo),
+                   SUM(soma_valores) / SUM(quantidade), SUM(quantidade), SUM(fora_limite)
+            FROM {prefixo}_{granularidade}
+            WHERE periodo >= :inicio AND periodo < :fim {filtro_sensor}
+            GROUP BY periodo
+            ORDER BY periodo
+        """, parametros)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def periodo_total(conn, tabela_leitura):
+    """
+    :return: Tupla (primeiro período, agora) coberta pelo resumo diário, ou None se estiver vazio.
+    """
+    prefixo, _, _ = RESUMOS[tabela_leitura]
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT MIN(periodo) FROM {prefixo}_DIA")
+        primeiro = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+    if primeiro is None:
+        return None
+    return primeiro, datetime.now()
@@ -1,24 +1,34 @@
 import os
-from dotenv import load_dotenv
+import sys
 import oracledb
-import logging
-import streamlit as st
 
-# Configuração do logging
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+# Permite executar o script diretamente (python src/scripts/setup_db.py)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-file_handler = logging.FileHandler('setup_bd.log')
-file_handler.setLevel(logging.INFO)
-file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-logger.addHandler(file_handler)
+from log.logger_config import configurar_logging
 
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-logger.addHandler(console_handler)
+# Configura o logging
+logger = configurar_logging(__name__)
 
-def criar_sequencias_e_triggers(conn):
+# Perfil do schema: 'padrao' (sequência + trigger por linha) ou 'ingestao' (para alto volume de leituras)
+PERFIL_SCHEMA = os.getenv('DB_PERFIL_SCHEMA', 'padrao')
+
+# Perfil de ingestão: cache das identidades/sequências e intervalo das partições das tabelas de leitura
+CACHE_IDENTIDADE = int(os.getenv('DB_CACHE_IDENTIDADE', '1000'))
+INTERVALO_PARTICAO = "NUMTOYMINTERVAL(1, 'MONTH')"
+LIMITE_PARTICAO_INICIAL = "TIMESTAMP '2024-01-01 00:00:00'"
+# Chave de partição nunca nula: um NULL explícito no INSERT vira a hora do banco (DEFAULT ON NULL implica NOT NULL)
+DEFAULT_HORA_LEITURA = "DEFAULT ON NULL SYSTIMESTAMP"
+
+# Tabelas de leitura: tabela -> (coluna do sensor, coluna id)
+TABELAS_LEITURA = {
+    'LEITURA_SENSOR_UMIDADE': ('id_sensor_umidade', 'id_leitura_umidade'),
+    'LEITURA_SENSOR_TEMPERATURA': ('id_sensor_umidade', 'id_leitura_temperatura'),
+    'LEITURA_SENSOR_PH': ('id_sensor_ph', 'id_leitura_ph'),
+    'LEITURA_SENSOR_NUTRIENTES': ('id_sensor_nutrientes', 'id_leitura_nutrientes'),
+}
+
+def criar_sequencias_e_triggers(conn, perfil=PERFIL_SCHEMA):
     """Cria sequências e triggers para IDs automáticos nas tabelas que precisam de IDs gerados automaticamente."""
     cursor = conn.cursor()
     tabelas_com_trigger = {
@@ -34,6 +44,11 @@ def criar_sequencias_e_triggers(conn):
         'CLIMA': 'id_clima'
     }
     
+    if perfil == 'ingestao':
+        # As tabelas de leitura usam colunas de identidade, sem trigger por linha
+        for tabela in TABELAS_LEITURA:
+            tabelas_com_trigger.pop(tabela)
+
     for tabela, id_coluna in tabelas_com_trigger.items():
         try:
             cursor.execute(f"""
@@ -65,7 +80,73 @@ def tabela_existe(cursor, nome_tabela):
     cursor.execute("SELECT COUNT(*) FROM user_tables WHERE table_name = :nome_tabela", nome_tabela=nome_tabela.upper())
     return cursor.fetchone()[0] > 0
 
-def criar_tabelas(conn):
+# Tabelas de resumo: prefixo -> (tabela de leitura, coluna do sensor, coluna do valor, limite mínimo, limite máximo)
+RESUMOS = {
+    'RESUMO_UMIDADE': ('LEITURA_SENSOR_UMIDADE', 'id_sensor_umidade', 'valor_umidade_leitura', 45, 55),
+    'RESUMO_TEMPERATURA': ('LEITURA_SENSOR_TEMPERATURA', 'id_sensor_umidade', 'valor_temperatura', 12, 36),
+}
+
+# Granularidades dos resumos e o formato do TRUNC correspondente no Oracle
+GRANULARIDADES_RESUMO = {'MINUTO': 'MI', 'HORA': 'HH', 'DIA': 'DD'}
+
+def tabelas_resumo():
+    """Retorna o DDL das tabelas de resumo (mín/máx/soma/quantidade/fora do limite por sensor e período)."""
+    tabelas = {}
+    for prefixo in RESUMOS:
+        for granularidade in GRANULARIDADES_RESUMO:
+            nome = f"{prefixo}_{granularidade}"
+            tabelas[nome] = f"""
+                CREATE TABLE {nome} (
+                    id_sensor NUMBER NOT NULL,
+                    periodo TIMESTAMP NOT NULL,
+                    valor_minimo DECIMAL(10,2),
+                    valor_maximo DECIMAL(10,2),
+                    soma_valores NUMBER,
+                    quantidade NUMBER,
+                    fora_limite NUMBER,
+                    CONSTRAINT {nome}_PK PRIMARY KEY (id_sensor, periodo)
+                )
+            """
+    return tabelas
+
+def popular_resumo(cursor, nome_tabela):
+    """Preenche uma tabela de resumo recém-criada a partir das leituras já existentes."""
+    prefixo, granularidade = nome_tabela.rsplit('_', 1)
+    tabela, coluna_sensor, coluna_valor, minimo, maximo = RESUMOS[prefixo]
+    formato = GRANULARIDADES_RESUMO[granularidade]
+    cursor.execute(f"""
+        INSERT INTO {nome_tabela}
+            (id_sensor, periodo, valor_minimo, valor_maximo, soma_valores, quantidade, fora_limite)
+        SELECT {coluna_sensor}, CAST(TRUNC(hora_leitura, '{formato}') AS TIMESTAMP),
+               MIN({coluna_valor}), MAX({coluna_valor}), SUM({coluna_valor}), COUNT(*),
+               SUM(CASE WHEN {coluna_valor} < {minimo} OR {coluna_valor} > {maximo} THEN 1 ELSE 0 END)
+        FROM {tabela}
+        WHERE {coluna_sensor} IS NOT NULL AND hora_leitura IS NOT NULL
+        GROUP BY {coluna_sensor}, TRUNC(hora_leitura, '{formato}')
+    """)
+    logger.info(f"Tabela de resumo '{nome_tabela}' preenchida com {cursor.rowcount} períodos.")
+
+def ddl_leitura_ingestao(comando_sql, coluna_id):
+    """
+    Adapta o DDL de uma tabela de leitura ao perfil de ingestão.
+
+    O id passa a ser uma coluna de identidade com cache grande e a tabela é
+    particionada por intervalo em hora_leitura. A chave de partição não pode ser
+    nula (ORA-14300), então hora_leitura recebe DEFAULT ON NULL SYSTIMESTAMP.
+    """
+    comando_sql = comando_sql.replace(
+        f"{coluna_id} NUMBER PRIMARY KEY",
+        f"{coluna_id} NUMBER GENERATED BY DEFAULT ON NULL AS IDENTITY (CACHE {CACHE_IDENTIDADE}) PRIMARY KEY"
+    )
+    comando_sql = comando_sql.replace(
+        "hora_leitura TIMESTAMP,", f"hora_leitura TIMESTAMP {DEFAULT_HORA_LEITURA},"
+    )
+    return comando_sql.rstrip() + f"""
+                PARTITION BY RANGE (hora_leitura) INTERVAL ({INTERVALO_PARTICAO})
+                (PARTITION p_inicial VALUES LESS THAN ({LIMITE_PARTICAO_INICIAL}))
+            """
+
+def criar_tabelas(conn, perfil=PERFIL_SCHEMA):
     """Cria todas as tabelas necessárias no banco de dados Oracle se elas não existirem."""
     cursor = conn.cursor()
     try:
@@ -192,10 +273,18 @@ def criar_tabelas(conn):
             """
         }
 
+        tabelas.update(tabelas_resumo())
+
+        if perfil == 'ingestao':
+            for tabela, (_, coluna_id) in TABELAS_LEITURA.items():
+                tabelas[tabela] = ddl_leitura_ingestao(tabelas[tabela], coluna_id)
+
         for nome_tabela, comando_sql in tabelas.items():
             if not tabela_existe(cursor, nome_tabela):
                 cursor.execute(comando_sql)
                 logger.info(f"Tabela '{nome_tabela}' criada com sucesso.")
+                if nome_tabela.startswith('RESUMO_'):
+                    popular_resumo(cursor, nome_tabela)
             else:
                 logger.info(f"Tabela '{nome_tabela}' já existe.")
         
@@ -207,24 +296,121 @@ def criar_tabelas(conn):
     finally:
         cursor.close()
 
-def setup_banco_dados(conn):
-    logger.info("Iniciando configuração do banco de dados")
-    criar_tabelas(conn)
-    criar_sequencias_e_triggers(conn)
+def indice_existe(cursor, nome_indice):
+    cursor.execute("SELECT COUNT(*) FROM user_indexes WHERE index_name = :nome_indice", nome_indice=nome_indice.upper())
+    return cursor.fetchone()[0] > 0
+
+def criar_indices(conn, perfil=PERFIL_SCHEMA):
+    """Cria os índices compostos usados pela paginação por chave (hora_leitura, id) nas tabelas de leitura."""
+    cursor = conn.cursor()
+    # No perfil de ingestão os índices são locais (um segmento por partição)
+    local = " LOCAL" if perfil == 'ingestao' else ""
+
+    for tabela, (coluna_sensor, coluna_id) in TABELAS_LEITURA.items():
+        indices = {
+            f"{tabela}_HORA_IX": f"{tabela} (hora_leitura, {coluna_id})",
+            f"{tabela}_SENSOR_IX": f"{tabela} ({coluna_sensor}, hora_leitura, {coluna_id})",
+        }
+        for nome_indice, definicao in indices.items():
+            try:
+                if not indice_existe(cursor, nome_indice):
+                    cursor.execute(f"CREATE INDEX {nome_indice} ON {definicao}{local}")
+                    logger.info(f"Índice '{nome_indice}' criado.")
+                else:
+                    logger.info(f"Índice '{nome_indice}' já existe.")
+            except oracledb.DatabaseError as e:
+                logger.error(f"Erro ao criar índice {nome_indice}: {e}")
+    cursor.close()
+
+def tabela_particionada(cursor, nome_tabela):
+    cursor.execute("SELECT COUNT(*) FROM user_part_tables WHERE table_name = :nome_tabela", nome_tabela=nome_tabela.upper())
+    return cursor.fetchone()[0] > 0
+
+def coluna_anulavel(cursor, nome_tabela, nome_coluna):
+    cursor.execute(
+        "SELECT nullable FROM user_tab_columns WHERE table_name = :nome_tabela AND column_name = :nome_coluna",
+        nome_tabela=nome_tabela.upper(), nome_coluna=nome_coluna.upper()
+    )
+    linha = cursor.fetchone()
+    return linha is not None and linha[0] == 'Y'
+
+def trigger_existe(cursor, nome_trigger):
+    cursor.execute("SELECT COUNT(*) FROM user_triggers WHERE trigger_name = :nome_trigger", nome_trigger=nome_trigger.upper())
+    return cursor.fetchone()[0] > 0
+
+def tornar_hora_leitura_obrigatoria(conn, cursor, tabela):
+    """Preenche as horas nulas e impede novas, pois a chave de partição não pode ser nula."""
+    cursor.execute(f"""
+        UPDATE {tabela}
+        SET hora_leitura = NVL(CAST(data_leitura AS TIMESTAMP), SYSTIMESTAMP)
+        WHERE hora_leitura IS NULL
+    """)
+    conn.commit()
+    cursor.execute(f"ALTER TABLE {tabela} MODIFY hora_leitura {DEFAULT_HORA_LEITURA}")
+    logger.info(f"Coluna hora_leitura de '{tabela}' com {DEFAULT_HORA_LEITURA}.")
+
+def particionar_tabela_leitura(conn, cursor, tabela):
+    """Reparticiona, online, uma tabela de leitura por intervalo em hora_leitura, com índices locais."""
+    indices = [nome for nome in (f"{tabela}_HORA_IX", f"{tabela}_SENSOR_IX") if indice_existe(cursor, nome)]
+    atualizar_indices = ""
+    if indices:
+        atualizar_indices = f"UPDATE INDEXES ({', '.join(f'{nome} LOCAL' for nome in indices)})"
+    cursor.execute(f"""
+        ALTER TABLE {tabela} MODIFY
+        PARTITION BY RANGE (hora_leitura) INTERVAL ({INTERVALO_PARTICAO})
+        (PARTITION p_inicial VALUES LESS THAN ({LIMITE_PARTICAO_INICIAL}))
+        ONLINE {atualizar_indices}
+    """)
+    logger.info(f"Tabela '{tabela}' particionada por intervalo em hora_leitura.")
+
+def remover_trigger_leitura(cursor, tabela, coluna_id):
+    """Troca a trigger por linha por DEFAULT ON NULL com a sequência existente, com cache ampliado."""
+    cursor.execute(f"ALTER SEQUENCE {tabela}_SEQ CACHE {CACHE_IDENTIDADE}")
+    cursor.execute(f"ALTER TABLE {tabela} MODIFY {coluna_id} DEFAULT ON NULL {tabela}_SEQ.NEXTVAL")
+    cursor.execute(f"DROP TRIGGER {tabela}_BI")
+    logger.info(f"Trigger '{tabela}_BI' substituída por DEFAULT ON NULL {tabela}_SEQ.NEXTVAL.")
+
+def migrar_perfil_ingestao(conn):
+    """
+    Converte, no lugar, as tabelas de leitura de uma instalação existente para o perfil de ingestão.
+
+    Uma coluna existente não pode virar identidade no Oracle, então o id passa a
+    ser preenchido por DEFAULT ON NULL com a sequência já usada, que tem o mesmo
+    custo por linha. Cada etapa só é executada se ainda for necessária, então a
+    migração pode ser repetida.
+    """
+    cursor = conn.cursor()
+    try:
+        for tabela, (_, coluna_id) in TABELAS_LEITURA.items():
+            if not tabela_existe(cursor, tabela):
+                continue
+            try:
+                if coluna_anulavel(cursor, tabela, 'hora_leitura'):
+                    tornar_hora_leitura_obrigatoria(conn, cursor, tabela)
+                if not tabela_particionada(cursor, tabela):
+                    particionar_tabela_leitura(conn, cursor, tabela)
+                if trigger_existe(cursor, f"{tabela}_BI"):
+                    remover_trigger_leitura(cursor, tabela, coluna_id)
+            except oracledb.DatabaseError as e:
+                logger.error(f"Erro ao migrar a tabela {tabela} para o perfil de ingestão: {e}")
+                conn.rollback()
+    finally:
+        cursor.close()
+
+def setup_banco_dados(conn, perfil=PERFIL_SCHEMA):
+    logger.info(f"Iniciando configuração do banco de dados (perfil '{perfil}')")
+    criar_tabelas(conn, perfil)
+    criar_sequencias_e_triggers(conn, perfil)
+    if perfil == 'ingestao':
+        migrar_perfil_ingestao(conn)
+    criar_indices(conn, perfil)
     logger.info("Configuração do banco de dados concluída")
 
 if __name__ == "__main__":
-    load_dotenv()
-    
-    try:
-        conn = oracledb.connect(
-            user=os.getenv('DB_USER'),
-            password=os.getenv('DB_PASSWORD'),
-            dsn=os.getenv('DB_DSN')
-        )
+    from scripts.connect_db import conectar_banco, fechar_conexao, fechar_pool
+
+    conn = conectar_banco()
+    if conn:
         setup_banco_dados(conn)
-    except oracledb.DatabaseError as e:
-        logger.error(f"Erro ao conectar ao banco de dados: {e}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
+        fechar_conexao(conn)
+    fechar_pool()
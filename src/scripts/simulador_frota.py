@@ -0,0 +1,410 @@
+"""
+Simulador de frota para teste de carga da ingestão MQTT.
+
+Emite, para N dispositivos virtuais, os mesmos payloads JSON do firmware
+(PlatformIO/src/main.cpp) nos mesmos tópicos, e os entrega ao pipeline real de
+`mqtt_client.py` por meio de um broker local e de um banco local em memória.
+Ao final reporta vazão sustentada, latência ponta a ponta (envio pelo
+dispositivo até o commit) em p50/p99 e perdas.
+
+Uso:
+    python src/scripts/simulador_frota.py --dispositivos 500 --duracao 60
+"""
+import argparse
+import asyncio
+import contextlib
+import heapq
+import json
+import os
+import queue
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from types import SimpleNamespace
+
+# Permite executar o script diretamente (python src/scripts/simulador_frota.py)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mqtt_client
+
+
+class BrokerLocal:
+    """
+    Substituto local do broker MQTT.
+
+    As mensagens publicadas entram numa fila e são entregues aos assinantes por
+    uma única thread, como faz o loop de rede do paho.
+    """
+
+    def __init__(self):
+        self._fila = queue.Queue()
+        self._assinantes = []
+        self._thread = None
+
+    def conectar(self, cliente):
+        self._assinantes.append(cliente)
+
+    def publish(self, topico, payload):
+        self._fila.put((topico, payload))
+
+    def _entregar(self):
+        while True:
+            item = self._fila.get()
+            if item is None:
+                return
+            topico, payload = item
+            if isinstance(payload, str):
+                payload = payload.encode()
+            msg = SimpleNamespace(topic=topico, payload=payload)
+            for cliente in self._assinantes:
+                if cliente.assinado(topico):
+                    cliente.on_message(cliente, None, msg)
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._entregar, name="broker-local", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._fila.put(None)
+        self._thread.join()
+
+    def pendentes(self):
+        return self._fila.qsize()
+
+
+class ClienteLocal:
+    """Cliente com a mesma interface usada pelos callbacks de `mqtt_client.py`."""
+
+    def __init__(self, broker, on_connect, on_message):
+        self.broker = broker
+        self.on_message = on_message
+        self._topicos = set()
+        broker.conectar(self)
+        on_connect(self, None, None, 0)
+
+    def subscribe(self, topico):
+        self._topicos.add(topico)
+
+    def assinado(self, topico):
+        return topico in self._topicos
+
+    def publish(self, topico, payload):
+        self.broker.publish(topico, payload)
+
+
+class BancoLocal:
+    """
+    Substituto local do banco Oracle.
+
+    Guarda apenas o instante do commit de cada linha inserida e simula o custo de
+    ida e volta (`latencia_ms`) e o custo por linha (`custo_linha_us`).
+    """
+
+    def __init__(self, latencia_ms=2.0, custo_linha_us=20.0, sessoes=4):
+        self.latencia = latencia_ms / 1000
+        self.custo_linha = custo_linha_us / 1_000_000
+        self.sessoes = sessoes
+        self.commits = defaultdict(list)
+        self.total_commits = 0
+        self._trava = threading.Lock()
+        self._semaforo = None
+
+    def conectar(self):
+        return ConexaoLocal(self)
+
+    @contextlib.asynccontextmanager
+    async def adquirir(self):
+        """Equivalente a AsyncConnectionPool.acquire, limitado a `sessoes` conexões simultâneas."""
+        if self._semaforo is None:
+            self._semaforo = asyncio.Semaphore(self.sessoes)
+        async with self._semaforo:
+            yield ConexaoLocalAssincrona(self)
+
+    def registrar_commit(self, pendentes):
+        agora = time.time()
+        with self._trava:
+            self.total_commits += 1
+            for tabela, id_sensor in pendentes:
+                self.commits[(tabela, id_sensor)].append(agora)
+
+
+class ConexaoLocal:
+
+    def __init__(self, banco):
+        self.banco = banco
+        self.pendentes = []
+
+    def cursor(self):
+        return CursorLocal(self)
+
+    def commit(self):
+        time.sleep(self.banco.latencia)
+        self.banco.registrar_commit(self.pendentes)
+        self.pendentes = []
+
+    def rollback(self):
+        self.pendentes = []
+
+    def close(self):
+        pass
+
+
+class CursorLocal:
+    _INSERT = re.compile(r"INSERT\s+INTO\s+(\w+)", re.IGNORECASE)
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, parametros=None):
+        time.sleep(self.conn.banco.latencia)
+
+    def executemany(self, sql, linhas, batcherrors=False):
+        time.sleep(self.conn.banco.latencia + self.conn.banco.custo_linha * len(linhas))
+        insert = self._INSERT.search(sql)
+        if insert:
+            tabela = insert.group(1).upper()
+            self.conn.pendentes.extend((tabela, linha['id_sensor']) for linha in linhas)
+
+    def getbatcherrors(self):
+        return []
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+class ConexaoLocalAssincrona:
+    """Conexão com a interface de oracledb.AsyncConnection usada pelo motor asyncio."""
+
+    def __init__(self, banco):
+        self.banco = banco
+        self.pendentes = []
+
+    async def fetchall(self, sql, parametros=None):
+        await asyncio.sleep(self.banco.latencia)
+        return []
+
+    def cursor(self):
+        return CursorLocalAssincrono(self)
+
+    async def executemany(self, sql, linhas):
+        await asyncio.sleep(self.banco.latencia + self.banco.custo_linha * len(linhas))
+        insert = CursorLocal._INSERT.search(sql)
+        if insert:
+            tabela = insert.group(1).upper()
+            self.pendentes.extend((tabela, linha['id_sensor']) for linha in linhas)
+
+    async def commit(self):
+        await asyncio.sleep(self.banco.latencia)
+        self.banco.registrar_commit(self.pendentes)
+        self.pendentes = []
+
+    async def rollback(self):
+        self.pendentes = []
+
+
+class CursorLocalAssincrono:
+    """Cursor com a interface de oracledb.AsyncCursor usada pelo GravadorAssincrono."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def executemany(self, sql, linhas, batcherrors=False):
+        await self.conn.executemany(sql, linhas)
+
+    def getbatcherrors(self):
+        return []
+
+    def close(self):
+        pass
+
+
+# Tópicos emitidos pelo firmware e deslocamento do id_sensor de cada um
+TOPICOS_DISPOSITIVO = (
+    (mqtt_client.humidity_topic, 1, 'LEITURA_SENSOR_UMIDADE'),
+    (mqtt_client.temperature_topic, 2, 'LEITURA_SENSOR_TEMPERATURA'),
+    (mqtt_client.ph_sensor, 3, 'LEITURA_SENSOR_PH'),
+)
+
+
+def montar_payload(id_sensor, valor):
+    """Monta o payload exatamente como o firmware (sendHumidityDataToMQTT e afins)."""
+    agora = datetime.now()
+    return (
+        "{"
+        f"\"id_sensor\":{id_sensor},"
+        f"\"data_leitura\":\"{agora.strftime('%Y-%m-%d')}\","
+        f"\"hora_leitura\":\"{agora.strftime('%H:%M')}\","
+        f"\"Valor\":{valor:.2f}"
+        "}"
+    )
+
+
+def valor_simulado(topico):
+    if topico == mqtt_client.humidity_topic:
+        return min(max(50 + random.uniform(-1, 1) * 10, 40), 60)
+    if topico == mqtt_client.temperature_topic:
+        return min(max(25 + random.uniform(-1, 1) * 5, 20), 30)
+    return float(random.randint(0, 14))
+
+
+def emitir(broker, dispositivos, intervalo, intervalo_ph, duracao, envios):
+    """
+    Publica as leituras de todos os dispositivos até o fim da duração.
+
+    Os dispositivos começam em instantes espalhados no primeiro intervalo, para
+    não publicarem todos ao mesmo tempo.
+    """
+    inicio = time.monotonic()
+    agenda = []
+    for d in range(dispositivos):
+        for topico, deslocamento, tabela in TOPICOS_DISPOSITIVO:
+            periodo = intervalo_ph if topico == mqtt_client.ph_sensor else intervalo
+            id_sensor = d * 3 + deslocamento
+            heapq.heappush(agenda, (inicio + random.uniform(0, periodo), id_sensor, topico, tabela, periodo))
+
+    while agenda:
+        instante, id_sensor, topico, tabela, periodo = heapq.heappop(agenda)
+        if instante - inicio >= duracao:
+            break
+        espera = instante - time.monotonic()
+        if espera > 0:
+            time.sleep(espera)
+
+        envios[(tabela, id_sensor)].append(time.time())
+        broker.publish(topico, montar_payload(id_sensor, valor_simulado(topico)))
+        heapq.heappush(agenda, (instante + periodo, id_sensor, topico, tabela, periodo))
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def calcular_relatorio(envios, banco, duracao):
+    """Casa envios e commits de cada sensor, na ordem, para obter latências e perdas."""
+    latencias = []
+    enviadas = 0
+    gravadas = 0
+    for chave, instantes_envio in envios.items():
+        instantes_commit = banco.commits.get(chave, [])
+        enviadas += len(instantes_envio)
+        gravadas += len(instantes_commit)
+        for envio, commit in zip(instantes_envio, instantes_commit):
+            latencias.append((commit - envio) * 1000)
+
+    latencias.sort()
+    return {
+        'enviadas': enviadas,
+        'gravadas': gravadas,
+        'perdidas': enviadas - gravadas,
+        'perda_percentual': 100 * (enviadas - gravadas) / enviadas if enviadas else 0.0,
+        'vazao_msgs_s': gravadas / duracao if duracao else 0.0,
+        'latencia_p50_ms': percentil(latencias, 0.50),
+        'latencia_p99_ms': percentil(latencias, 0.99),
+        'commits': banco.total_commits,
+    }
+
+
+def iniciar_motor_assincrono(broker, banco, diretorio_spool):
+    """
+    Inicia o motor asyncio de `mqtt_client.py` num loop de eventos em thread própria.
+
+    :return: Tupla (loop, thread do loop, cliente local).
+    """
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name="loop-asyncio", daemon=True)
+    thread.start()
+
+    def on_message(client, userdata, msg):
+        # Papel do aiomqtt: decodifica e entrega a mensagem ao loop de eventos
+        try:
+            payload = json.loads(msg.payload.decode())
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            return
+        loop.call_soon_threadsafe(mqtt_client.processar_mensagem, (msg.topic, payload))
+
+    cliente = ClienteLocal(broker, mqtt_client.on_connect, on_message)
+    asyncio.run_coroutine_threadsafe(
+        mqtt_client.iniciar_ingestao_assincrona(
+            banco.adquirir, lambda comando: cliente.publish(mqtt_client.pump_topic, comando), diretorio_spool
+        ), loop
+    ).result()
+    return loop, thread, cliente
+
+
+def executar(dispositivos, intervalo, intervalo_ph, duracao, latencia_ms, custo_linha_us, motor='threads'):
+    """
+    Executa um teste de carga completo e retorna o relatório.
+
+    :param motor: 'threads' (paho + pipeline de workers) ou 'asyncio' (gravações assíncronas simultâneas).
+    :return: Dicionário com vazão, latências, perdas e estatísticas dos estágios.
+    """
+    broker = BrokerLocal()
+    banco = BancoLocal(latencia_ms, custo_linha_us)
+    envios = defaultdict(list)
+
+    diretorio_spool = tempfile.mkdtemp(prefix='spool-simulador-')
+    if motor == 'asyncio':
+        loop, thread, cliente = iniciar_motor_assincrono(broker, banco, diretorio_spool)
+    else:
+        cliente = ClienteLocal(broker, mqtt_client.on_connect, mqtt_client.on_message)
+        mqtt_client.iniciar_ingestao(banco.conectar, lambda comando: cliente.publish(mqtt_client.pump_topic, comando),
+                                     diretorio_spool=diretorio_spool)
+    broker.iniciar()
+
+    inicio = time.monotonic()
+    emitir(broker, dispositivos, intervalo, intervalo_ph, duracao, envios)
+    duracao_real = time.monotonic() - inicio
+
+    # Espera o broker entregar o que foi publicado e drena a ingestão
+    while broker.pendentes():
+        time.sleep(0.05)
+    broker.parar()
+    if motor == 'asyncio':
+        estagios = asyncio.run_coroutine_threadsafe(mqtt_client.encerrar_ingestao_assincrona(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+    else:
+        estagios = mqtt_client.encerrar_ingestao()
+
+    relatorio = calcular_relatorio(envios, banco, duracao_real)
+    relatorio['motor'] = motor
+    relatorio['estagios'] = estagios
+    shutil.rmtree(diretorio_spool, ignore_errors=True)
+    return relatorio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga local da ingestão MQTT.")
+    parser.add_argument('--dispositivos', type=int, default=100, help="Quantidade de dispositivos virtuais")
+    parser.add_argument('--intervalo', type=float, default=2.0, help="Segundos entre leituras de umidade/temperatura")
+    parser.add_argument('--intervalo-ph', type=float, default=2.0, help="Segundos entre leituras de pH")
+    parser.add_argument('--duracao', type=float, default=30.0, help="Duração do teste em segundos")
+    parser.add_argument('--latencia-banco-ms', type=float, default=2.0, help="Ida e volta simulada do banco")
+    parser.add_argument('--custo-linha-us', type=float, default=20.0, help="Custo simulado por linha inserida")
+    parser.add_argument('--motor', choices=['threads', 'asyncio'], default='threads', help="Motor de ingestão")
+    args = parser.parse_args()
+
+    relatorio = executar(args.dispositivos, args.intervalo, args.intervalo_ph, args.duracao,
+                         args.latencia_banco_ms, args.custo_linha_us, args.motor)
+    estagios = relatorio.pop('estagios')
+
+    print("\n=== Resultado do teste de carga ===")
+    print(json.dumps(relatorio, indent=2))
+    for estagio, estatisticas in estagios.items():
+        print(f"{estagio}: {estatisticas}")
+
+
+if __name__ == "__main__":
+    main()
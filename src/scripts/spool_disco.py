@@ -0,0 +1,390 @@
+import glob
+import json
+import os
+import threading
+import time
+from datetime import date, datetime
+
+from log.logger_config import configurar_logging
+
+# Configura o logging
+logger = configurar_logging(__name__)
+
+# Parâmetros padrão do spool (podem ser sobrescritos por variáveis de ambiente)
+DIRETORIO_PADRAO = os.getenv(
+    'SPOOL_DIRETORIO',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'spool')
+)
+FSYNC_LINHAS_PADRAO = int(os.getenv('SPOOL_FSYNC_LINHAS', '1000'))
+FSYNC_INTERVALO_PADRAO = float(os.getenv('SPOOL_FSYNC_INTERVALO', '1.0'))
+LOTE_REPLAY_PADRAO = int(os.getenv('SPOOL_LOTE_REPLAY', '5000'))
+TAXA_REPLAY_PADRAO = float(os.getenv('SPOOL_TAXA_REPLAY', '20000'))
+INTERVALO_REPLAY_PADRAO = float(os.getenv('SPOOL_INTERVALO_REPLAY', '5.0'))
+# Tentativas de gravar, sozinha, uma linha de um lote recusado antes de movê-la para as rejeitadas
+TENTATIVAS_LINHA_PADRAO = int(os.getenv('SPOOL_TENTATIVAS_LINHA', '3'))
+
+ARQUIVO_ATIVO = 'spool-ativo.jsonl'
+# Linhas que o banco recusa (dead-letter): ficam fora do reenvio, para análise
+ARQUIVO_REJEITADAS = 'rejeitadas.jsonl'
+
+
+def _codificar(valor):
+    if isinstance(valor, datetime):
+        return {'$dt': valor.isoformat()}
+    if isinstance(valor, date):
+        return {'$d': valor.isoformat()}
+    raise TypeError(f"Tipo não serializável no spool: {type(valor)}")
+
+
+def _decodificar(objeto):
+    if '$dt' in objeto:
+        return datetime.fromisoformat(objeto['$dt'])
+    if '$d' in objeto:
+        return date.fromisoformat(objeto['$d'])
+    return objeto
+
+
+def _dividir(lotes):
+    """Divide {tabela: [linhas]} em duas metades com o mesmo formato."""
+    itens = [(tabela, linha) for tabela, linhas in lotes.items() for linha in linhas]
+    metade = len(itens) // 2
+    partes = []
+    for parte in (itens[:metade], itens[metade:]):
+        agrupado = {}
+        for tabela, linha in parte:
+            agrupado.setdefault(tabela, []).append(linha)
+        partes.append(agrupado)
+    return partes
+
+
+class SpoolDisco:
+    """
+    Spool local, somente de acréscimo, para leituras que não puderam ir ao banco.
+
+    As leituras são gravadas em JSON Lines no segmento ativo, com fsync em lote
+    (a cada `fsync_linhas` linhas ou `fsync_intervalo` segundos). O reenvio fecha
+    o segmento ativo e o grava no banco em lotes grandes, limitado a `taxa_replay`
+    linhas por segundo e cedendo a vez sempre que a ingestão ao vivo está
+    ocupada. O progresso de cada segmento fica num arquivo `.pos`, de modo que um
+    reinício continua de onde parou.
+
+    Um lote de reenvio recusado com o banco respondendo é dividido ao meio até
+    isolar as linhas recusadas; cada uma é tentada `tentativas_linha` vezes e
+    então movida para `rejeitadas.jsonl`, para que uma única linha inválida não
+    trave o reenvio de todo o resto.
+    """
+
+    def __init__(self, gravar, diretorio=DIRETORIO_PADRAO, fsync_linhas=FSYNC_LINHAS_PADRAO,
+                 fsync_intervalo=FSYNC_INTERVALO_PADRAO, lote_replay=LOTE_REPLAY_PADRAO,
+                 taxa_replay=TAXA_REPLAY_PADRAO, intervalo_replay=INTERVALO_REPLAY_PADRAO, ocupado=None,
+                 tentativas_linha=TENTATIVAS_LINHA_PADRAO):
+        """
+        :param gravar: Função (lotes) -> bool que grava {tabela: [linhas]} no banco.
+        :param diretorio: Diretório dos segmentos do spool.
+        :param fsync_linhas: Linhas gravadas entre dois fsync.
+        :param fsync_intervalo: Tempo máximo, em segundos, entre dois fsync.
+        :param lote_replay: Linhas por lote no reenvio.
+        :param taxa_replay: Limite de linhas por segundo no reenvio.
+        :param intervalo_replay: Intervalo, em segundos, entre tentativas de reenvio.
+        :param ocupado: Função opcional que retorna True quando a ingestão ao vivo está ocupada.
+        :param tentativas_linha: Tentativas de uma linha isolada antes de ir para as rejeitadas.
+        """
+        self.gravar = gravar
+        self.diretorio = diretorio
+        self.fsync_linhas = fsync_linhas
+        self.fsync_intervalo = fsync_intervalo
+        self.lote_replay = lote_replay
+        self.taxa_replay = taxa_replay
+        self.intervalo_replay = intervalo_replay
+        self.ocupado = ocupado
+        self.tentativas_linha = tentativas_linha
+
+        os.makedirs(diretorio, exist_ok=True)
+        self._caminho_ativo = os.path.join(diretorio, ARQUIVO_ATIVO)
+        self._caminho_rejeitadas = os.path.join(diretorio, ARQUIVO_REJEITADAS)
+        self._arquivo = open(self._caminho_ativo, 'a', encoding='utf-8')
+        self._sem_fsync = 0
+        self._ultimo_fsync = time.monotonic()
+        self._ultimo_reenvio = 0.0
+        self._trava = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+
+        self._estatisticas = {
+            'linhas_pendentes': self._contar_pendentes(),
+            'linhas_gravadas': 0,
+            'linhas_reenviadas': 0,
+            'falhas_reenvio': 0,
+            'linhas_rejeitadas': 0,
+            'taxa_reenvio_linhas_s': 0.0,
+        }
+
+    def _segmentos_fechados(self):
+        return sorted(glob.glob(os.path.join(self.diretorio, 'spool-[0-9]*.jsonl')))
+
+    def _ler_posicao(self, segmento):
+        try:
+            with open(segmento + '.pos', encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _salvar_posicao(self, segmento, posicao):
+        temporario = segmento + '.pos.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            f.write(str(posicao))
+        os.replace(temporario, segmento + '.pos')
+
+    def _contar_pendentes(self):
+        total = 0
+        for segmento in self._segmentos_fechados() + [self._caminho_ativo]:
+            with open(segmento, 'rb') as f:
+                f.seek(self._ler_posicao(segmento) if segmento != self._caminho_ativo else 0)
+                total += sum(1 for _ in f)
+        return total
+
+    def gravar_lotes(self, lotes):
+        """
+        Acrescenta leituras ao spool.
+
+        :param lotes: Dicionário {tabela: [linhas]}.
+        """
+        agora = time.time()
+        linhas = [
+            json.dumps({'ts': agora, 't': tabela, 'l': linha}, default=_codificar)
+            for tabela, registros in lotes.items() for linha in registros
+        ]
+        with self._trava:
+            self._arquivo.write('\n'.join(linhas) + '\n')
+            self._sem_fsync += len(linhas)
+            self._estatisticas['linhas_pendentes'] += len(linhas)
+            self._estatisticas['linhas_gravadas'] += len(linhas)
+            if (self._sem_fsync >= self.fsync_linhas
+                    or time.monotonic() - self._ultimo_fsync >= self.fsync_intervalo):
+                self._sincronizar()
+        logger.warning(f"{len(linhas)} leituras desviadas para o spool em disco.")
+
+    def rejeitar(self, lotes, motivo=None):
+        """
+        Move leituras recusadas pelo banco para o arquivo de rejeitadas (fora do reenvio).
+
+        :param lotes: Dicionário {tabela: [linhas]}.
+        :param motivo: Texto opcional com o erro do banco.
+        """
+        agora = time.time()
+        linhas = [
+            json.dumps({'ts': agora, 't': tabela, 'l': linha, 'motivo': motivo}, default=_codificar)
+            for tabela, registros in lotes.items() for linha in registros
+        ]
+        self._rejeitar_linhas(linhas)
+
+    def _rejeitar_linhas(self, linhas):
+        if not linhas:
+            return
+        with self._trava:
+            with open(self._caminho_rejeitadas, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(linhas) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self._estatisticas['linhas_rejeitadas'] += len(linhas)
+        logger.error(f"{len(linhas)} leituras recusadas movidas para {self._caminho_rejeitadas}.")
+
+    def _sincronizar(self):
+        if self._sem_fsync:
+            self._arquivo.flush()
+            os.fsync(self._arquivo.fileno())
+            self._sem_fsync = 0
+        self._ultimo_fsync = time.monotonic()
+
+    def sincronizar(self):
+        """Força o fsync das linhas ainda não sincronizadas."""
+        with self._trava:
+            self._sincronizar()
+
+    def _rotacionar(self):
+        """Fecha o segmento ativo (se tiver dados) e abre um novo."""
+        with self._trava:
+            if self._arquivo.tell() == 0:
+                return
+            self._sincronizar()
+            self._arquivo.close()
+            os.replace(self._caminho_ativo, os.path.join(self.diretorio, f'spool-{time.time_ns()}.jsonl'))
+            self._arquivo = open(self._caminho_ativo, 'a', encoding='utf-8')
+
+    def _ler_lote(self, arquivo):
+        lotes = {}
+        quantidade = 0
+        while True:
+            # readline (e não iteração) para que arquivo.tell() continue válido
+            linha = arquivo.readline()
+            if not linha:
+                break
+            if not linha.strip():
+                continue
+            try:
+                registro = json.loads(linha, object_hook=_decodificar)
+            except ValueError as e:
+                # Linha truncada (queda no meio de uma escrita): não há o que reenviar
+                self._rejeitar_linhas([json.dumps({'ts': time.time(), 'bruto': linha, 'motivo': str(e)})])
+                continue
+            lotes.setdefault(registro['t'], []).append(registro['l'])
+            quantidade += 1
+            if quantidade >= self.lote_replay:
+                break
+        return lotes, quantidade
+
+    def _tentar(self, lotes):
+        try:
+            return self.gravar(lotes)
+        except Exception as e:
+            logger.error(f"Erro ao reenviar lote do spool: {e}")
+            return False
+
+    def _isolar_recusadas(self, lotes):
+        """
+        Grava um lote recusado por partes, dividindo-o ao meio até isolar as linhas recusadas.
+
+        :return: Dicionário {tabela: [linhas]} com as linhas que falharam sozinhas em todas as tentativas.
+        """
+        if sum(len(linhas) for linhas in lotes.values()) > 1:
+            recusadas = {}
+            for parte in _dividir(lotes):
+                if not self._tentar(parte):
+                    for tabela, linhas in self._isolar_recusadas(parte).items():
+                        recusadas.setdefault(tabela, []).extend(linhas)
+            return recusadas
+
+        for _ in range(self.tentativas_linha - 1):
+            if self._tentar(lotes):
+                return {}
+        return lotes
+
+    def _aguardar_ingestao(self):
+        """
+        Cede a vez à ingestão ao vivo enquanto ela estiver ocupada.
+
+        :return: False se a ingestão continuar ocupada por `intervalo_replay` segundos ou se o spool for parado.
+        """
+        limite = time.monotonic() + self.intervalo_replay
+        while self.ocupado and self.ocupado():
+            if self._parar.is_set() or time.monotonic() >= limite:
+                return False
+            self.sincronizar()
+            self._parar.wait(0.05)
+        return not self._parar.is_set()
+
+    def reenviar(self):
+        """
+        Reenvia ao banco todo o conteúdo do spool, segmento por segmento.
+
+        :return: Quantidade de linhas reenviadas.
+        """
+        self._rotacionar()
+        total = 0
+        inicio = time.monotonic()
+        for segmento in self._segmentos_fechados():
+            with open(segmento, 'r', encoding='utf-8') as arquivo:
+                arquivo.seek(self._ler_posicao(segmento))
+                while True:
+                    if not self._aguardar_ingestao():
+                        return total
+
+                    lotes, quantidade = self._ler_lote(arquivo)
+                    if not quantidade:
+                        break
+
+                    if not self._tentar(lotes):
+                        self._estatisticas['falhas_reenvio'] += 1
+                        # Lote vazio só abre a conexão e faz o commit: distingue banco fora do ar de linha recusada
+                        if not self._tentar({}):
+                            return total
+                        recusadas = self._isolar_recusadas(lotes)
+                        if recusadas:
+                            self.rejeitar(recusadas, "recusada pelo banco no reenvio do spool")
+
+                    self._salvar_posicao(segmento, arquivo.tell())
+                    total += quantidade
+                    with self._trava:
+                        self._estatisticas['linhas_pendentes'] -= quantidade
+                        self._estatisticas['linhas_reenviadas'] += quantidade
+
+                    # Limita a taxa de reenvio
+                    espera = total / self.taxa_replay - (time.monotonic() - inicio)
+                    if espera > 0:
+                        self._parar.wait(espera)
+
+            # Segmento reenviado por completo
+            os.remove(segmento)
+            if os.path.exists(segmento + '.pos'):
+                os.remove(segmento + '.pos')
+
+        if total:
+            taxa = total / max(time.monotonic() - inicio, 1e-9)
+            self._estatisticas['taxa_reenvio_linhas_s'] = taxa
+            logger.info(f"{total} leituras reenviadas do spool ({taxa:.0f} linhas/s).")
+        return total
+
+    def _executar(self):
+        while not self._parar.wait(min(self.fsync_intervalo, self.intervalo_replay)):
+            self.sincronizar()
+            if time.monotonic() - self._ultimo_reenvio < self.intervalo_replay:
+                continue
+            self._ultimo_reenvio = time.monotonic()
+            if self._estatisticas['linhas_pendentes'] > 0:
+                try:
+                    self.reenviar()
+                except Exception as e:
+                    self._estatisticas['falhas_reenvio'] += 1
+                    logger.error(f"Erro ao reenviar leituras do spool: {e}")
+
+    def iniciar(self):
+        """Inicia a thread de fsync periódico e reenvio."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._executar, name="spool-reenvio", daemon=True)
+            self._thread.start()
+
+    def parar(self):
+        """Interrompe o reenvio e sincroniza o segmento ativo."""
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._trava:
+            self._sincronizar()
+            self._arquivo.close()
+
+    def _primeiro_ts(self, segmento, posicao):
+        """:return: Momento de gravação da primeira linha válida do segmento a partir de `posicao`, ou None."""
+        with open(segmento, 'r', encoding='utf-8') as f:
+            f.seek(posicao)
+            for linha in f:
+                # Linha truncada (queda no meio de uma escrita): o reenvio a descarta, aqui é ignorada
+                try:
+                    return json.loads(linha)['ts']
+                except (ValueError, KeyError, TypeError):
+                    continue
+        return None
+
+    def estatisticas(self):
+        """
+        Retorna o estado do spool.
+
+        :return: Dicionário com linhas pendentes, bytes em disco, idade da leitura mais antiga e reenvio.
+        """
+        with self._trava:
+            estatisticas = dict(self._estatisticas)
+            if not self._arquivo.closed:
+                self._arquivo.flush()
+
+        segmentos = self._segmentos_fechados() + [self._caminho_ativo]
+        estatisticas['bytes'] = sum(os.path.getsize(s) for s in segmentos if os.path.exists(s))
+        estatisticas['idade_mais_antiga_s'] = 0.0
+        for segmento in segmentos:
+            posicao = self._ler_posicao(segmento) if segmento != self._caminho_ativo else 0
+            if not os.path.exists(segmento) or os.path.getsize(segmento) <= posicao:
+                continue
+            ts = self._primeiro_ts(segmento, posicao)
+            if ts is not None:
+                estatisticas['idade_mais_antiga_s'] = time.time() - ts
+                break
+        return estatisticas
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+# Faixa ideal de umidade (%)
+UMIDADE_MINIMA = 45.0
+UMIDADE_MAXIMA = 55.0
+
+COLUNAS_TABELA_UMIDADE = ['ID Leitura', 'ID Sensor', 'Data', 'Hora', 'Umidade (%)']
+
+STATUS_NORMAL = "🟢 Normal"
+STATUS_FORA = "🔴 Fora do limite"
+
+
+def preparar_tabela_umidade(linhas):
+    """
+    Monta a tabela do histórico de umidade a partir das linhas do banco.
+
+    Data e hora permanecem como datetime (a formatação fica a cargo do
+    `column_config` do Streamlit) e o status é calculado de forma vetorizada.
+
+    :param linhas: Tuplas (id_leitura, id_sensor, data_leitura, hora_leitura, valor).
+    :return: DataFrame com as colunas de COLUNAS_TABELA_UMIDADE e 'Status'.
+    """
+    df = pd.DataFrame(linhas, columns=COLUNAS_TABELA_UMIDADE)
+    df['Data'] = pd.to_datetime(df['Data'])
+    df['Hora'] = pd.to_datetime(df['Hora'])
+    df['Umidade (%)'] = df['Umidade (%)'].astype(float)
+    fora = (df['Umidade (%)'] < UMIDADE_MINIMA) | (df['Umidade (%)'] > UMIDADE_MAXIMA)
+    df['Status'] = pd.Categorical(
+        np.where(fora, STATUS_FORA, STATUS_NORMAL), categories=[STATUS_NORMAL, STATUS_FORA]
+    )
+    return df
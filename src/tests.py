@@ -1,11 +1,54 @@
+import asyncio
+import contextlib
+import functools
+import json
+import logging
+import pstats
+import os
+import tempfile
+import threading
+import time
 import unittest
+import unittest.mock
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
 
+import numpy as np
+import oracledb
+import pandas as pd
+import pyarrow as pa
+import requests
+from prometheus_client import REGISTRY
+
+import run
+from log.logger_config import AmostragemLog, LimitadorTaxa, arquivo_do_processo
 from gerenciador import GerenciadorDados
 from gerenciador import DadosCompletos
 from gerenciador import Colheita
 from gerenciador import MaturidadeCana
 from gerenciador import Clima
 from gerenciador import CondicoesSolo
+from dados_simulados import gerar_dados_simulados
+from scripts.arquivo_frio import (
+    arquivar_tabela, inicio_arquivo, inicio_dados_quentes, ler_arquivo, ler_pagina_arquivo, resumir_arquivo
+)
+from scripts import metricas
+from scripts.buffer_escrita import BufferEscrita
+from scripts.cache_http import CacheHTTP
+from scripts.consulta_banco import acompanhar_umidade, consultar_arrow, consultar_dataframe, consultar_pagina_umidade
+from scripts.controle_bomba import ControladorBomba
+from scripts.gravador_assincrono import GravadorAssincrono
+from scripts.insert_db import inserir_dados
+from scripts.perfil_execucao import PerfilExecucao
+from scripts.pipeline_ingestao import PipelineIngestao
+from scripts.reducao_series import indices_lttb, indices_minmax, reduzir_serie
+from scripts.registro_modelos import RegistroModelos, calcular_chave
+from scripts.registro_sensores import RegistroSensores
+from scripts.resumos import agregar, atualizar_resumos, atualizar_resumos_async, colisoes, escolher_granularidade
+from scripts.spool_disco import ARQUIVO_REJEITADAS, SpoolDisco
+from scripts.tabela_umidade import STATUS_FORA, STATUS_NORMAL, preparar_tabela_umidade
 
 # Testes unitários
 
@@ -55,4 +98,1340 @@ class TestGerenciadorDados(unittest.TestCase):
 
     def test_alocar_recurso(self):
         self.gerenciador.alocar_recurso("Trator")
-        self.assertIn("Trator", self.gerenciador.recursos_alocados)
\ No newline at end of file
+        self.assertIn("Trator", self.gerenciador.recursos_alocados)
+
+
+class CursorFalso:
+    def __init__(self, conexao):
+        self.conexao = conexao
+
+    def executemany(self, instrucao, linhas, batcherrors=False):
+        self.conexao.executadas.append(list(linhas))
+        self._erros = [
+            SimpleNamespace(offset=i, code=1438, message="ORA-01438: valor maior que a precisão")
+            for i, linha in enumerate(linhas) if linha.get('valor') in self.conexao.recusar
+        ]
+
+    def getbatcherrors(self):
+        return self._erros
+
+    def close(self):
+        pass
+
+
+class ConexaoFalsa:
+    def __init__(self, recusar=()):
+        self.executadas = []
+        self.recusar = set(recusar)
+        self.commits = 0
+
+    def cursor(self):
+        return CursorFalso(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SpoolMemoria:
+    def __init__(self):
+        self.lotes = []
+        self.rejeitadas = []
+
+    def gravar_lotes(self, lotes):
+        self.lotes.append(lotes)
+
+    def rejeitar(self, lotes, motivo=None):
+        self.rejeitadas.append((lotes, motivo))
+
+
+class TestBufferEscrita(unittest.TestCase):
+    def setUp(self):
+        self.conexoes = []
+
+    def _conectar(self):
+        conexao = ConexaoFalsa()
+        self.conexoes.append(conexao)
+        return conexao
+
+    def _buffer(self, **parametros):
+        return BufferEscrita(self._conectar, {'LEITURA_SENSOR_UMIDADE': 'INSERT'}, **parametros)
+
+    def _linha(self, valor):
+        return {'id_sensor': 1, 'hora_leitura': datetime.now(), 'valor': valor}
+
+    def test_descarga_ao_atingir_tamanho_do_lote(self):
+        buffer = self._buffer(tamanho_lote=3, latencia_maxima=60)
+        buffer.adicionar('LEITURA_SENSOR_UMIDADE', self._linha(1))
+        buffer.adicionar('LEITURA_SENSOR_UMIDADE', self._linha(2))
+        self.assertEqual(self.conexoes, [])
+
+        buffer.adicionar('LEITURA_SENSOR_UMIDADE', self._linha(3))
+        self.assertEqual(len(self.conexoes), 1)
+        self.assertEqual(len(self.conexoes[0].executadas[0]), 3)
+        self.assertEqual(self.conexoes[0].commits, 1)
+        estatisticas = buffer.estatisticas()
+        self.assertEqual((estatisticas['descargas'], estatisticas['pendentes']), (1, 0))
+
+    def test_descarga_por_latencia_maxima(self):
+        buffer = self._buffer(tamanho_lote=1000, latencia_maxima=0.2)
+        buffer.iniciar()
+        try:
+            buffer.adicionar('LEITURA_SENSOR_UMIDADE', self._linha(1))
+            limite = time.monotonic() + 5
+            while not buffer.estatisticas()['linhas_gravadas'] and time.monotonic() < limite:
+                time.sleep(0.02)
+        finally:
+            buffer.parar()
+        self.assertEqual(buffer.estatisticas()['linhas_gravadas'], 1)
+
+    def test_parar_grava_pendentes(self):
+        buffer = self._buffer(tamanho_lote=1000, latencia_maxima=60)
+        buffer.adicionar('LEITURA_SENSOR_UMIDADE', self._linha(1))
+        buffer.parar()
+        self.assertEqual(buffer.estatisticas()['linhas_gravadas'], 1)
+
+    def test_sem_conexao_desvia_para_o_spool(self):
+        spool = SpoolMemoria()
+        buffer = BufferEscrita(lambda: None, {'LEITURA_SENSOR_UMIDADE': 'INSERT'}, tamanho_lote=2, spool=spool)
+        buffer.adicionar('LEITURA_SENSOR_UMIDADE', self._linha(1))
+        buffer.adicionar('LEITURA_SENSOR_UMIDADE', self._linha(2))
+        self.assertEqual(len(spool.lotes[0]['LEITURA_SENSOR_UMIDADE']), 2)
+        self.assertEqual(buffer.estatisticas()['linhas_spool'], 2)
+
+    def test_linha_recusada_nao_desfaz_o_lote(self):
+        spool = SpoolMemoria()
+        buffer = BufferEscrita(lambda: ConexaoFalsa(recusar={99}), {'LEITURA_SENSOR_UMIDADE': 'INSERT'},
+                               tamanho_lote=3, spool=spool)
+        for valor in (1, 99, 3):
+            buffer.adicionar('LEITURA_SENSOR_UMIDADE', self._linha(valor))
+
+        estatisticas = buffer.estatisticas()
+        self.assertEqual((estatisticas['linhas_gravadas'], estatisticas['linhas_rejeitadas']), (2, 1))
+        lotes, motivo = spool.rejeitadas[0]
+        self.assertEqual([linha['valor'] for linha in lotes['LEITURA_SENSOR_UMIDADE']], [99])
+        self.assertIn("ORA-01438", motivo)
+        self.assertEqual(spool.lotes, [])
+
+class TestCargaInicial(unittest.TestCase):
+    def setUp(self):
+        self.dados = gerar_dados_simulados(anos=5, semente=1)
+
+    def test_carga_sequencial_numa_transacao(self):
+        conn = ConexaoFalsa()
+        resumo = inserir_dados(conn, self.dados, tamanho_lote=2, paralelismo=1)
+        self.assertEqual(resumo['Colheita'], {'inseridas': 5, 'erros': 0})
+        # 4 tabelas x lotes de 2, 2 e 1 linhas, confirmados juntos
+        self.assertEqual([len(lote) for lote in conn.executadas], [2, 2, 1] * 4)
+        self.assertEqual(conn.commits, 1)
+
+    def test_carga_paralela_usa_conexoes_do_pool(self):
+        conexoes = []
+
+        def conectar():
+            conexoes.append(ConexaoFalsa())
+            return conexoes[-1]
+
+        with unittest.mock.patch('scripts.insert_db.conectar_banco', conectar), \
+                unittest.mock.patch('scripts.insert_db.fechar_conexao', lambda conn: None):
+            resumo = inserir_dados(None, self.dados, tamanho_lote=5, paralelismo=2)
+        self.assertEqual(resumo['Clima'], {'inseridas': 5, 'erros': 0})
+        self.assertEqual(len(conexoes), 4)
+        self.assertTrue(all(conn.commits == 1 for conn in conexoes))
+
+    def test_conexao_incompativel_com_o_modo(self):
+        with self.assertRaises(ValueError):
+            inserir_dados(ConexaoFalsa(), self.dados, paralelismo=2)
+        with self.assertRaises(ValueError):
+            inserir_dados(None, self.dados, paralelismo=1)
+
+
+class CursorRegistro:
+    def __init__(self, conexao):
+        self.conexao = conexao
+        self._resultado = []
+        self._erros = []
+
+    def execute(self, sql):
+        tabela = sql.split()[-1]
+        self._resultado = [(id_sensor,) for id_sensor in sorted(self.conexao.tabelas[tabela])]
+
+    def fetchall(self):
+        return self._resultado
+
+    def executemany(self, sql, binds, batcherrors=False):
+        tabela = sql.split()[2]
+        self.conexao.merges.append([bind['id_sensor'] for bind in binds])
+        self._erros = []
+        for i, bind in enumerate(binds):
+            id_sensor = bind['id_sensor']
+            if id_sensor in self.conexao.falhar:
+                self._erros.append(SimpleNamespace(offset=i, code=1400, message="ORA-01400"))
+            elif id_sensor in self.conexao.colidir:
+                # Outro worker cadastrou o sensor entre o ON e o INSERT do MERGE
+                self.conexao.colidir.discard(id_sensor)
+                self.conexao.tabelas[tabela].add(id_sensor)
+                self._erros.append(SimpleNamespace(offset=i, code=1, message="ORA-00001"))
+            else:
+                self.conexao.tabelas[tabela].add(id_sensor)
+
+    def getbatcherrors(self):
+        return self._erros
+
+    def close(self):
+        pass
+
+
+class ConexaoRegistro:
+    def __init__(self, umidade=(), colidir=(), falhar=()):
+        self.tabelas = {'SENSOR_UMIDADE': set(umidade), 'SENSOR_PH': set()}
+        self.colidir = set(colidir)
+        self.falhar = set(falhar)
+        self.merges = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return CursorRegistro(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class TestRegistroSensores(unittest.TestCase):
+    def setUp(self):
+        self.registro = RegistroSensores()
+
+    def _lotes(self, *ids):
+        return {'LEITURA_SENSOR_UMIDADE': [{'id_sensor': id_sensor} for id_sensor in ids]}
+
+    def test_cadastra_apenas_desconhecidos_uma_vez(self):
+        conn = ConexaoRegistro(umidade={1, 2})
+        self.registro.garantir_lotes(conn, self._lotes(1, 2, 3, 3))
+        self.registro.garantir_lotes(conn, self._lotes(1, 3))
+
+        self.assertEqual(conn.merges, [[3]])
+        self.assertEqual(conn.tabelas['SENSOR_UMIDADE'], {1, 2, 3})
+        self.assertEqual(self.registro.desconhecidos('umidade', [1, 2, 3, 4]), {4})
+
+    def test_temperatura_usa_sensor_de_umidade(self):
+        conn = ConexaoRegistro()
+        self.registro.garantir_lotes(conn, {'LEITURA_SENSOR_TEMPERATURA': [{'id_sensor': 7}]})
+        self.assertEqual(conn.tabelas['SENSOR_UMIDADE'], {7})
+
+    def test_colisao_entre_workers_repete_so_o_id_que_colidiu(self):
+        conn = ConexaoRegistro(colidir={5})
+        self.registro.garantir_lotes(conn, self._lotes(3, 5))
+
+        self.assertEqual(conn.merges, [[3, 5], [5]])
+        self.assertEqual(conn.commits, 1)
+        self.assertEqual(self.registro.desconhecidos('umidade', [3, 5]), set())
+
+    def test_erro_do_banco_desfaz_e_nao_registra(self):
+        conn = ConexaoRegistro(falhar={9})
+        with self.assertRaises(oracledb.DatabaseError):
+            self.registro.garantir_lotes(conn, self._lotes(8, 9))
+        self.assertEqual((conn.commits, conn.rollbacks), (0, 1))
+        self.assertEqual(self.registro.desconhecidos('umidade', [8, 9]), {8, 9})
+
+class TestPipelineIngestao(unittest.TestCase):
+    def _cheio(self, politica):
+        # Sem threads de trabalho: a fila de capacidade 2 enche e fica cheia
+        pipeline = PipelineIngestao(lambda item: None, capacidade=2, politica=politica, timeout_bloqueio=0.01)
+        self.assertTrue(pipeline.enfileirar(1))
+        self.assertTrue(pipeline.enfileirar(2))
+        return pipeline
+
+    def _fila(self, pipeline):
+        return [pipeline.fila.get_nowait() for _ in range(pipeline.fila.qsize())]
+
+    def test_descartar_novo(self):
+        pipeline = self._cheio('descartar_novo')
+        self.assertFalse(pipeline.enfileirar(3))
+        self.assertEqual(self._fila(pipeline), [1, 2])
+        self.assertEqual(pipeline.estatisticas()['descartadas'], 1)
+
+    def test_descartar_antigo(self):
+        pipeline = self._cheio('descartar_antigo')
+        self.assertTrue(pipeline.enfileirar(3))
+        self.assertEqual(self._fila(pipeline), [2, 3])
+        self.assertEqual(pipeline.estatisticas()['descartadas'], 1)
+
+    def test_bloquear_descarta_apos_o_timeout(self):
+        pipeline = self._cheio('bloquear')
+        inicio = time.monotonic()
+        self.assertFalse(pipeline.enfileirar(3))
+        self.assertGreaterEqual(time.monotonic() - inicio, 0.01)
+        self.assertEqual(self._fila(pipeline), [1, 2])
+
+    def test_politica_invalida(self):
+        with self.assertRaises(ValueError):
+            PipelineIngestao(lambda item: None, politica='ignorar')
+
+    def test_parar_processa_a_fila_e_conta_erros(self):
+        processados = []
+
+        def processar(item):
+            if item == 'ruim':
+                raise ValueError(item)
+            processados.append(item)
+
+        pipeline = PipelineIngestao(processar, num_workers=2, capacidade=10)
+        for item in (1, 'ruim', 2, 3):
+            pipeline.enfileirar(item)
+        pipeline.iniciar()
+        pipeline.parar()
+
+        self.assertEqual(sorted(processados), [1, 2, 3])
+        estatisticas = pipeline.estatisticas()
+        self.assertEqual((estatisticas['processadas'], estatisticas['erros']), (3, 1))
+
+
+class TestControladorBomba(unittest.TestCase):
+    def setUp(self):
+        self.comandos = []
+        self.controlador = ControladorBomba(self.comandos.append, limite_inferior=45, limite_superior=55,
+                                            permanencia_minima=0)
+
+    def test_histerese(self):
+        for umidade in (40, 44, 50, 54, 56, 60, 50, 46, 44):
+            self.controlador.avaliar(1, umidade)
+        self.assertEqual(self.comandos, ["ON", "OFF", "ON"])
+        self.assertEqual(self.controlador.estado(1), "ON")
+
+    def test_dentro_da_faixa_nao_publica(self):
+        self.assertIsNone(self.controlador.avaliar(1, 50))
+        self.assertIsNone(self.controlador.estado(1))
+        self.assertEqual(self.comandos, [])
+
+    def test_estado_por_sensor(self):
+        self.controlador.avaliar(1, 40)
+        self.controlador.avaliar(2, 60)
+        self.assertEqual(self.comandos, ["ON", "OFF"])
+        self.assertEqual((self.controlador.estado(1), self.controlador.estado(2)), ("ON", "OFF"))
+
+    def test_permanencia_minima_suprime_troca(self):
+        controlador = ControladorBomba(self.comandos.append, permanencia_minima=3600)
+        controlador.avaliar(1, 40)
+        self.assertIsNone(controlador.avaliar(1, 60))
+        self.assertEqual(self.comandos, ["ON"])
+        self.assertEqual(controlador.estatisticas()['suprimidas_permanencia'], 1)
+
+    def test_limites_invalidos(self):
+        with self.assertRaises(ValueError):
+            ControladorBomba(self.comandos.append, limite_inferior=55, limite_superior=45)
+
+
+class TestSpoolDisco(unittest.TestCase):
+    def setUp(self):
+        self._diretorio = tempfile.TemporaryDirectory()
+        self.diretorio = self._diretorio.name
+        self.gravadas = []
+        self.spool = self._criar()
+
+    def tearDown(self):
+        if not self.spool._arquivo.closed:
+            self.spool.parar()
+        self._diretorio.cleanup()
+
+    def _criar(self, **parametros):
+        parametros.setdefault('lote_replay', 2)
+        parametros.setdefault('taxa_replay', 1e9)
+        return SpoolDisco(self._gravar, diretorio=self.diretorio, **parametros)
+
+    def _gravar(self, lotes):
+        if any(linha.get('valor') == 'invalido' for linhas in lotes.values() for linha in linhas):
+            return False
+        self.gravadas.extend(linha for linhas in lotes.values() for linha in linhas)
+        return True
+
+    def _linhas(self, *valores):
+        momento = datetime(2024, 5, 1, 12, 0)
+        return {'LEITURA_SENSOR_UMIDADE': [{'id_sensor': 1, 'hora_leitura': momento, 'valor': v} for v in valores]}
+
+    def test_reenvio_rotaciona_segmento_e_preserva_tipos(self):
+        self.spool.gravar_lotes(self._linhas(1.0, 2.0, 3.0))
+        self.assertEqual(self.spool.estatisticas()['linhas_pendentes'], 3)
+
+        self.assertEqual(self.spool.reenviar(), 3)
+        self.assertEqual([linha['valor'] for linha in self.gravadas], [1.0, 2.0, 3.0])
+        self.assertIsInstance(self.gravadas[0]['hora_leitura'], datetime)
+        self.assertEqual(self.spool._segmentos_fechados(), [])
+        self.assertEqual(self.spool.estatisticas()['linhas_pendentes'], 0)
+
+    def test_reinicio_continua_da_posicao_salva(self):
+        self.spool.gravar_lotes(self._linhas(1.0, 2.0, 3.0, 4.0))
+        self.spool._rotacionar()
+        segmento = self.spool._segmentos_fechados()[0]
+        # Primeiro lote (2 linhas) já reenviado antes da queda
+        with open(segmento, encoding='utf-8') as f:
+            f.readline()
+            f.readline()
+            self.spool._salvar_posicao(segmento, f.tell())
+        self.spool.parar()
+
+        self.spool = self._criar()
+        self.assertEqual(self.spool.estatisticas()['linhas_pendentes'], 2)
+        self.assertEqual(self.spool.reenviar(), 2)
+        self.assertEqual([linha['valor'] for linha in self.gravadas], [3.0, 4.0])
+
+    def test_linha_recusada_vai_para_rejeitadas(self):
+        self.spool = self._criar(lote_replay=10, tentativas_linha=2)
+        self.spool.gravar_lotes(self._linhas(1.0, 'invalido', 3.0, 4.0))
+
+        self.assertEqual(self.spool.reenviar(), 4)
+        self.assertEqual(sorted(linha['valor'] for linha in self.gravadas), [1.0, 3.0, 4.0])
+        with open(os.path.join(self.diretorio, ARQUIVO_REJEITADAS), encoding='utf-8') as f:
+            rejeitadas = [json.loads(linha) for linha in f]
+        self.assertEqual([r['l']['valor'] for r in rejeitadas], ['invalido'])
+        self.assertEqual(self.spool.estatisticas()['linhas_rejeitadas'], 1)
+
+    def test_banco_fora_do_ar_mantem_o_spool(self):
+        self.spool.gravar = lambda lotes: False
+        self.spool.gravar_lotes(self._linhas(1.0, 2.0))
+
+        self.assertEqual(self.spool.reenviar(), 0)
+        self.assertEqual(self.spool.estatisticas()['linhas_pendentes'], 2)
+        self.assertFalse(os.path.exists(os.path.join(self.diretorio, ARQUIVO_REJEITADAS)))
+
+    def test_estatisticas_ignora_linha_truncada(self):
+        self.spool.gravar_lotes(self._linhas(1.0))
+        self.spool._rotacionar()
+        segmento = self.spool._segmentos_fechados()[0]
+        with open(segmento, encoding='utf-8') as f:
+            valida = f.read()
+        # Queda no meio de uma escrita anterior: a primeira linha do segmento ficou pela metade
+        with open(segmento, 'w', encoding='utf-8') as f:
+            f.write('{"ts": 17000\n' + valida)
+
+        estatisticas = self.spool.estatisticas()
+        self.assertGreaterEqual(estatisticas['idade_mais_antiga_s'], 0.0)
+        self.assertLess(estatisticas['idade_mais_antiga_s'], 60.0)
+        self.assertEqual(self.spool.reenviar(), 1)
+
+
+class TestEscolherGranularidade(unittest.TestCase):
+    def setUp(self):
+        self.fim = datetime(2024, 5, 1)
+
+    def test_granularidades(self):
+        self.assertEqual(escolher_granularidade(self.fim - timedelta(days=90), self.fim), 'DIA')
+        self.assertEqual(escolher_granularidade(self.fim - timedelta(days=48), self.fim), 'DIA')
+        self.assertEqual(escolher_granularidade(self.fim - timedelta(days=7), self.fim), 'HORA')
+        self.assertEqual(escolher_granularidade(self.fim - timedelta(hours=48), self.fim), 'HORA')
+        self.assertEqual(escolher_granularidade(self.fim - timedelta(hours=6), self.fim), 'MINUTO')
+        self.assertEqual(escolher_granularidade(self.fim - timedelta(minutes=48), self.fim), 'MINUTO')
+
+    def test_janela_curta_usa_leituras_brutas(self):
+        self.assertIsNone(escolher_granularidade(self.fim - timedelta(minutes=47), self.fim))
+        self.assertIsNone(escolher_granularidade(self.fim, self.fim))
+
+
+class TestResumos(unittest.TestCase):
+    def test_agregar_por_sensor_e_periodo(self):
+        base = datetime(2024, 5, 1, 10, 0, 5)
+        linhas = [
+            {'id_sensor': 1, 'hora_leitura': base, 'valor': 40.0},
+            {'id_sensor': 1, 'hora_leitura': base + timedelta(seconds=30), 'valor': 50.0},
+            {'id_sensor': 1, 'hora_leitura': base + timedelta(minutes=1), 'valor': 60.0},
+            {'id_sensor': 2, 'hora_leitura': base, 'valor': 50.0},
+        ]
+        binds = agregar(linhas, 'MINUTO', 45.0, 55.0)
+        self.assertEqual([(b['id_sensor'], b['periodo'].minute) for b in binds], [(1, 0), (1, 1), (2, 0)])
+        self.assertEqual(binds[0], {'id_sensor': 1, 'periodo': datetime(2024, 5, 1, 10, 0), 'minimo': 40.0,
+                                    'maximo': 50.0, 'soma': 90.0, 'quantidade': 2, 'fora': 1})
+        self.assertEqual(len(agregar(linhas, 'HORA', 45.0, 55.0)), 2)
+
+    def test_colisao_entre_workers_repete_so_os_periodos_que_colidiram(self):
+        class CursorResumo:
+            def __init__(self):
+                self.envios = []
+
+            def executemany(self, sql, binds, batcherrors=False):
+                self.envios.append(len(binds))
+                # Na primeira passada por tabela, o primeiro período colide com outro worker
+                self._erros = [SimpleNamespace(offset=0, code=1, message="ORA-00001")] if len(binds) > 1 else []
+
+            def getbatcherrors(self):
+                return self._erros
+
+            def close(self):
+                pass
+
+        cursor = CursorResumo()
+        conn = SimpleNamespace(cursor=lambda: cursor)
+        momento = datetime(2024, 5, 1, 10, 0)
+        linhas = [{'id_sensor': i, 'hora_leitura': momento, 'valor': 50.0} for i in (1, 2)]
+        atualizar_resumos(conn, {'LEITURA_SENSOR_UMIDADE': linhas, 'LEITURA_SENSOR_PH': linhas})
+
+        # Três granularidades de umidade, cada uma com o lote e a repetição da linha que colidiu
+        self.assertEqual(cursor.envios, [2, 1, 2, 1, 2, 1])
+
+    def test_outro_erro_no_merge_interrompe(self):
+        erro = SimpleNamespace(offset=0, code=1438, message="ORA-01438")
+        with self.assertRaises(oracledb.DatabaseError):
+            colisoes([{'id_sensor': 1}], [erro], 'RESUMO_UMIDADE_DIA')
+
+class CursorAssincrono:
+    """Adapta um cursor falso síncrono à interface de oracledb.AsyncCursor."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    async def executemany(self, instrucao, binds, batcherrors=False):
+        self._cursor.executemany(instrucao, binds, batcherrors=batcherrors)
+
+    def getbatcherrors(self):
+        return self._cursor.getbatcherrors()
+
+    def close(self):
+        self._cursor.close()
+
+
+class ConexaoAssincrona:
+    """Adapta uma conexão falsa síncrona à interface de oracledb.AsyncConnection."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def cursor(self):
+        return CursorAssincrono(self.conn.cursor())
+
+    async def fetchall(self, sql):
+        cursor = self.conn.cursor()
+        cursor.execute(sql)
+        return cursor.fetchall()
+
+    async def commit(self):
+        self.conn.commit()
+
+    async def rollback(self):
+        self.conn.rollback()
+
+
+class TestGravadorAssincrono(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.conn = ConexaoFalsa(recusar={99})
+        self.spool = SpoolMemoria()
+        self.liberar = asyncio.Event()
+        self.liberar.set()
+
+    @contextlib.asynccontextmanager
+    async def _adquirir(self):
+        await self.liberar.wait()
+        yield ConexaoAssincrona(self.conn)
+
+    def _gravador(self, **parametros):
+        return GravadorAssincrono(self._adquirir, {'LEITURA_SENSOR_UMIDADE': 'INSERT'}, spool=self.spool,
+                                  **parametros)
+
+    def _adicionar(self, gravador, *valores):
+        for valor in valores:
+            gravador.adicionar('LEITURA_SENSOR_UMIDADE', {'id_sensor': 1, 'hora_leitura': datetime.now(),
+                                                          'valor': valor})
+
+    async def _aguardar_spool(self, lotes):
+        for _ in range(200):
+            if len(self.spool.lotes) >= lotes:
+                return
+            await asyncio.sleep(0.01)
+
+    async def test_lote_cheio_e_gravado(self):
+        gravador = self._gravador(tamanho_lote=2)
+        self._adicionar(gravador, 50, 51, 52)
+        await asyncio.sleep(0)
+        await gravador.parar()
+        self.assertEqual([[linha['valor'] for linha in lote] for lote in self.conn.executadas], [[50, 51], [52]])
+        self.assertEqual(gravador.estatisticas()['linhas_gravadas'], 3)
+
+    async def test_linha_recusada_vai_para_as_rejeitadas(self):
+        gravador = self._gravador(tamanho_lote=2)
+        self._adicionar(gravador, 50, 99)
+        await gravador.parar()
+        self.assertEqual([linha['valor'] for linha in self.spool.rejeitadas[0][0]['LEITURA_SENSOR_UMIDADE']], [99])
+        self.assertEqual(self.conn.commits, 1)
+
+    async def test_banco_indisponivel_desvia_para_o_spool(self):
+        @contextlib.asynccontextmanager
+        async def indisponivel():
+            raise oracledb.OperationalError("DPY-6005")
+            yield
+
+        gravador = GravadorAssincrono(indisponivel, {'LEITURA_SENSOR_UMIDADE': 'INSERT'}, spool=self.spool,
+                                      tamanho_lote=2)
+        self._adicionar(gravador, 50, 51)
+        await gravador.parar()
+        self.assertEqual(len(self.spool.lotes[0]['LEITURA_SENSOR_UMIDADE']), 2)
+        self.assertEqual(gravador.estatisticas()['linhas_spool'], 2)
+
+    async def test_excesso_de_lotes_na_fila_vai_para_o_spool(self):
+        self.liberar.clear()
+        gravador = self._gravador(tamanho_lote=1, gravacoes_simultaneas=1, lotes_maximos=2)
+        self._adicionar(gravador, 50, 51, 52, 53)
+        await self._aguardar_spool(2)
+        # Dois lotes esperam o banco; os outros dois não ficam em memória
+        self.assertEqual([lotes['LEITURA_SENSOR_UMIDADE'][0]['valor'] for lotes in self.spool.lotes], [52, 53])
+        self.liberar.set()
+        await gravador.parar()
+        self.assertEqual([lote[0]['valor'] for lote in self.conn.executadas], [50, 51])
+
+
+class TestVersoesAssincronas(unittest.IsolatedAsyncioTestCase):
+    async def test_cadastro_assincrono_repete_colisoes(self):
+        conn = ConexaoRegistro(umidade=[1], colidir=[3])
+        registro = RegistroSensores()
+        await registro.garantir_lotes_async(ConexaoAssincrona(conn), {
+            'LEITURA_SENSOR_UMIDADE': [{'id_sensor': id_sensor} for id_sensor in (1, 2, 3)]
+        })
+        self.assertEqual(conn.merges, [[2, 3], [3]])
+        self.assertEqual(conn.tabelas['SENSOR_UMIDADE'], {1, 2, 3})
+        self.assertEqual(registro.desconhecidos('umidade', [1, 2, 3]), set())
+
+    async def test_resumo_assincrono_igual_ao_sincrono(self):
+        momento = datetime(2024, 5, 1, 10, 0)
+        lotes = {'LEITURA_SENSOR_UMIDADE': [{'id_sensor': i, 'hora_leitura': momento, 'valor': 50.0} for i in (1, 2)]}
+        envios = {}
+        for versao in ('sincrona', 'assincrona'):
+            conn = ConexaoFalsa()
+            if versao == 'sincrona':
+                atualizar_resumos(conn, lotes)
+            else:
+                await atualizar_resumos_async(ConexaoAssincrona(conn), lotes)
+            envios[versao] = conn.executadas
+        self.assertEqual(envios['sincrona'], envios['assincrona'])
+        self.assertEqual(len(envios['sincrona']), 3)
+
+
+class ResultadoArrowFalso:
+    """Imita o DataFrame do python-oracledb devolvido por fetch_df_all."""
+
+    def __init__(self, colunas):
+        self.colunas = colunas
+
+    def column_names(self):
+        return list(self.colunas)
+
+    def column_arrays(self):
+        return [pa.array(valores) for valores in self.colunas.values()]
+
+
+class ConexaoArrow:
+    def __init__(self, colunas):
+        self.colunas = colunas
+        self.chamadas = []
+
+    def fetch_df_all(self, sql, parametros, arraysize=None):
+        self.chamadas.append((sql, parametros, arraysize))
+        return ResultadoArrowFalso(self.colunas)
+
+
+class TestConsultaArrow(unittest.TestCase):
+    def setUp(self):
+        self.conn = ConexaoArrow({
+            'ID_LEITURA_UMIDADE': [1, 2, 3],
+            'VALOR_UMIDADE_LEITURA': [44.5, None, 51.0],
+        })
+
+    def test_colunas_do_driver_em_minusculas(self):
+        tabela = consultar_arrow(self.conn, "SELECT 1", {'x': 1}, tamanho_lote=500)
+        self.assertEqual(tabela.column_names, ['id_leitura_umidade', 'valor_umidade_leitura'])
+        self.assertEqual(tabela.column('valor_umidade_leitura').null_count, 1)
+        self.assertEqual(self.conn.chamadas, [("SELECT 1", {'x': 1}, 500)])
+
+    def test_dataframe(self):
+        df = consultar_dataframe(self.conn, "SELECT 1")
+        self.assertEqual(df['id_leitura_umidade'].tolist(), [1, 2, 3])
+        self.assertTrue(np.isnan(df['valor_umidade_leitura'][1]))
+        # Sem binds, o driver recebe um dicionário vazio
+        self.assertEqual(self.conn.chamadas[0][1], {})
+
+
+class TestMetricas(unittest.TestCase):
+    def _amostra(self, nome, **rotulos):
+        return REGISTRY.get_sample_value(nome, rotulos) or 0.0
+
+    def test_mensagens_por_topico(self):
+        metricas.registrar_topicos(['sensor/umidade'])
+        antes = self._amostra('farmtech_mqtt_mensagens_recebidas_total', topico='sensor/umidade')
+        outros = self._amostra('farmtech_mqtt_mensagens_recebidas_total', topico='outro')
+        metricas.contar_mensagem('sensor/umidade')
+        metricas.contar_mensagem('sensor/desconhecido')
+        self.assertEqual(self._amostra('farmtech_mqtt_mensagens_recebidas_total', topico='sensor/umidade'), antes + 1)
+        self.assertEqual(self._amostra('farmtech_mqtt_mensagens_recebidas_total', topico='outro'), outros + 1)
+
+    def test_lote_observado_uma_vez_com_atraso_por_leitura(self):
+        lotes_antes = self._amostra('farmtech_ingestao_lote_linhas_count')
+        linhas_antes = self._amostra('farmtech_ingestao_lote_linhas_sum')
+        atrasos_antes = self._amostra('farmtech_ingestao_atraso_segundos_count')
+        atrasadas_antes = self._amostra('farmtech_ingestao_atraso_segundos_bucket', le='5.0')
+        agora = datetime.now()
+        metricas.observar_lote({
+            'LEITURA_SENSOR_UMIDADE': [{'hora_leitura': agora}, {'hora_leitura': agora - timedelta(seconds=20)}],
+            'LEITURA_SENSOR_PH': [{'hora_leitura': agora}],
+        })
+        self.assertEqual(self._amostra('farmtech_ingestao_lote_linhas_count'), lotes_antes + 1)
+        self.assertEqual(self._amostra('farmtech_ingestao_lote_linhas_sum'), linhas_antes + 3)
+        self.assertEqual(self._amostra('farmtech_ingestao_atraso_segundos_count'), atrasos_antes + 3)
+        # A leitura de 20 s atrás fica fora do balde de 5 s
+        self.assertEqual(self._amostra('farmtech_ingestao_atraso_segundos_bucket', le='5.0'), atrasadas_antes + 2)
+
+    def test_consulta_do_dashboard_cronometrada(self):
+        antes = self._amostra('farmtech_dashboard_consulta_segundos_count')
+        consultar_arrow(ConexaoArrow({'ID': [1]}), "SELECT 1")
+        self.assertEqual(self._amostra('farmtech_dashboard_consulta_segundos_count'), antes + 1)
+
+    def test_execucao_do_dashboard(self):
+        antes = self._amostra('farmtech_dashboard_execucao_segundos_count', pagina='Teste')
+        metricas.observar_execucao_dashboard('Teste', 0.3, primeira=True)
+        metricas.observar_execucao_dashboard('Teste', 0.1)
+        self.assertEqual(self._amostra('farmtech_dashboard_execucao_segundos_count', pagina='Teste'), antes + 2)
+        # Só a primeira execução do processo define a partida a frio
+        self.assertEqual(self._amostra('farmtech_dashboard_inicio_frio_segundos', pagina='Teste'), 0.3)
+
+    def test_porta_zero_nao_inicia_servidor(self):
+        self.assertFalse(metricas.iniciar_servidor_metricas(0))
+
+
+class TestPerfilExecucao(unittest.TestCase):
+    def setUp(self):
+        # Relógio controlado: cada chamada de perf_counter lê o valor atual
+        self.relogio = [0.0]
+        patcher = unittest.mock.patch('scripts.perfil_execucao.time.perf_counter', lambda: self.relogio[0])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _passar(self, segundos):
+        self.relogio[0] += segundos
+
+    def test_tempo_exclusivo_das_etapas_aninhadas(self):
+        perfil = PerfilExecucao(ativo=True)
+        with perfil.etapa('figura'):
+            self._passar(1.0)
+            with perfil.etapa('consulta'):
+                self._passar(3.0)
+        with perfil.etapa('consulta'):
+            self._passar(2.0)
+        self._passar(4.0)
+        self.assertEqual(perfil.tempos, {'figura': 1.0, 'consulta': 5.0})
+        self.assertEqual(perfil.chamadas, {'figura': 1, 'consulta': 2})
+
+        df = perfil.resumo().set_index('Etapa')
+        self.assertEqual(df.loc['Outros', 'Tempo (ms)'], 4000.0)
+        self.assertAlmostEqual(df['%'].sum(), 100.0)
+
+    def test_inativo_nao_mede(self):
+        perfil = PerfilExecucao()
+        with perfil.etapa('consulta'):
+            self._passar(1.0)
+        self.assertEqual(perfil.tempos, {})
+        self.assertIsNone(perfil.salvar_cprofile('Umidade'))
+
+    def test_finalizar_fixa_o_total(self):
+        perfil = PerfilExecucao(ativo=True)
+        self._passar(2.0)
+        self.assertEqual(perfil.finalizar(), 2.0)
+        self._passar(5.0)
+        self.assertEqual(perfil.finalizar(), 2.0)
+
+    def test_cprofile_gravado_com_nome_da_pagina(self):
+        diretorio = tempfile.mkdtemp()
+        perfil = PerfilExecucao(ativo=True, cprofile=True)
+        sorted(range(1000))
+        caminho = perfil.salvar_cprofile('Sensor de Umidade & Irrigação', diretorio)
+        self.assertTrue(os.path.basename(caminho).startswith('sensor-de-umidade-irrigacao-'))
+        funcoes = {funcao for _, _, funcao in pstats.Stats(caminho).stats}
+        self.assertIn("<built-in method builtins.sorted>", funcoes)
+
+
+class CursorLeituras:
+    """Cursor falso que aplica em memória os filtros e a ordem das consultas de leituras de umidade."""
+
+    def __init__(self, linhas):
+        # Linhas (id_leitura_umidade, id_sensor_umidade, data_leitura, hora_leitura, valor_umidade_leitura)
+        self.linhas = linhas
+        self.consultas = []
+        self.arraysize = 100
+
+    def execute(self, sql, parametros):
+        self.consultas.append((sql, dict(parametros)))
+        p = parametros
+        linhas = [linha for linha in self.linhas if p['inicio'] <= linha[3] < p['fim']]
+        if 'id_sensor' in p:
+            linhas = [linha for linha in linhas if linha[1] == p['id_sensor']]
+        if 'apos_hora' in p:
+            linhas = [linha for linha in linhas if (linha[3], linha[0]) < (p['apos_hora'], p['apos_id'])]
+        linhas.sort(key=lambda linha: (linha[3], linha[0]), reverse=True)
+        self._resultado = linhas[:p['tamanho']]
+
+    def fetchall(self):
+        return self._resultado
+
+    def close(self):
+        pass
+
+
+class TestPaginacaoUmidade(unittest.TestCase):
+    def setUp(self):
+        base = datetime(2024, 5, 1, 12, 0)
+        # Leituras repetidas na mesma hora: a chave de desempate é o id
+        self.linhas = [
+            (i, 1 + i % 2, base.date(), base + timedelta(minutes=i // 3), 40.0 + i)
+            for i in range(1, 26)
+        ]
+        self.cursor = CursorLeituras(self.linhas)
+        self.conn = SimpleNamespace(cursor=lambda: self.cursor)
+        self.inicio, self.fim = base, base + timedelta(hours=1)
+
+    def _todas_as_paginas(self, id_sensor=None):
+        paginas, apos = [], None
+        while True:
+            linhas, apos = consultar_pagina_umidade(self.conn, self.inicio, self.fim, id_sensor, apos, tamanho=4)
+            paginas.append([linha[0] for linha in linhas])
+            if apos is None:
+                return paginas
+
+    def test_paginas_cobrem_a_janela_sem_repetir(self):
+        paginas = self._todas_as_paginas()
+        self.assertTrue(all(len(pagina) == 4 for pagina in paginas[:-1]))
+        ids = [id_leitura for pagina in paginas for id_leitura in pagina]
+        self.assertEqual(ids, list(range(25, 0, -1)))
+
+    def test_filtro_por_sensor(self):
+        ids = [id_leitura for pagina in self._todas_as_paginas(id_sensor=2) for id_leitura in pagina]
+        self.assertEqual(ids, [i for i in range(25, 0, -1) if i % 2])
+        self.assertTrue(all("id_sensor_umidade = :id_sensor" in sql for sql, _ in self.cursor.consultas))
+
+    def test_ultima_pagina_sem_proxima_chave(self):
+        linhas, apos = consultar_pagina_umidade(self.conn, self.inicio, self.fim, tamanho=25)
+        self.assertEqual((len(linhas), apos), (25, None))
+        # Uma linha a mais que a página é pedida para saber se há próxima
+        self.assertEqual(self.cursor.consultas[-1][1]['tamanho'], 26)
+
+class CursorArquivamento:
+    """Cursor falso do arquivamento: SELECT das leituras anteriores ao corte e DELETE por id."""
+
+    def __init__(self, linhas):
+        # Linhas (id, id_sensor, data_leitura, hora_leitura, valor, limite_minimo, limite_maximo)
+        self.linhas = list(linhas)
+        self.commits = 0
+
+    def execute(self, sql, parametros):
+        antigas = sorted((linha for linha in self.linhas if linha[3] < parametros['corte']),
+                         key=lambda linha: (linha[3], linha[0]))
+        self._resultado = antigas[:parametros['lote']]
+
+    def fetchall(self):
+        return self._resultado
+
+    def executemany(self, sql, binds):
+        apagar = {id_leitura for (id_leitura,) in binds}
+        self.linhas = [linha for linha in self.linhas if linha[0] not in apagar]
+
+    def close(self):
+        pass
+
+
+class TestArquivoFrio(unittest.TestCase):
+    def setUp(self):
+        self.diretorio = tempfile.mkdtemp()
+        self.base = datetime(2024, 1, 1)
+        # Uma leitura a cada 6 horas por 4 dias, alternando dois sensores
+        self.linhas = [
+            (i, 1 + i % 2, self.base + timedelta(hours=6 * i), self.base + timedelta(hours=6 * i),
+             40.0 + i, 45.0, 55.0)
+            for i in range(16)
+        ]
+        self.cursor = CursorArquivamento(self.linhas)
+        self.conn = SimpleNamespace(cursor=lambda: self.cursor, commit=lambda: None)
+        self.corte = self.base + timedelta(days=2)
+
+    def _arquivar(self, lote=3):
+        return arquivar_tabela(self.conn, 'LEITURA_SENSOR_UMIDADE', self.corte, self.diretorio, lote)
+
+    def test_ida_e_volta(self):
+        self.assertEqual(self._arquivar(), 8)
+        self.assertEqual([linha[0] for linha in self.cursor.linhas], list(range(8, 16)))
+        tabela = ler_arquivo('LEITURA_SENSOR_UMIDADE', diretorio=self.diretorio).sort_by('id_leitura')
+        self.assertEqual(tabela.column('id_leitura').to_pylist(), list(range(8)))
+        self.assertEqual(tabela.column('hora_leitura').to_pylist(), [linha[3] for linha in self.linhas[:8]])
+        self.assertEqual(tabela.column('valor').to_pylist(), [linha[4] for linha in self.linhas[:8]])
+
+    def test_filtros_de_janela_e_sensor(self):
+        self._arquivar()
+        tabela = ler_arquivo('LEITURA_SENSOR_UMIDADE', self.base + timedelta(hours=6), self.base + timedelta(days=1),
+                             id_sensor=2, diretorio=self.diretorio)
+        self.assertEqual(sorted(tabela.column('id_leitura').to_pylist()), [1, 3])
+
+    def test_corte_gravado_no_arquivo(self):
+        self.assertIsNone(inicio_dados_quentes('LEITURA_SENSOR_UMIDADE', self.diretorio))
+        self._arquivar()
+        self.assertEqual(inicio_dados_quentes('LEITURA_SENSOR_UMIDADE', self.diretorio), self.corte)
+        self.assertEqual(inicio_arquivo('LEITURA_SENSOR_UMIDADE', self.diretorio), self.base)
+        # Um arquivamento com corte anterior não faz o corte recuar
+        arquivar_tabela(self.conn, 'LEITURA_SENSOR_UMIDADE', self.base, self.diretorio)
+        self.assertEqual(inicio_dados_quentes('LEITURA_SENSOR_UMIDADE', self.diretorio), self.corte)
+
+    def test_pagina_do_arquivo_segue_a_chave(self):
+        self._arquivar()
+        pagina = ler_pagina_arquivo('LEITURA_SENSOR_UMIDADE', self.base, self.corte, tamanho=3,
+                                    diretorio=self.diretorio)
+        self.assertEqual([linha[0] for linha in pagina], [7, 6, 5])
+        ultima = pagina[-1]
+        pagina = ler_pagina_arquivo('LEITURA_SENSOR_UMIDADE', self.base, self.corte, apos=(ultima[3], ultima[0]),
+                                    tamanho=10, diretorio=self.diretorio)
+        self.assertEqual([linha[0] for linha in pagina], [4, 3, 2, 1, 0])
+
+    def test_resumo_do_arquivo(self):
+        self._arquivar()
+        resumo = resumir_arquivo('LEITURA_SENSOR_UMIDADE', 'DIA', self.base, self.corte, 45.0, 55.0,
+                                 diretorio=self.diretorio)
+        self.assertEqual([linha[0] for linha in resumo], [self.base, self.base + timedelta(days=1)])
+        # Dia 1: valores 40..43 (todos abaixo de 45); dia 2: 44..47
+        self.assertEqual(resumo[0][1:], (40.0, 43.0, 41.5, 4, 4))
+        self.assertEqual(resumo[1][1:], (44.0, 47.0, 45.5, 4, 1))
+
+    def test_historico_paginado_inclui_o_arquivo(self):
+        self._arquivar()
+        leituras = CursorLeituras([linha[:5] for linha in self.cursor.linhas])
+        conn = SimpleNamespace(cursor=lambda: leituras)
+        fim = self.base + timedelta(days=4)
+        ids, apos = [], None
+        leitor = functools.partial(ler_pagina_arquivo, diretorio=self.diretorio)
+        with unittest.mock.patch('scripts.arquivo_frio.ler_pagina_arquivo', leitor):
+            while True:
+                linhas, apos = consultar_pagina_umidade(conn, self.base, fim, apos=apos, tamanho=5, corte=self.corte)
+                ids.extend(linha[0] for linha in linhas)
+                if apos is None:
+                    break
+        self.assertEqual(ids, list(range(15, -1, -1)))
+
+
+class RespostaFalsa:
+    def __init__(self, dados):
+        self.dados = dados
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.dados
+
+
+class SessaoFalsa:
+    def __init__(self):
+        self.chamadas = 0
+        self.falhar = False
+        self.liberar = threading.Event()
+        self.liberar.set()
+
+    def get(self, url, params=None, timeout=None):
+        self.liberar.wait(5)
+        if self.falhar:
+            raise requests.exceptions.RequestException("sem rede")
+        self.chamadas += 1
+        return RespostaFalsa({'versao': self.chamadas})
+
+
+class TestCacheHTTP(unittest.TestCase):
+    def setUp(self):
+        self._diretorio = tempfile.TemporaryDirectory()
+        self.cache = CacheHTTP(self._diretorio.name, ttl_fontes={'nasa_power': 60})
+        self.sessao = self.cache.sessao = SessaoFalsa()
+
+    def tearDown(self):
+        self._diretorio.cleanup()
+
+    def _obter(self, params=None):
+        return self.cache.obter_json('nasa_power', 'https://exemplo/api', params or {'ano': 2024})
+
+    def _envelhecer(self, segundos):
+        for nome in os.listdir(self._diretorio.name):
+            caminho = os.path.join(self._diretorio.name, nome)
+            with open(caminho, encoding='utf-8') as f:
+                entrada = json.load(f)
+            entrada['salvo_em'] -= segundos
+            with open(caminho, 'w', encoding='utf-8') as f:
+                json.dump(entrada, f)
+
+    def _aguardar_atualizacao(self):
+        limite = time.monotonic() + 5
+        while self.cache._atualizando and time.monotonic() < limite:
+            time.sleep(0.01)
+
+    def test_dentro_do_ttl_nao_vai_a_rede(self):
+        self.assertEqual(self._obter(), {'versao': 1})
+        self.assertEqual(self._obter(), {'versao': 1})
+        self.assertEqual(self.sessao.chamadas, 1)
+        # Parâmetros diferentes são outra entrada
+        self.assertEqual(self._obter({'ano': 2023}), {'versao': 2})
+
+    def test_vencido_serve_o_antigo_e_atualiza_em_segundo_plano(self):
+        self._obter()
+        self._envelhecer(120)
+        self.sessao.liberar.clear()
+
+        # A resposta vencida volta sem esperar a rede
+        self.assertEqual(self._obter(), {'versao': 1})
+        self.assertEqual(self._obter(), {'versao': 1})
+        self.sessao.liberar.set()
+        self._aguardar_atualizacao()
+
+        self.assertEqual(self.sessao.chamadas, 2)
+        self.assertEqual(self._obter(), {'versao': 2})
+
+    def test_falha_na_atualizacao_mantem_o_cache(self):
+        self._obter()
+        self._envelhecer(120)
+        self.sessao.falhar = True
+        self.assertEqual(self._obter(), {'versao': 1})
+        self._aguardar_atualizacao()
+        self.assertEqual(self._obter(), {'versao': 1})
+
+    def test_sem_cache_propaga_o_erro(self):
+        self.sessao.falhar = True
+        with self.assertRaises(requests.exceptions.RequestException):
+            self._obter()
+
+def treinar_media(dados, fator=1):
+    """Treino falso para o registro de modelos: o "modelo" é a média da coluna x."""
+    return {'media': float(dados['x'].mean()) * fator}, None, {'linhas': len(dados)}
+
+
+def executar_agora(funcao, *args):
+    futuro = Future()
+    futuro.set_result(funcao(*args))
+    return futuro
+
+
+class TestRegistroModelos(unittest.TestCase):
+    def setUp(self):
+        self._diretorio = tempfile.TemporaryDirectory()
+        self.dados = pd.DataFrame({'x': [1.0, 2.0, 3.0]})
+
+    def tearDown(self):
+        self._diretorio.cleanup()
+
+    def _registro(self):
+        registro = RegistroModelos(self._diretorio.name)
+        # Treino numa thread: o teste não depende de um processo spawn importar este módulo
+        executor = registro._executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+        return registro
+
+    def _aguardar(self, registro):
+        limite = time.monotonic() + 10
+        while registro.em_treino() and time.monotonic() < limite:
+            time.sleep(0.01)
+
+    def test_treino_instantaneo_nao_trava_o_registro(self):
+        # O callback de fim de treino roda na própria chamada quando o futuro já terminou
+        registro = self._registro()
+        registro._executor = SimpleNamespace(submit=lambda funcao, *args: executar_agora(funcao, *args))
+        self.assertIsNone(registro.obter('irrigacao', treinar_media, self.dados, {}))
+        self.assertEqual(registro.em_treino(), 0)
+        self.assertEqual(registro.obter('irrigacao', treinar_media, self.dados, {})['modelo'], {'media': 2.0})
+
+    def test_chave_depende_de_dados_e_hiperparametros(self):
+        chave = calcular_chave('irrigacao', self.dados, {'fator': 1})
+        self.assertEqual(chave, calcular_chave('irrigacao', self.dados.copy(), {'fator': 1}))
+        self.assertNotEqual(chave, calcular_chave('irrigacao', self.dados, {'fator': 2}))
+        self.assertNotEqual(chave, calcular_chave('precipitacao', self.dados, {'fator': 1}))
+        self.assertNotEqual(chave, calcular_chave('irrigacao', self.dados * 2, {'fator': 1}))
+
+    def test_treina_em_segundo_plano_e_depois_carrega_do_disco(self):
+        liberar = threading.Event()
+        treinos = []
+
+        def treinar(dados, **hiperparametros):
+            treinos.append(hiperparametros)
+            liberar.wait(5)
+            return treinar_media(dados, **hiperparametros)
+
+        registro = self._registro()
+        self.assertIsNone(registro.obter('irrigacao', treinar, self.dados, {'fator': 2}))
+        # Pedidos durante o treino não disparam outro treino
+        self.assertIsNone(registro.obter('irrigacao', treinar, self.dados, {'fator': 2}))
+        liberar.set()
+        self._aguardar(registro)
+        self.assertEqual(treinos, [{'fator': 2}])
+
+        artefato = registro.obter('irrigacao', treinar_media, self.dados, {'fator': 2})
+        self.assertEqual(artefato['modelo'], {'media': 4.0})
+        self.assertEqual(artefato['metricas'], {'linhas': 3})
+        self.assertEqual(len(os.listdir(self._diretorio.name)), 1)
+
+        # Outro processo (novo registro) só carrega o artefato, sem treinar
+        def nao_treinar(dados, **hiperparametros):
+            raise AssertionError("o modelo não deveria ser treinado de novo")
+
+        outro = self._registro()
+        self.assertEqual(outro.obter('irrigacao', nao_treinar, self.dados, {'fator': 2})['modelo'], {'media': 4.0})
+
+
+class TestReducaoSeries(unittest.TestCase):
+    def setUp(self):
+        self.x = np.arange(10000)
+        self.y = np.sin(self.x / 100.0)
+        # Pico isolado que a redução não pode perder
+        self.y[5000] = 10.0
+
+    def test_lttb_mantem_extremidades_e_orcamento(self):
+        indices = indices_lttb(self.x, self.y, 100)
+        self.assertEqual(len(indices), 100)
+        self.assertEqual(indices[0], 0)
+        self.assertEqual(indices[-1], len(self.y) - 1)
+        self.assertTrue(np.all(np.diff(indices) > 0))
+        self.assertIn(5000, indices)
+
+    def test_lttb_serie_menor_que_orcamento(self):
+        np.testing.assert_array_equal(indices_lttb(self.x[:50], self.y[:50], 100), np.arange(50))
+
+    def test_minmax_preserva_picos_e_vales(self):
+        indices = indices_minmax(self.y, 100)
+        self.assertLessEqual(len(indices), 100)
+        self.assertIn(5000, indices)
+        self.assertIn(int(np.argmin(self.y)), indices)
+        self.assertTrue(np.all(np.diff(indices) > 0))
+
+    def test_reduzir_serie_com_datas_e_nulos(self):
+        df = pd.DataFrame({
+            'hora_leitura': pd.date_range('2024-01-01', periods=len(self.y), freq='s'),
+            'umidade': self.y,
+        })
+        df.loc[::7, 'umidade'] = np.nan
+        reduzido = reduzir_serie(df, 'hora_leitura', 'umidade', pontos=200)
+        self.assertLessEqual(len(reduzido), 200)
+        self.assertFalse(reduzido['umidade'].isna().any())
+        self.assertTrue(reduzido['hora_leitura'].is_monotonic_increasing)
+        self.assertEqual(len(reduzir_serie(df.head(100), 'hora_leitura', 'umidade', pontos=200)), 100)
+
+class CursorAoVivo:
+    """Cursor falso para as consultas do painel ao vivo sobre as leituras já confirmadas."""
+
+    def __init__(self, confirmadas):
+        self.confirmadas = confirmadas
+        self.arraysize = 100
+
+    def execute(self, sql, parametros):
+        p = parametros
+        linhas = sorted(self.confirmadas.values())
+        if 'id_sensor' in p:
+            linhas = [linha for linha in linhas if linha[1] == p['id_sensor']]
+        if 'IN (' in sql:
+            ids = set(p.values())
+            self._resultado = [linha for linha in linhas if linha[0] in ids]
+        elif 'desde' in p:
+            self._resultado = [(linha[0],) for linha in linhas if linha[2] >= p['desde'] and linha[0] < p['apos_id']]
+        elif 'apos_id' in p:
+            self._resultado = [linha for linha in linhas if linha[0] > p['apos_id']][:p['limite']]
+        else:
+            self._resultado = linhas[::-1][:p['limite']]
+
+    def fetchall(self):
+        return self._resultado
+
+    def close(self):
+        pass
+
+
+class TestAcompanharUmidade(unittest.TestCase):
+    def setUp(self):
+        self.base = datetime(2024, 5, 1, 12, 0)
+        self.confirmadas = {}
+        self.conn = SimpleNamespace(cursor=lambda: CursorAoVivo(self.confirmadas))
+        self.estado = {'marca': None}
+
+    def _confirmar(self, id_leitura, segundos, id_sensor=1):
+        self.confirmadas[id_leitura] = (id_leitura, id_sensor, self.base + timedelta(seconds=segundos), 50.0)
+
+    def _acompanhar(self, **parametros):
+        linhas = acompanhar_umidade(self.conn, self.estado, margem=timedelta(seconds=30), **parametros)
+        return [linha[0] for linha in linhas]
+
+    def test_leitura_confirmada_fora_de_ordem_nao_se_perde(self):
+        # O worker que reservou o id 3 ainda não confirmou quando o painel consulta
+        for id_leitura in (1, 2, 4, 5):
+            self._confirmar(id_leitura, id_leitura)
+        self.assertEqual(self._acompanhar(), [1, 2, 4, 5])
+        self.assertEqual(self.estado['marca'], 5)
+
+        self._confirmar(3, 3)
+        self._confirmar(6, 6)
+        self.assertEqual(sorted(self._acompanhar()), [3, 6])
+        # Sem repetição nas consultas seguintes
+        self.assertEqual(self._acompanhar(), [])
+
+    def test_janela_de_reverificacao_limitada_pela_margem(self):
+        self._confirmar(1, 0)
+        self._confirmar(3, 100)
+        self.assertEqual(self._acompanhar(), [1, 3])
+        self.assertEqual(set(self.estado['vistos']), {3})
+
+        # Fora da janela (100 s - 30 s): não é mais reverificada
+        self._confirmar(2, 10)
+        self.assertEqual(self._acompanhar(), [])
+        # Dentro da janela
+        self._confirmar(2, 80)
+        self.assertEqual(self._acompanhar(), [2])
+
+    def test_filtro_por_sensor_e_limite_inicial(self):
+        for id_leitura in range(1, 11):
+            self._confirmar(id_leitura, id_leitura, id_sensor=1 + id_leitura % 2)
+        self.assertEqual(self._acompanhar(id_sensor=1, limite=3), [6, 8, 10])
+        self._confirmar(11, 11, id_sensor=2)
+        self._confirmar(12, 12, id_sensor=1)
+        self.assertEqual(self._acompanhar(id_sensor=1, limite=3), [12])
+
+class TestTabelaUmidade(unittest.TestCase):
+    def test_status_e_tipos_nativos(self):
+        momento = datetime(2024, 5, 1, 12, 30)
+        linhas = [
+            (1, 1, momento.date(), momento, 44.99),
+            (2, 1, momento.date(), momento, 45.0),
+            (3, 2, momento.date(), momento, 55.0),
+            (4, 2, momento.date(), momento, Decimal('55.01')),
+        ]
+        df = preparar_tabela_umidade(linhas)
+
+        self.assertEqual(list(df['Status']), [STATUS_FORA, STATUS_NORMAL, STATUS_NORMAL, STATUS_FORA])
+        self.assertEqual(list(df['Status'].cat.categories), [STATUS_NORMAL, STATUS_FORA])
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(df['Data']))
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(df['Hora']))
+        self.assertEqual(df['Umidade (%)'].dtype, float)
+
+    def test_sem_linhas(self):
+        df = preparar_tabela_umidade([])
+        self.assertTrue(df.empty)
+        self.assertIn('Status', df.columns)
+
+
+class PopenFalso:
+    def __init__(self, comando, env=None):
+        self.pid = 1234
+        self.codigo = None
+
+    def poll(self):
+        return self.codigo
+
+
+class TestSupervisor(unittest.TestCase):
+    def setUp(self):
+        self.agora = 1000.0
+        for alvo, substituto in (('run.time.monotonic', lambda: self.agora), ('run.subprocess.Popen', PopenFalso),
+                                 ('builtins.print', lambda *args, **kwargs: None)):
+            patcher = unittest.mock.patch(alvo, substituto)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.processo = run.Processo('ingestao-0', ['python'])
+
+    def _cair_e_reiniciar(self):
+        """Derruba o processo e avança até o reinício; retorna a espera aplicada."""
+        self.processo.popen.codigo = 1
+        self.processo.verificar()
+        espera = self.processo.proximo_inicio - self.agora
+        self.agora = self.processo.proximo_inicio
+        self.processo.verificar()
+        return espera
+
+    def test_espera_dobra_ate_o_limite(self):
+        self.processo.verificar()
+        esperas = [self._cair_e_reiniciar() for _ in range(7)]
+        self.assertEqual(esperas, [1, 2, 4, 8, 16, 30, 30])
+
+    def test_nao_reinicia_antes_da_espera(self):
+        self.processo.verificar()
+        self.processo.popen.codigo = 1
+        self.processo.verificar()
+        self.processo.verificar()
+        self.assertIsNone(self.processo.popen)
+
+    def test_processo_estavel_zera_reinicios(self):
+        self.processo.verificar()
+        self._cair_e_reiniciar()
+        self._cair_e_reiniciar()
+        self.assertEqual(self.processo.reinicios, 2)
+        self.agora += 61
+        self.processo.verificar()
+        self.assertEqual(self.processo.reinicios, 0)
+        self.assertEqual(self._cair_e_reiniciar(), 1)
+
+
+class TestLimitadorTaxa(unittest.TestCase):
+    def _registro(self, lineno=10, criado=1000.0):
+        registro = logging.LogRecord('teste', logging.INFO, 'app.py', lineno, "leitura %s", ('x',), None)
+        registro.created = criado
+        return registro
+
+    def test_limite_por_segundo_e_aviso_de_suprimidos(self):
+        limitador = LimitadorTaxa(limite=2)
+        aceitos = [limitador.filter(self._registro(criado=1000.1 + i / 10)) for i in range(5)]
+        self.assertEqual(aceitos, [True, True, False, False, False])
+
+        seguinte = self._registro(criado=1001.0)
+        self.assertTrue(limitador.filter(seguinte))
+        self.assertEqual(seguinte.suprimidos, 3)
+        self.assertIn("3 registros semelhantes suprimidos", seguinte.getMessage())
+
+    def test_pontos_do_codigo_independentes(self):
+        limitador = LimitadorTaxa(limite=1)
+        self.assertTrue(limitador.filter(self._registro(lineno=10)))
+        self.assertFalse(limitador.filter(self._registro(lineno=10)))
+        self.assertTrue(limitador.filter(self._registro(lineno=20)))
+
+    def test_limite_zero_desativa(self):
+        limitador = LimitadorTaxa(limite=0)
+        self.assertTrue(all(limitador.filter(self._registro()) for _ in range(100)))
+
+
+class TestAmostragemLog(unittest.TestCase):
+    def _registro(self, nivel=logging.DEBUG):
+        return logging.LogRecord('teste', nivel, 'mqtt_client.py', 10, "mensagem", None, None)
+
+    def test_um_a_cada_taxa_e_avisos_sempre(self):
+        amostragem = AmostragemLog(taxa=3)
+        aceitos = [amostragem.filter(self._registro()) for _ in range(6)]
+        self.assertEqual(aceitos, [False, False, True, False, False, True])
+        self.assertTrue(amostragem.filter(self._registro(logging.WARNING)))
+
+    def test_contagem_exata_entre_threads(self):
+        amostragem = AmostragemLog(taxa=10)
+        aceitos = []
+
+        def registrar():
+            aceitos.append(sum(amostragem.filter(self._registro()) for _ in range(10000)))
+
+        threads = [threading.Thread(target=registrar) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sum(aceitos), 8000)
+
+
+class TestArquivoDoProcesso(unittest.TestCase):
+    def test_papel_e_pid_no_nome(self):
+        caminho = arquivo_do_processo('/var/log/farmtech/app.txt', 'ingestao-2')
+        self.assertEqual(caminho, f"/var/log/farmtech/app-ingestao-2-{os.getpid()}.txt")
+
+    def test_sem_papel_usa_o_nome_do_script(self):
+        with unittest.mock.patch('sys.argv', ['/opt/farmtech/src/mqtt_client.py']):
+            self.assertEqual(os.path.basename(arquivo_do_processo('app.txt', None)),
+                             f"app-mqtt_client-{os.getpid()}.txt")
+
+    def test_supervisor_define_o_papel_de_cada_processo(self):
+        with unittest.mock.patch('run.subprocess.Popen') as popen, \
+                unittest.mock.patch('builtins.print', lambda *args, **kwargs: None):
+            run.Processo('bomba', ['python']).iniciar()
+        self.assertEqual(popen.call_args.kwargs['env']['LOG_PAPEL'], 'bomba')
+
+
+if __name__ == '__main__':
+    unittest.main()